@@ -0,0 +1,187 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Allows `rate` calls per second on average, with bursts of up to `capacity` calls.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def take(self, now: float = None) -> bool:
+        """
+        Take one token if there is one. Returns False when the caller is over its rate.
+        """
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class AdmissionControl:
+    """
+    Decides which callers the miner serves.
+
+    The hotkey to uid/stake index is rebuilt from the metagraph whenever it is refreshed, so lookups on the request
+    path are O(1) dict accesses instead of scans over `metagraph.hotkeys`.
+
+    Each hotkey gets a token bucket whose rate grows with its share of the largest stake, so a caller can't use more
+    than its share of our scraping capacity. When the number of requests in flight passes `shed_at` of
+    `max_in_flight`, callers are shed from the lowest stake up: the fuller we are, the higher the stake rank a caller
+    needs to be let in.
+    """
+
+    def __init__(self, rate: float = 0.2, burst: float = 10, min_weight: float = 0.1, max_in_flight: int = 16, shed_at: float = 0.5):
+        """
+        Initialize the AdmissionControl.
+
+        Args:
+            rate (float, optional): Requests per second allowed for the hotkey with the largest stake. Defaults to 0.2.
+            burst (float, optional): Requests a hotkey may send back to back. Defaults to 10.
+            min_weight (float, optional): Share of `rate` allowed for hotkeys without stake. Defaults to 0.1.
+            max_in_flight (int, optional): Requests in flight at which every new request is shed. Defaults to 16.
+            shed_at (float, optional): Share of `max_in_flight` at which low stake callers start being shed. Defaults to 0.5.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_weight = min_weight
+        self.max_in_flight = max_in_flight
+        self.shed_at = shed_at
+
+        self._uids = {}  # hotkey -> uid
+        self._stakes = {}  # hotkey -> stake
+        self._ranks = {}  # hotkey -> stake rank in [0, 1], 1 being the largest stake
+        self._max_stake = 0.0
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+        self.admitted = 0
+        self.unknown = 0
+        self.rate_limited = 0
+        self.shed = 0
+
+    def update(self, hotkeys: list, stakes: list):
+        """
+        Rebuild the index from the metagraph's hotkeys and stakes.
+        """
+        stakes = [float(stake) for stake in stakes]
+        order = sorted(range(len(hotkeys)), key=lambda uid: stakes[uid])
+        ranks = {hotkeys[uid]: position / max(1, len(order) - 1) for position, uid in enumerate(order)}
+        with self._lock:
+            self._uids = {hotkey: uid for uid, hotkey in enumerate(hotkeys)}
+            self._stakes = dict(zip(hotkeys, stakes))
+            self._ranks = ranks
+            self._max_stake = max(stakes, default=0.0)
+            # Deregistered hotkeys lose their bucket, the others get a rate matching their new stake
+            self._buckets = {hotkey: bucket for hotkey, bucket in self._buckets.items() if hotkey in self._uids}
+            for hotkey, bucket in self._buckets.items():
+                bucket.rate = self._rate(hotkey)
+
+    def uid(self, hotkey: str) -> int:
+        """
+        Return the uid of `hotkey`, or None if it isn't registered.
+        """
+        return self._uids.get(hotkey)
+
+    def stake(self, hotkey: str) -> float:
+        """
+        Return the stake of `hotkey`, or 0 if it isn't registered.
+        """
+        return self._stakes.get(hotkey, 0.0)
+
+    def _rate(self, hotkey: str) -> float:
+        share = self._stakes.get(hotkey, 0.0) / self._max_stake if self._max_stake > 0 else 0.0
+        return self.rate * (self.min_weight + (1 - self.min_weight) * share)
+
+    def admit(self, hotkey: str) -> tuple:
+        """
+        Decide whether to serve a request from `hotkey`.
+
+        Returns:
+            tuple: (blacklisted, reason), in the form the axon's blacklist functions return.
+        """
+        with self._lock:
+            if hotkey not in self._uids:
+                self.unknown += 1
+                return True, "Unrecognized hotkey"
+
+            shed_from = self.shed_at * self.max_in_flight
+            if self.in_flight >= shed_from:
+                # Required stake rank goes from 0 at `shed_from` to above 1 at `max_in_flight`
+                required_rank = (self.in_flight - shed_from + 1) / max(1.0, self.max_in_flight - shed_from)
+                if self._ranks.get(hotkey, 0.0) < required_rank:
+                    self.shed += 1
+                    return True, f"Overloaded ({self.in_flight} requests in flight)"
+
+            bucket = self._buckets.get(hotkey)
+            if bucket is None:
+                bucket = self._buckets[hotkey] = TokenBucket(self._rate(hotkey), self.burst)
+            if not bucket.take():
+                self.rate_limited += 1
+                return True, "Rate limited"
+
+            self.admitted += 1
+            return False, ""
+
+    def priority(self, hotkey: str) -> float:
+        """
+        Return the priority of a request from `hotkey`: its stake.
+        """
+        return self.stake(hotkey)
+
+    @contextmanager
+    def track(self):
+        """
+        Count a request as in flight while the block runs.
+        """
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hotkeys": len(self._uids),
+                "in_flight": self.in_flight,
+                "admitted": self.admitted,
+                "unknown": self.unknown,
+                "rate_limited": self.rate_limited,
+                "shed": self.shed,
+            }
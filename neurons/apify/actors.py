@@ -18,8 +18,15 @@ DEALINGS IN THE SOFTWARE.
 """
 
 import os
+import time
+import asyncio
 import logging
+import threading
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
 from apify_client import ApifyClient, ApifyClientAsync
+from neurons.apify.telemetry import telemetry
 
 # Set up logger for the script
 logger = logging.getLogger(__name__)
@@ -27,6 +34,82 @@ logger = logging.getLogger(__name__)
 from dotenv import load_dotenv
 
 load_dotenv()
+
+# Run statuses after which an actor run won't write any more items
+TERMINAL_STATUSES = {"SUCCEEDED", "FAILED", "TIMED-OUT", "ABORTED"}
+
+# Absolute time.monotonic() deadline for async actor runs started in the current context. See `actor_deadline`.
+_deadline = ContextVar("actor_deadline", default=None)
+
+# Callback receiving mapped items of async actor runs started in the current context as they arrive. See `stream_items`.
+_item_sink = ContextVar("item_sink", default=None)
+
+
+@contextmanager
+def actor_deadline(deadline: float):
+    """
+    Set a deadline for async actor runs started inside the block, including runs in tasks created inside it.
+    At the deadline the run is aborted and the items written so far are returned.
+
+    Args:
+        deadline (float): Absolute time.monotonic() value, or None for no deadline.
+    """
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def stream_items(sink):
+    """
+    Pass the items of async actor runs started inside the block to `sink` as they are written to the dataset,
+    instead of only returning them once the run is done. `sink` is called with lists of mapped items.
+
+    Args:
+        sink (callable): Called with each new page of mapped items.
+    """
+    token = _item_sink.set(sink)
+    try:
+        yield
+    finally:
+        _item_sink.reset(token)
+
+# Items fetched per dataset request
+DATASET_PAGE_SIZE = 1000
+
+# Process-wide Apify clients, so connections are kept alive between actor runs instead of being set up on every call.
+# Async clients hold connections bound to an event loop, so they are kept per loop.
+_clients = {}
+_async_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key: str, api_url: str = None) -> ApifyClient:
+    """
+    Return the shared ApifyClient for `api_key`, talking to `api_url` (the Apify API when None).
+    """
+    with _clients_lock:
+        client = _clients.get((api_key, api_url))
+        if client is None:
+            client = _clients[(api_key, api_url)] = ApifyClient(api_key, api_url=api_url) if api_url else ApifyClient(api_key)
+        return client
+
+
+def get_client_async(api_key: str, api_url: str = None) -> ApifyClientAsync:
+    """
+    Return the shared ApifyClientAsync for `api_key` and `api_url` on the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get((api_key, api_url))
+        if client is None:
+            client = clients[(api_key, api_url)] = ApifyClientAsync(api_key, api_url=api_url) if api_url else ApifyClientAsync(api_key)
+        return client
+
+
 class ActorConfig:
     """
     Configuration class for actors in Apify.
@@ -40,9 +123,13 @@ class ActorConfig:
         """
         # self.api_key = os.environ.get('APIFY_API_KEY')  # Get the Apify API key from environment variable
         self.api_key = os.getenv("APIFY_API_KEY")
+        # Base URL of the Apify API, e.g. a local stand-in (see neurons/apify/stand_in.py). None uses the real API.
+        self.api_url = os.getenv("APIFY_API_BASE_URL")
         self.actor_id = actor_id  # Actor ID
         self.timeout_secs = 30
         self.memory_mbytes = None 
+        # Item fields to download from the dataset, i.e. the fields `map()` reads. None downloads whole items.
+        self.fields = None
 
 
 def run_actor(actor_config: ActorConfig, run_input: dict, default_dataset_id: str = "defaultDatasetId"):
@@ -57,23 +144,35 @@ def run_actor(actor_config: ActorConfig, run_input: dict, default_dataset_id: st
     Returns:
         list[dict]: List of items fetched from the dataset.
     """
-    # Initialize the Apify client with the API key
-    client = ApifyClient(actor_config.api_key)
+    client = get_client(actor_config.api_key, actor_config.api_url)
     logger.info(f"Running actor: {actor_config.actor_id}")
-    
-     # Start the actor run
-    run = client.actor(actor_config.actor_id).call(run_input=run_input, 
-                                                   timeout_secs=actor_config.timeout_secs, 
-                                                   memory_mbytes=actor_config.memory_mbytes)
-    logger.info(f"Actor run: {run}")
+    started = time.monotonic()
+    run, data_set, fetch_secs = None, [], 0.0
+    try:
+        # Start the actor run
+        run = client.actor(actor_config.actor_id).call(run_input=run_input, 
+                                                       timeout_secs=actor_config.timeout_secs, 
+                                                       memory_mbytes=actor_config.memory_mbytes)
+        logger.info(f"Actor run: {run}")
 
-    # Fetch data items from the specified dataset
-    data_set = [item for item in client.dataset(run[default_dataset_id]).iterate_items()]
+        # Fetch data items from the specified dataset
+        fetch_started = time.monotonic()
+        dataset = client.dataset(run[default_dataset_id])
+        while True:
+            page = dataset.list_items(offset=len(data_set), limit=DATASET_PAGE_SIZE, fields=actor_config.fields)
+            data_set.extend(page.items)
+            if len(page.items) < DATASET_PAGE_SIZE:
+                break
+        fetch_secs = time.monotonic() - fetch_started
+    except BaseException:
+        _record_run(actor_config, run, started, fetch_secs, data_set, failed=True)
+        raise
+    _record_run(actor_config, run, started, fetch_secs, data_set)
 
     logger.info(f"Fetched {len(data_set)} items from dataset")
     return data_set
 
-async def run_actor_async(actor_config: ActorConfig, run_input: dict, default_dataset_id: str = "defaultDatasetId"):
+async def run_actor_async(actor_config: ActorConfig, run_input: dict, default_dataset_id: str = "defaultDatasetId", map_fn = None):
     """
     Run an actor in Apify and fetch the resulting data.
 
@@ -81,24 +180,134 @@ async def run_actor_async(actor_config: ActorConfig, run_input: dict, default_da
         actor_config (ActorConfig): The configuration to use for running the actor.
         run_input (dict): The input parameters for the actor run.
         default_dataset_id (str, optional): ID of the dataset to fetch data from. Defaults to "defaultDatasetId".
+        map_fn (callable, optional): Maps a list of raw items for the sink set with `stream_items`. Defaults to None.
 
     Returns:
         list[dict]: List of items fetched from the dataset.
     """
-    # Initialize the Apify client with the API key
-    client = ApifyClientAsync(actor_config.api_key)
+    client = get_client_async(actor_config.api_key, actor_config.api_url)
     logger.info(f"Running actor: {actor_config.actor_id}")
-    run = await client.actor(actor_config.actor_id).call(run_input=run_input, timeout_secs=actor_config.timeout_secs, memory_mbytes=actor_config.memory_mbytes)  # Start the actor run
-    logger.info(f"Actor run: {run}")
+    started = time.monotonic()
+    run, fetched_items, timings = None, [], {"fetch_secs": 0.0}
+    try:
+        run = await client.actor(actor_config.actor_id).start(run_input=run_input, timeout_secs=actor_config.timeout_secs, memory_mbytes=actor_config.memory_mbytes)  # Start the actor run
+        deadline = _deadline.get()
+        sink = _item_sink.get() if map_fn is not None else None
+        on_page = None
+        if sink is not None:
+            def on_page(page: list):
+                try:
+                    sink(map_fn(page))
+                except Exception as e:
+                    logger.warning(f"Failed to stream items of actor run {run['id']}: {e}")
+        try:
+            if deadline is not None or on_page is not None:
+                fetched_items = await collect_until_deadline(client, run, deadline, default_dataset_id, on_page=on_page, fields=actor_config.fields, timings=timings)
+                _record_run(actor_config, run, started, timings["fetch_secs"], fetched_items)
+                return fetched_items
+            run = await client.run(run["id"]).wait_for_finish()
+        except asyncio.CancelledError:
+            # Abort the run, so a cancelled caller (e.g. the loser of a hedged race) stops paying for it
+            await abort_run_async(client, run["id"])
+            raise
+        logger.info(f"Actor run: {run}")
+
+        # Fetch data items from the specified dataset
+        fetch_started = time.monotonic()
+        dataset = client.dataset(run[default_dataset_id])
+        while True:
+            page = await dataset.list_items(offset=len(fetched_items), limit=DATASET_PAGE_SIZE, fields=actor_config.fields)
+            fetched_items.extend(page.items)
+            if len(page.items) < DATASET_PAGE_SIZE:
+                break
+        timings["fetch_secs"] = time.monotonic() - fetch_started
+    except BaseException:
+        _record_run(actor_config, run, started, timings["fetch_secs"], fetched_items, failed=True)
+        raise
+    _record_run(actor_config, run, started, timings["fetch_secs"], fetched_items)
+
+    logger.info(f"Fetched {len(fetched_items)} items from dataset")
+    return fetched_items
+
+def _record_run(actor_config: ActorConfig, run: dict, started: float, fetch_secs: float, items: list, failed: bool = False):
+    """
+    Feed a finished (or failed) run into the telemetry. Whatever isn't the actor running or the dataset download,
+    i.e. API round trips and waiting for the actor to start, is counted as queue time.
+    """
+    try:
+        stats = (run or {}).get("stats") or {}
+        run_secs = stats.get("runTimeSecs") or 0.0
+        total_secs = time.monotonic() - started
+        telemetry.record(
+            actor_config.actor_id, run,
+            queue_secs = total_secs - run_secs - fetch_secs,
+            run_secs = run_secs,
+            fetch_secs = fetch_secs,
+            items = items,
+            failed = failed,
+        )
+    except Exception as e:
+        logger.warning(f"Failed to record telemetry of actor {actor_config.actor_id}: {e}")
+
+async def collect_until_deadline(client: ApifyClientAsync, run: dict, deadline: float, default_dataset_id: str = "defaultDatasetId", poll_interval: float = 1.0, on_page = None, fields: list = None, timings: dict = None):
+    """
+    Wait for an actor run while streaming items from its dataset as they are written. If the run hasn't
+    finished by `deadline`, abort it and return the items collected so far.
 
-    # Fetch data items from the specified dataset
+    Args:
+        client (ApifyClientAsync): The client the run was started with.
+        run (dict): The run object returned when starting the actor. It is updated in place with the latest state of the run.
+        deadline (float): Absolute time.monotonic() value, or None to wait until the run finishes.
+        default_dataset_id (str, optional): ID of the dataset to fetch data from. Defaults to "defaultDatasetId".
+        poll_interval (float, optional): Seconds between polls of the run and its dataset. Defaults to 1.
+        on_page (callable, optional): Called with every non-empty page of new items. Defaults to None.
+        fields (list, optional): Item fields to download. Defaults to None for whole items.
+        timings (dict, optional): Its "fetch_secs" entry is increased by the time spent downloading items. Defaults to None.
+
+    Returns:
+        list[dict]: List of items fetched from the dataset.
+    """
+    run_client = client.run(run["id"])
     dataset = client.dataset(run[default_dataset_id])
-    items = dataset.iterate_items()
+    items = []
+    while True:
+        # Read the status before the items, so a finished run's last items are always picked up
+        run.update(await run_client.get() or {})
+        status = run.get("status")
+        fetch_started = time.monotonic()
+        page = await dataset.list_items(offset=len(items), limit=DATASET_PAGE_SIZE, fields=fields)
+        if timings is not None:
+            timings["fetch_secs"] = timings.get("fetch_secs", 0.0) + time.monotonic() - fetch_started
+        items.extend(page.items)
+        if page.items and on_page is not None:
+            on_page(page.items)
+        if len(page.items) == DATASET_PAGE_SIZE:
+            # A full page means more items are waiting, fetch them without sleeping
+            continue
+        if status in TERMINAL_STATUSES:
+            logger.info(f"Actor run {run['id']} finished with status {status}")
+            break
 
-    fetched_items = []
+        remaining = poll_interval if deadline is None else deadline - time.monotonic()
+        if remaining <= 0:
+            logger.info(f"Deadline reached, aborting actor run {run['id']} with {len(items)} items")
+            await abort_run_async(client, run["id"])
+            break
+        await asyncio.sleep(min(poll_interval, remaining))
 
-    async for item in items:
-        fetched_items.append(item)
+    logger.info(f"Fetched {len(items)} items from dataset")
+    return items
 
-    logger.info(f"Fetched {len(fetched_items)} items from dataset")
-    return fetched_items
+async def abort_run_async(client: ApifyClientAsync, run_id: str):
+    """
+    Abort an actor run, logging instead of raising if the run already finished or the request fails.
+
+    Args:
+        client (ApifyClientAsync): The client the run was started with.
+        run_id (str): The ID of the run to abort.
+    """
+    try:
+        await asyncio.shield(client.run(run_id).abort())
+        logger.info(f"Aborted actor run: {run_id}")
+    except Exception as e:
+        logger.warning(f"Failed to abort actor run {run_id}: {e}")
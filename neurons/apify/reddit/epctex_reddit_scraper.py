@@ -1,6 +1,6 @@
 import logging
-from neurons.apify.actors import run_actor, ActorConfig
-from datetime import datetime
+from neurons.apify.actors import run_actor, run_actor_async, ActorConfig
+from neurons.apify.mapping import Mapper, Field, epoch_to_iso
 
 # Setting up logger for debugging and information purposes
 logger = logging.getLogger(__name__)
@@ -13,11 +13,24 @@ class EpctexRedditScraper:
         actor_config (ActorConfig): Configuration settings specific to the Apify actor.
     """
 
+    # Output field <- actor item field
+    mapper = Mapper("epctex_reddit", {
+        'id': 'id',
+        'url': 'url',
+        'title': Field('title', default=None),
+        'text': 'text',
+        'likes': 'score',
+        'dataType': 'type',
+        'timestamp': Field('createdAt', transform=epoch_to_iso),
+    })
+
     def __init__(self):
         """
         Initialize the EpctexRedditScraper.
         """
         self.actor_config = ActorConfig("jwR5FKaWaGSmkeq2b")
+        # Only download the fields map() reads
+        self.actor_config.fields = ["id", "url", "title", "text", "score", "type", "createdAt", "comments"]
 
     def searchByUrl(self, urls: list = ["https://twitter.com/elonmusk/status/1384874438472844800"]):
         run_input = {
@@ -64,17 +77,11 @@ class EpctexRedditScraper:
 
         return self.map(all_items)
 
-    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15) -> list:
+    def build_run_input(self, search_queries: list, limit_number: int) -> dict:
         """
-        Execute the tweet reddit query process using the specified search queries.
-
-        Args:
-            search_queries (list, optional): A list of search terms to be queried. Defaults to ["bittensor"].
-
-        Returns:
-            list: A list of reddit posts.
+        Build the actor input for a search.
         """
-        run_input = {
+        return {
             "customMapFunction": "(object) => { return {...object} }",
             "endPage": 1,
             "extendOutputFunction": "($) => { return {} }",
@@ -89,12 +96,27 @@ class EpctexRedditScraper:
             "time": "all"
         }
 
-        return self.map(run_actor(self.actor_config, run_input))
+    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Execute the tweet reddit query process using the specified search queries.
+
+        Args:
+            search_queries (list, optional): A list of search terms to be queried. Defaults to ["bittensor"].
+
+        Returns:
+            list: A list of reddit posts.
+        """
+        return self.map(run_actor(self.actor_config, self.build_run_input(search_queries, limit_number)))
+
+    async def execute_async(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Same as `execute`, without blocking the event loop while the actor runs.
+        """
+        return self.map(await run_actor_async(self.actor_config, self.build_run_input(search_queries, limit_number), map_fn=self.map))
 
     def map(self, input: list) -> list:
         """
-        Potentially map the input data as needed. As of now, this method serves as a placeholder and simply returns the
-        input data directly.
+        Map the input data to the expected sn3 format. Malformed items are skipped.
 
         Args:
             input (list): The data to potentially map or transform.
@@ -102,16 +124,7 @@ class EpctexRedditScraper:
         Returns:
             list: The mapped or transformed data.
         """
-        filtered_input = [
-            {'id': item['id'], 
-             'url': item['url'],
-             'title': item.get('title'),
-             'text': item['text'], 
-             'likes': item['score'], 
-             'dataType': item['type'], 
-             'timestamp': datetime.utcfromtimestamp(item['createdAt']).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
-             } for item in input]
-        return filtered_input
+        return self.mapper.map(input)
 
 
 if __name__ == '__main__':
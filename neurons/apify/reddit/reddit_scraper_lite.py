@@ -1,5 +1,6 @@
 import logging
-from neurons.apify.actors import run_actor, ActorConfig
+from neurons.apify.actors import run_actor, run_actor_async, ActorConfig
+from neurons.apify.mapping import Mapper, Field
 
 # Setting up logger for debugging and information purposes
 logger = logging.getLogger(__name__)
@@ -12,11 +13,26 @@ class RedditScraperLite:
         actor_config (ActorConfig): Configuration settings specific to the Apify actor.
     """
 
+    # Output field <- actor item field
+    mapper = Mapper("reddit_scraper_lite", {
+        'id': 'id',
+        'url': 'url',
+        'text': 'body',
+        'likes': 'upVotes',
+        'dataType': 'dataType',
+        'community': 'communityName',
+        'username': 'username',
+        'parent': Field('parentId', default=None),
+        'timestamp': 'createdAt',
+    })
+
     def __init__(self):
         """
         Initialize the RedditScraperLite.
         """
         self.actor_config = ActorConfig("oAuCIx3ItNrs2okjQ")
+        # Only download the fields map() reads
+        self.actor_config.fields = ["id", "url", "body", "upVotes", "dataType", "communityName", "username", "parentId", "createdAt"]
 
     def searchByUrl(self, urls: list = ["https://twitter.com/elonmusk/status/1384874438472844800"]):
         """
@@ -48,22 +64,17 @@ class RedditScraperLite:
             ]
             }
         return self.map(run_actor(self.actor_config, run_input))
-    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+    def build_run_input(self, search_queries: list, limit_number: int) -> dict:
         """
-        Execute the reddit post query process using the specified search queries.
-
-        Args:
-            search_queries (list, optional): A list of search terms to be queried. Defaults to ["bittensor"].
-
-        Returns:
-            list: A list of reddit posts.
+        Build the actor input for a search. `limit_number` is the total over all search terms, each of which gets an
+        equal share of the posts.
         """
-        run_input = {
+        return {
             "debugMode": False,
             "maxComments": 10,
             "maxCommunitiesCount": 2,
-            "maxItems": 10,
-            "maxPostCount": 10,
+            "maxItems": limit_number,
+            "maxPostCount": -(-limit_number // max(1, len(search_queries))),
             "maxUserCount": 2,
             "proxy": {
                 "useApifyProxy": True
@@ -77,12 +88,27 @@ class RedditScraperLite:
             "skipComments": False
             }
 
-        return self.map(run_actor(self.actor_config, run_input))
+    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Execute the reddit post query process using the specified search queries.
+
+        Args:
+            search_queries (list, optional): A list of search terms to be queried. Defaults to ["bittensor"].
+
+        Returns:
+            list: A list of reddit posts.
+        """
+        return self.map(run_actor(self.actor_config, self.build_run_input(search_queries, limit_number)))
+
+    async def execute_async(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Same as `execute`, without blocking the event loop while the actor runs.
+        """
+        return self.map(await run_actor_async(self.actor_config, self.build_run_input(search_queries, limit_number), map_fn=self.map))
 
     def map(self, input: list) -> list:
         """
-        Potentially map the input data as needed. As of now, this method serves as a placeholder and simply returns the
-        input data directly.
+        Map the input data to the expected sn3 format. Malformed items are skipped.
 
         Args:
             input (list): The data to potentially map or transform.
@@ -90,18 +116,7 @@ class RedditScraperLite:
         Returns:
             list: The mapped or transformed data.
         """
-        filtered_input = [{
-            'id': item['id'], 
-            'url': item['url'], 
-            'text': item['body'], 
-            'likes': item['upVotes'], 
-            'dataType': item['dataType'], 
-            'community': item['communityName'],
-            'username': item['username'],
-            'parent': item.get('parentId'),
-            'timestamp': item['createdAt']
-        } for item in input]
-        return filtered_input
+        return self.mapper.map(input)
 
 
 if __name__ == '__main__':
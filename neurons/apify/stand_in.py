@@ -0,0 +1,483 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+# Local stand-in for the part of the Apify REST API that the scrapers in neurons/apify use, for offline benchmarks
+# and load tests. Start it and point the clients at it:
+#
+#   python -m neurons.apify.stand_in --port 8765 --latency 8 --failure_rate 0.05
+#   export APIFY_API_BASE_URL=http://127.0.0.1:8765
+
+import json
+import math
+import time
+import uuid
+import random
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+WORDS = ["market", "update", "today", "thread", "news", "price", "community", "launch", "network", "analysis",
+         "opinion", "chart", "release", "question", "weekly", "discussion", "data", "model", "subnet", "build"]
+
+
+def _words(rng: random.Random, keyword: str, count: int = 12) -> str:
+    words = [rng.choice(WORDS) for _ in range(count)]
+    words.insert(rng.randrange(len(words) + 1), keyword)
+    return " ".join(words)
+
+
+def _recent(rng: random.Random, max_age: float = 3600) -> datetime:
+    return datetime.fromtimestamp(time.time() - rng.uniform(0, max_age), tz=timezone.utc)
+
+
+def _tweet_id(rng: random.Random) -> str:
+    return str(rng.randrange(10 ** 18, 2 * 10 ** 18))
+
+
+def _id_from_url(url: str) -> str:
+    return url.rstrip("/").split("/")[-1]
+
+
+def make_tweet(rng: random.Random, keyword: str, url: str = None) -> dict:
+    """
+    Generate the content of a tweet, independent of any actor's output schema.
+    """
+    tweet_id = _id_from_url(url) if url else _tweet_id(rng)
+    username = f"user{rng.randrange(10000)}"
+    return {
+        "id": tweet_id,
+        "url": url or f"https://twitter.com/{username}/status/{tweet_id}",
+        "username": username,
+        "text": _words(rng, keyword),
+        "likes": rng.randrange(1000),
+        "keyword": keyword,
+        "created": _recent(rng),
+    }
+
+
+def make_reddit_post(rng: random.Random, keyword: str, url: str = None) -> dict:
+    """
+    Generate the content of a reddit post, independent of any actor's output schema.
+    """
+    post_id = f"t3_{rng.randrange(36 ** 6, 36 ** 7):x}"
+    if url and "/comments/" in url:
+        post_id = "t3_" + url.split("/comments/")[1].split("/")[0]
+    community = rng.choice(["bittensor_", "CryptoCurrency", "MachineLearning", "technology"])
+    return {
+        "id": post_id,
+        "url": url or f"https://www.reddit.com/r/{community}/comments/{post_id[3:]}/",
+        "username": f"redditor{rng.randrange(10000)}",
+        "community": community,
+        "title": _words(rng, keyword, 6),
+        "text": _words(rng, keyword, 30),
+        "likes": rng.randrange(500),
+        "keyword": keyword,
+        "created": _recent(rng, 6 * 3600),
+    }
+
+
+def tweet_flash_item(post: dict) -> dict:
+    return {
+        "tweet_id": post["id"],
+        "url": post["url"],
+        "text": post["text"],
+        "likes": post["likes"],
+        "images": [],
+        "username": post["username"],
+        "tweet_hashtags": [f"#{post['keyword']}"] if post["keyword"] else [],
+        "timestamp": post["created"].strftime("%Y-%m-%d %H:%M:%S+00:00"),
+    }
+
+
+def microworlds_item(post: dict) -> dict:
+    return {
+        "id_str": post["id"],
+        "url": post["url"],
+        "full_text": post["text"],
+        "favorite_count": post["likes"],
+        "user": {"screen_name": post["username"]},
+        "entities": {"hashtags": [{"text": post["keyword"]}] if post["keyword"] else [], "media": []},
+        "created_at": post["created"].strftime("%a %b %d %H:%M:%S %z %Y"),
+    }
+
+
+def apidojo_item(post: dict) -> dict:
+    return {
+        "id": post["id"],
+        "twitterUrl": post["url"],
+        "text": post["text"],
+        "likeCount": post["likes"],
+        "author": {"userName": post["username"]},
+        "entities": {"hashtags": [{"text": post["keyword"]}] if post["keyword"] else [], "media": []},
+        "createdAt": post["created"].strftime("%a %b %d %H:%M:%S %z %Y"),
+    }
+
+
+def web_harvester_item(post: dict) -> dict:
+    return {
+        "id": post["id"],
+        "url": post["url"],
+        "text": post["text"],
+        "likes": post["likes"],
+        "timestamp": post["created"].strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+    }
+
+
+def reddit_item(post: dict) -> dict:
+    return {
+        "id": post["id"],
+        "url": post["url"],
+        "body": post["text"],
+        "upVotes": post["likes"],
+        "dataType": "post",
+        "communityName": f"r/{post['community']}",
+        "username": post["username"],
+        "parentId": None,
+        "createdAt": post["created"].strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+    }
+
+
+def epctex_item(post: dict) -> dict:
+    return {
+        "id": post["id"],
+        "url": post["url"],
+        "title": post["title"],
+        "text": post["text"],
+        "score": post["likes"],
+        "type": "post",
+        "createdAt": int(post["created"].timestamp()),
+        "comments": [],
+    }
+
+
+# Fixture generators for each actor id used in neurons/apify: how to make a post, and how to render it in the
+# schema the actor's map() reads
+FIXTURES = {
+    "wHMoznVs94gOcxcZl": (make_tweet, tweet_flash_item),  # TweetFlashQuery
+    "2s3kSMq7tpuC3bI6M": (make_tweet, tweet_flash_item),  # TweetScraperQuery
+    "heLL6fUofdPgRXZie": (make_tweet, microworlds_item),  # MicroworldsTwitterScraper
+    "61RPP7dywgiy0JPD0": (make_tweet, apidojo_item),  # ApiDojoTweetScraper
+    "VsTreSuczsXhhRIqa": (make_tweet, web_harvester_item),  # WebHarvesterTwitterScraperQuery
+    "oAuCIx3ItNrs2okjQ": (make_reddit_post, reddit_item),  # RedditScraperLite
+    "FgJtjDwJCLhRH9saM": (make_reddit_post, reddit_item),  # RedditScraper
+    "jwR5FKaWaGSmkeq2b": (make_reddit_post, epctex_item),  # EpctexRedditScraper
+}
+
+KEYWORD_INPUTS = ["queries", "searchTerms", "searchQueries", "searches", "search"]
+URL_INPUTS = ["tweet_urls", "urls", "startUrls"]
+COUNT_INPUTS = ["max_tweets", "maxTweets", "maxItems", "tweetsDesired", "maxPostCount"]
+
+
+class StandInRun:
+    """
+    A simulated actor run. Its status and the number of items visible in its dataset follow from the time
+    elapsed since it was started, so items appear gradually like in a real run.
+    """
+
+    def __init__(self, actor_id: str, items: list, queue_secs: float, duration: float, fails: bool, timeout_secs: float, memory_mbytes: int):
+        self.id = uuid.uuid4().hex[:17]
+        self.dataset_id = uuid.uuid4().hex[:17]
+        self.actor_id = actor_id
+        self.items = items
+        self.created_at = time.time()
+        self.queue_secs = queue_secs
+        self.duration = duration if not timeout_secs else min(duration, timeout_secs)
+        self.timed_out = bool(timeout_secs) and duration > timeout_secs
+        self.fails = fails
+        self.memory_mbytes = memory_mbytes or 1024
+        self.aborted_at = None
+
+    def _now(self) -> float:
+        return self.aborted_at if self.aborted_at is not None else time.time()
+
+    def running_secs(self) -> float:
+        return min(self.duration, max(0.0, self._now() - self.created_at - self.queue_secs))
+
+    def status(self) -> str:
+        if self.aborted_at is not None:
+            return "ABORTED"
+        elapsed = time.time() - self.created_at
+        if elapsed < self.queue_secs:
+            return "READY"
+        if elapsed < self.queue_secs + self.duration:
+            return "RUNNING"
+        if self.timed_out:
+            return "TIMED-OUT"
+        return "FAILED" if self.fails else "SUCCEEDED"
+
+    def visible_items(self) -> list:
+        """
+        Items written so far. A failing run stops writing halfway.
+        """
+        progress = self.running_secs() / self.duration if self.duration > 0 else 1.0
+        if self.fails:
+            progress = min(progress, 0.5)
+        return self.items[:int(len(self.items) * progress)]
+
+    def to_dict(self) -> dict:
+        status = self.status()
+        run_secs = self.running_secs()
+        started_at = self.created_at + self.queue_secs
+        finished = status not in ("READY", "RUNNING")
+        iso = lambda t: datetime.fromtimestamp(t, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        return {
+            "id": self.id,
+            "actId": self.actor_id,
+            "status": status,
+            "startedAt": iso(started_at) if status != "READY" else None,
+            "finishedAt": iso(started_at + run_secs) if finished else None,
+            "defaultDatasetId": self.dataset_id,
+            "defaultKeyValueStoreId": self.dataset_id,
+            "options": {"memoryMbytes": self.memory_mbytes},
+            "stats": {
+                "runTimeSecs": round(run_secs, 3),
+                # Apify bills one compute unit per GB-hour
+                "computeUnits": round(self.memory_mbytes / 1024 * run_secs / 3600, 6),
+                "memAvgBytes": self.memory_mbytes * 2 ** 20 * 0.4,
+                "memMaxBytes": self.memory_mbytes * 2 ** 20 * 0.7,
+            },
+            "usageTotalUsd": round(self.memory_mbytes / 1024 * run_secs / 3600 * 0.4, 6),
+        }
+
+
+class StandInApify:
+    """
+    State of the stand-in: the runs, their datasets, and the knobs shaping them.
+    """
+
+    def __init__(self, latency: float = 5.0, jitter: float = 0.3, queue: float = 0.5, failure_rate: float = 0.0,
+                 item_count: int = None, seed: int = None):
+        """
+        Initialize the StandInApify.
+
+        Args:
+            latency (float, optional): Median seconds an actor runs. Defaults to 5.
+            jitter (float, optional): Spread of the run time, as the sigma of a log-normal distribution. Defaults to 0.3.
+            queue (float, optional): Seconds a run waits in READY status before it starts. Defaults to 0.5.
+            failure_rate (float, optional): Share of runs that end FAILED. Defaults to 0.
+            item_count (int, optional): Items produced by every search run, instead of the count asked for in the run input. Defaults to None.
+            seed (int, optional): Seed for reproducible fixtures and timings. Defaults to None.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.queue = queue
+        self.failure_rate = failure_rate
+        self.item_count = item_count
+        self.rng = random.Random(seed)
+        self.runs = {}
+        self.datasets = {}
+        # Posts served so far by url, so url lookups return what an earlier search returned
+        self.posts_by_url = {}
+        self._lock = threading.Lock()
+
+    def _search_items(self, actor_id: str, run_input: dict) -> list:
+        make_post, render = FIXTURES.get(actor_id, FIXTURES["wHMoznVs94gOcxcZl"])
+        urls = []
+        for key in URL_INPUTS:
+            for url in run_input.get(key) or []:
+                urls.append(url["url"] if isinstance(url, dict) else url)
+        if urls:
+            # Url lookups return the posts an earlier search served, rendered in this actor's schema
+            return [render(self.posts_by_url.get(url) or make_post(self.rng, "", url)) for url in urls]
+
+        keywords = []
+        for key in KEYWORD_INPUTS:
+            value = run_input.get(key)
+            if value:
+                keywords = [value] if isinstance(value, str) else list(value)
+                break
+        keywords = keywords or ["bittensor"]
+        count = self.item_count
+        if count is None:
+            count = next((int(run_input[key]) for key in COUNT_INPUTS if run_input.get(key)), 15)
+        posts = [make_post(self.rng, keywords[i % len(keywords)]) for i in range(count)]
+        for post in posts:
+            self.posts_by_url[post["url"]] = post
+        return [render(post) for post in posts]
+
+    def start_run(self, actor_id: str, run_input: dict, timeout_secs: float = None, memory_mbytes: int = None) -> StandInRun:
+        with self._lock:
+            items = self._search_items(actor_id, run_input)
+            duration = self.latency * math.exp(self.rng.gauss(0, self.jitter)) if self.jitter else self.latency
+            fails = self.rng.random() < self.failure_rate
+            run = StandInRun(actor_id, items, self.queue, duration, fails, timeout_secs, memory_mbytes)
+            self.runs[run.id] = run
+            self.datasets[run.dataset_id] = run
+        logger.info(f"Started run {run.id} of {actor_id}: {len(items)} items in {duration:.1f}s{' (fails)' if fails else ''}")
+        return run
+
+    def wait_for_run(self, run: StandInRun, wait_secs: float):
+        deadline = time.time() + wait_secs
+        while run.status() in ("READY", "RUNNING") and time.time() < deadline:
+            time.sleep(min(0.1, max(0.0, deadline - time.time())))
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Serves the Apify REST endpoints used by ApifyClient/ApifyClientAsync: starting actor runs, getting (and
+    waiting for) runs, aborting runs, listing dataset items and listing actors.
+    """
+
+    apify: StandInApify = None
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send(self, status: int, body, headers: dict = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _not_found(self):
+        self._send(404, {"error": {"type": "record-not-found", "message": f"{self.path} was not found"}})
+
+    def _route(self) -> tuple:
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if parts and parts[0] == "v2":
+            parts = parts[1:]
+        return parts, query
+
+    def do_GET(self):
+        parts, query = self._route()
+        if parts == ["acts"]:
+            return self._send(200, {"data": {"total": len(FIXTURES), "offset": 0, "limit": 1000, "count": len(FIXTURES), "desc": False,
+                                             "items": [{"id": actor_id} for actor_id in FIXTURES]}})
+        if len(parts) == 2 and parts[0] == "actor-runs":
+            run = self.apify.runs.get(parts[1])
+            if run is None:
+                return self._not_found()
+            if "waitForFinish" in query:
+                self.apify.wait_for_run(run, min(60.0, float(query["waitForFinish"])))
+            return self._send(200, {"data": run.to_dict()})
+        if len(parts) == 3 and parts[0] == "datasets" and parts[2] == "items":
+            run = self.apify.datasets.get(parts[1])
+            if run is None:
+                return self._not_found()
+            items = run.visible_items()
+            offset = int(query.get("offset", 0))
+            limit = int(query["limit"]) if query.get("limit") else len(items)
+            page = items[offset:offset + limit]
+            if query.get("fields"):
+                fields = query["fields"].split(",")
+                page = [{key: item[key] for key in fields if key in item} for item in page]
+            return self._send(200, page, {
+                "x-apify-pagination-total": len(items),
+                "x-apify-pagination-offset": offset,
+                "x-apify-pagination-count": len(page),
+                "x-apify-pagination-limit": limit,
+                "x-apify-pagination-desc": "false",
+            })
+        self._not_found()
+
+    def do_POST(self):
+        parts, query = self._route()
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if len(parts) == 3 and parts[0] == "acts" and parts[2] == "runs":
+            run_input = json.loads(body) if body else {}
+            actor_id = parts[1].split("~")[-1]
+            run = self.apify.start_run(
+                actor_id, run_input,
+                timeout_secs = float(query["timeout"]) if query.get("timeout") else None,
+                memory_mbytes = int(query["memory"]) if query.get("memory") else None,
+            )
+            if "waitForFinish" in query:
+                self.apify.wait_for_run(run, min(60.0, float(query["waitForFinish"])))
+            return self._send(201, {"data": run.to_dict()})
+        if len(parts) == 3 and parts[0] == "actor-runs" and parts[2] == "abort":
+            run = self.apify.runs.get(parts[1])
+            if run is None:
+                return self._not_found()
+            if run.status() in ("READY", "RUNNING"):
+                run.aborted_at = time.time()
+            return self._send(200, {"data": run.to_dict()})
+        self._not_found()
+
+
+class StandInServer:
+    """
+    Runs the stand-in on a background thread, e.g. from a benchmark script.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, **knobs):
+        """
+        Initialize the StandInServer.
+
+        Args:
+            host (str, optional): Address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): Port to listen on, 0 for any free port. Defaults to 8765.
+            **knobs: Passed to StandInApify (latency, jitter, queue, failure_rate, item_count, seed).
+        """
+        self.apify = StandInApify(**knobs)
+        handler = type("BoundStandInHandler", (StandInHandler,), {"apify": self.apify})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local stand-in for the Apify API.")
+    parser.add_argument('--host', type=str, default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on.")
+    parser.add_argument('--latency', type=float, default=5.0, help="Median seconds an actor runs.")
+    parser.add_argument('--jitter', type=float, default=0.3, help="Spread of the run time (log-normal sigma).")
+    parser.add_argument('--queue', type=float, default=0.5, help="Seconds a run waits before it starts.")
+    parser.add_argument('--failure_rate', type=float, default=0.0, help="Share of runs that fail.")
+    parser.add_argument('--items', type=int, default=None, help="Items per search run, instead of the count in the run input.")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible fixtures and timings.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = StandInServer(
+        args.host, args.port,
+        latency = args.latency, jitter = args.jitter, queue = args.queue,
+        failure_rate = args.failure_rate, item_count = args.items, seed = args.seed,
+    )
+    print(f"Apify stand-in listening on {server.url}, run the neurons with APIFY_API_BASE_URL={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,186 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+# Who started the actor runs in the current context, e.g. "miner_forward" or "validator_spot_check". See `actor_caller`.
+_caller = ContextVar("actor_caller", default="unknown")
+
+
+@contextmanager
+def actor_caller(caller: str):
+    """
+    Tag actor runs started inside the block, including runs in tasks created inside it, with `caller`.
+    """
+    token = _caller.set(caller)
+    try:
+        yield
+    finally:
+        _caller.reset(token)
+
+
+def current_caller() -> str:
+    return _caller.get()
+
+
+class RunStats:
+    """
+    Totals over the actor runs of one (actor_id, caller) pair.
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.items = 0
+        self.bytes = 0
+        self.queue_secs = 0.0
+        self.run_secs = 0.0
+        self.fetch_secs = 0.0
+        self.compute_units = 0.0
+        self.usage_usd = 0.0
+        self.memory_max_mbytes = 0.0
+
+    def add(self, run: dict):
+        self.runs += 1
+        self.failures += int(run["failed"])
+        self.items += run["items"]
+        self.bytes += run["bytes"]
+        self.queue_secs += run["queue_secs"]
+        self.run_secs += run["run_secs"]
+        self.fetch_secs += run["fetch_secs"]
+        self.compute_units += run["compute_units"]
+        self.usage_usd += run["usage_usd"]
+        self.memory_max_mbytes = max(self.memory_max_mbytes, run["memory_max_mbytes"])
+
+    def to_dict(self) -> dict:
+        runs = max(1, self.runs)
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "items": self.items,
+            "bytes": self.bytes,
+            "compute_units": round(self.compute_units, 4),
+            "usage_usd": round(self.usage_usd, 4),
+            "memory_max_mbytes": round(self.memory_max_mbytes, 1),
+            "avg_queue_secs": round(self.queue_secs / runs, 2),
+            "avg_run_secs": round(self.run_secs / runs, 2),
+            "avg_fetch_secs": round(self.fetch_secs / runs, 2),
+            "avg_items": round(self.items / runs, 1),
+            "compute_units_per_item": round(self.compute_units / self.items, 5) if self.items else None,
+        }
+
+
+class ActorTelemetry:
+    """
+    Collects cost and latency figures of every actor run made through `neurons.apify.actors`, tagged by actor id
+    and caller.
+
+    Totals since startup are available from `snapshot()` (and `write()` for a JSON file other tools can read).
+    `log_summary()` logs the runs since its previous call, so the logs show a rolling picture.
+    """
+
+    def __init__(self):
+        self._totals = {}
+        self._window = {}
+        self._window_started = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, actor_id: str, run: dict = None, queue_secs: float = 0.0, run_secs: float = None, fetch_secs: float = 0.0,
+               items: list = None, failed: bool = False, caller: str = None):
+        """
+        Record one actor run.
+
+        Args:
+            actor_id (str): The ID of the actor.
+            run (dict, optional): The latest run object from Apify, for its usage stats. Defaults to None.
+            queue_secs (float, optional): Seconds between requesting the run and the actor starting. Defaults to 0.
+            run_secs (float, optional): Seconds the actor ran. Defaults to the run's own runTimeSecs.
+            fetch_secs (float, optional): Seconds spent downloading the dataset. Defaults to 0.
+            items (list, optional): The downloaded items. Defaults to None.
+            failed (bool, optional): Whether the run raised. Defaults to False.
+            caller (str, optional): Caller tag. Defaults to the one set with `actor_caller`.
+        """
+        stats = (run or {}).get("stats") or {}
+        items = items or []
+        entry = {
+            "failed": failed,
+            "items": len(items),
+            # Size of the items as JSON, close to what was transferred
+            "bytes": len(json.dumps(items, default=str)) if items else 0,
+            "queue_secs": max(0.0, queue_secs),
+            "run_secs": stats.get("runTimeSecs", 0.0) if run_secs is None else run_secs,
+            "fetch_secs": fetch_secs,
+            "compute_units": stats.get("computeUnits") or 0.0,
+            "usage_usd": (run or {}).get("usageTotalUsd") or 0.0,
+            "memory_max_mbytes": (stats.get("memMaxBytes") or 0) / 2 ** 20,
+        }
+        key = (actor_id, caller or current_caller())
+        with self._lock:
+            self._totals.setdefault(key, RunStats()).add(entry)
+            self._window.setdefault(key, RunStats()).add(entry)
+
+    def snapshot(self) -> dict:
+        """
+        Return the totals since startup as {actor_id: {caller: stats}}.
+        """
+        with self._lock:
+            result = {}
+            for (actor_id, caller), stats in self._totals.items():
+                result.setdefault(actor_id, {})[caller] = stats.to_dict()
+            return result
+
+    def write(self, path: str):
+        """
+        Write `snapshot()` to `path` as JSON.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"updated_at": time.time(), "actors": self.snapshot()}, f)
+        os.replace(tmp_path, path)
+
+    def log_summary(self, log=None):
+        """
+        Log one line per (actor_id, caller) pair with the runs since the previous summary, then start a new window.
+
+        Args:
+            log (callable, optional): Logging function. Defaults to this module's logger.info.
+        """
+        log = log or logger.info
+        with self._lock:
+            window, self._window = self._window, {}
+            elapsed = time.time() - self._window_started
+            self._window_started = time.time()
+        if not window:
+            return
+        log(f"Actor runs in the last {elapsed:.0f}s:")
+        for (actor_id, caller), stats in sorted(window.items()):
+            log(f"  {actor_id} ({caller}): {stats.to_dict()}")
+
+
+# Process-wide telemetry fed by neurons.apify.actors
+telemetry = ActorTelemetry()
@@ -1,8 +1,7 @@
 import logging
 from neurons.apify.actors import run_actor, run_actor_async, ActorConfig
-from datetime import datetime, timezone
+from neurons.apify.mapping import Mapper, Field, hashtags, images, twitter_date
 import asyncio
-import bittensor as bt
 
 # Setting up logger for debugging and information purposes
 logger = logging.getLogger(__name__)
@@ -15,11 +14,25 @@ class ApiDojoTweetScraper:
         actor_config (ActorConfig): Configuration settings specific to the Apify actor.
     """
 
+    # Output field <- actor item field
+    mapper = Mapper("apidojo_tweet", {
+        'id': 'id',
+        'url': 'twitterUrl',
+        'text': Field('text', default=None),
+        'likes': 'likeCount',
+        'images': Field(transform=images("extendedEntities")),
+        'username': 'author.userName',
+        'hashtags': Field('entities', default={}, transform=hashtags),
+        'timestamp': Field('createdAt', transform=twitter_date),
+    })
+
     def __init__(self):
         """
         Initialize the ApiDojoTweetScraper.
         """
         self.actor_config = ActorConfig("61RPP7dywgiy0JPD0")
+        # Only download the fields map() reads
+        self.actor_config.fields = ["id", "twitterUrl", "text", "likeCount", "author", "entities", "extendedEntities", "createdAt"]
         self.actor_config.timeout_secs = 120
 
 
@@ -45,46 +58,42 @@ class ApiDojoTweetScraper:
         results = asyncio.run(self.searchBatch(urls))
         return self.map(results)
     
-    def format_date(self, date: datetime):
-        date = date.replace(tzinfo=timezone.utc)
-        return date.isoformat(sep=' ', timespec='seconds')
-
-    def map_item(self, item) -> dict:
-        try:
-            hashtags = ["#" + x["text"] for x in item.get("entities", {}).get('hashtags', [])]
-
-            images = []
-
-            extended_entities = item.get("extendedEntities")
-            if extended_entities:
-                media_urls = {m["media_key"]: m["media_url_https"] for m in extended_entities["media"] if m.get("media_url_https")}
-
-            for media in item.get("entities", {}).get('media', []):
-                media_key = media.get("media_key")
-                if media_key:
-                    images.append(media_urls[media_key])
+    def build_run_input(self, search_queries: list, limit_number: int) -> dict:
+        """
+        Build the actor input for a search.
+        """
+        return {
+            "maxItems": limit_number,
+            "onlyImage": False,
+            "onlyQuote": False,
+            "onlyTwitterBlue": False,
+            "onlyVerifiedUsers": False,
+            "onlyVideo": False,
+            "searchTerms": search_queries,
+            "sort": "Latest"
+        }
 
+    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Search for tweets using search terms.
 
-            date_format = "%a %b %d %H:%M:%S %z %Y"
-            parsed_date = datetime.strptime(item["createdAt"], date_format)
+        Args:
+            search_queries (list, optional): A list of search terms to be queried. Defaults to ["bittensor"].
 
-            return {
-                'id': item['id'], 
-                'url': item['twitterUrl'], 
-                'text': item.get('text'), 
-                'likes': item['likeCount'], 
-                'images': images, 
-                'username': item['author']['userName'],
-                'hashtags': hashtags,
-                'timestamp': self.format_date(parsed_date)
-            } 
-        except Exception as e:
-            bt.logging.error(f"❌ Error while converting tweet to sn3 model: {e}, tweet = {item}")
+        Returns:
+            list: A list of tweets.
+        """
+        return self.map(run_actor(self.actor_config, self.build_run_input(search_queries, limit_number)))
 
+    async def execute_async(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Same as `execute`, without blocking the event loop while the actor runs.
+        """
+        return self.map(await run_actor_async(self.actor_config, self.build_run_input(search_queries, limit_number), map_fn=self.map))
 
     def map(self, input: list) -> list:
         """
-        Map the input data to the expected sn3 format.
+        Map the input data to the expected sn3 format. Malformed items are skipped.
 
         Args:
             input (list): The data to potentially map or transform.
@@ -92,13 +101,7 @@ class ApiDojoTweetScraper:
         Returns:
             list: The mapped or transformed data.
         """
-        filtered_input = []
-        for item in input:
-            sn3_item = self.map_item(item)
-            if sn3_item:
-                filtered_input.append(sn3_item)
-
-        return filtered_input
+        return self.mapper.map(input)
 
 
 if __name__ == '__main__':
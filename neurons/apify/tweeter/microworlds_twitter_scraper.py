@@ -1,6 +1,6 @@
 import logging
 from neurons.apify.actors import run_actor, run_actor_async, ActorConfig
-from datetime import datetime, timezone
+from neurons.apify.mapping import Mapper, Field, hashtags, images, twitter_date
 import asyncio
 
 # Setting up logger for debugging and information purposes
@@ -14,11 +14,25 @@ class MicroworldsTwitterScraper:
         actor_config (ActorConfig): Configuration settings specific to the Apify actor.
     """
 
+    # Output field <- actor item field
+    mapper = Mapper("microworlds_twitter", {
+        'id': 'id_str',
+        'url': 'url',
+        'text': Field('truncated_full_text', 'full_text'),
+        'likes': 'favorite_count',
+        'images': Field(transform=images("extended_entities")),
+        'username': 'user.screen_name',
+        'hashtags': Field('entities', default={}, transform=hashtags),
+        'timestamp': Field('created_at', transform=twitter_date),
+    })
+
     def __init__(self):
         """
         Initialize the MicroworldsTwitterScraper.
         """
         self.actor_config = ActorConfig("heLL6fUofdPgRXZie")
+        # Only download the fields map() reads
+        self.actor_config.fields = ["id_str", "url", "truncated_full_text", "full_text", "favorite_count", "user", "entities", "extended_entities", "created_at"]
         #self.actor_config.memory_mbytes = 256
         #self.actor_config.timeout_secs = 30
 
@@ -44,17 +58,11 @@ class MicroworldsTwitterScraper:
         return self.map(flattened_results)
         
     
-    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+    def build_run_input(self, search_queries: list, limit_number: int) -> dict:
         """
-        Search for tweets using search terms.
-
-        Args:
-            search_queries (list, optional): A list of search terms to be queried. Defaults to ["bittensor"].
-
-        Returns:
-            list: A list of tweets.
+        Build the actor input for a search.
         """
-        run_input = {
+        return {
             "maxRequestRetries": 3,
             "searchMode": "live",
             "scrapeTweetReplies": True,
@@ -62,45 +70,27 @@ class MicroworldsTwitterScraper:
             "maxTweets": limit_number
         }
 
-        return self.map(run_actor(self.actor_config, run_input))
-    
-    def format_date(self, date: datetime):
-        date = date.replace(tzinfo=timezone.utc)
-        return date.isoformat(sep=' ', timespec='seconds')
-
-    
-    def map_item(self, item) -> dict:
-        hashtags = ["#" + x["text"] for x in item.get("entities", {}).get('hashtags', [])]
-
-        images = []
-
-        extended_entities = item.get("extended_entities")
-        if extended_entities:
-            media_urls = {m["media_key"]: m["media_url_https"] for m in extended_entities["media"] if m.get("media_url_https")}
-
-        for media in item.get("entities", {}).get('media', []):
-            media_key = media.get("media_key")
-            if media.get("media_key"):
-                images.append(media_urls[media_key])
-
+    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Search for tweets using search terms.
 
-        date_format = "%a %b %d %H:%M:%S %z %Y"
-        parsed_date = datetime.strptime(item["created_at"], date_format)
+        Args:
+            search_queries (list, optional): A list of search terms to be queried. Defaults to ["bittensor"].
 
-        return {
-            'id': item['id_str'], 
-            'url': item['url'], 
-            'text': item.get('truncated_full_text') or item['full_text'], 
-            'likes': item['favorite_count'], 
-            'images': images, 
-            'username': item['user']['screen_name'],
-            'hashtags': hashtags,
-            'timestamp': self.format_date(parsed_date)
-        } 
+        Returns:
+            list: A list of tweets.
+        """
+        return self.map(run_actor(self.actor_config, self.build_run_input(search_queries, limit_number)))
 
+    async def execute_async(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Same as `execute`, without blocking the event loop while the actor runs.
+        """
+        return self.map(await run_actor_async(self.actor_config, self.build_run_input(search_queries, limit_number), map_fn=self.map))
+    
     def map(self, input: list) -> list:
         """
-        Map the input data to the expected sn3 format.
+        Map the input data to the expected sn3 format. Malformed items are skipped.
 
         Args:
             input (list): The data to potentially map or transform.
@@ -108,8 +98,7 @@ class MicroworldsTwitterScraper:
         Returns:
             list: The mapped or transformed data.
         """
-        filtered_input = [self.map_item(item) for item in input]
-        return filtered_input
+        return self.mapper.map(input)
 
 
 if __name__ == '__main__':
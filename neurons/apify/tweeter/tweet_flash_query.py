@@ -1,5 +1,6 @@
 import logging
-from neurons.apify.actors import run_actor, ActorConfig
+from neurons.apify.actors import run_actor, run_actor_async, ActorConfig
+from neurons.apify.mapping import Mapper
 
 # Setting up logger for debugging and information purposes
 logger = logging.getLogger(__name__)
@@ -12,11 +13,25 @@ class TweetFlashQuery:
         actor_config (ActorConfig): Configuration settings specific to the Apify actor.
     """
 
+    # Output field <- actor item field
+    mapper = Mapper("tweet_flash", {
+        'id': 'tweet_id',
+        'url': 'url',
+        'text': 'text',
+        'likes': 'likes',
+        'images': 'images',
+        'username': 'username',
+        'hashtags': 'tweet_hashtags',
+        'timestamp': 'timestamp',
+    })
+
     def __init__(self):
         """
         Initialize the TweetFlashQuery.
         """
         self.actor_config = ActorConfig("wHMoznVs94gOcxcZl")
+        # Only download the fields map() reads
+        self.actor_config.fields = ["tweet_id", "url", "text", "likes", "images", "username", "tweet_hashtags", "timestamp"]
         self.actor_config.memory_mbytes = 256
         self.actor_config.timeout_secs = 30
 
@@ -49,17 +64,11 @@ class TweetFlashQuery:
             }
         return self.map(run_actor(self.actor_config, run_input))
     
-    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+    def build_run_input(self, search_queries: list, limit_number: int) -> dict:
         """
-        Search for tweets using search terms.
-
-        Args:
-            search_queries (list, optional): A list of search terms to be queried. Defaults to ["bittensor"].
-
-        Returns:
-            list: A list of tweets.
+        Build the actor input for a search.
         """
-        run_input = {
+        return {
             "collect_user_info": False,
             "detect_language": False,
             "filter:blue_verified": False,
@@ -84,12 +93,27 @@ class TweetFlashQuery:
             "max_attempts": 5
         }
 
-        return self.map(run_actor(self.actor_config, run_input))
+    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Search for tweets using search terms.
+
+        Args:
+            search_queries (list, optional): A list of search terms to be queried. Defaults to ["bittensor"].
+
+        Returns:
+            list: A list of tweets.
+        """
+        return self.map(run_actor(self.actor_config, self.build_run_input(search_queries, limit_number)))
+
+    async def execute_async(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Same as `execute`, without blocking the event loop while the actor runs.
+        """
+        return self.map(await run_actor_async(self.actor_config, self.build_run_input(search_queries, limit_number), map_fn=self.map))
 
     def map(self, input: list) -> list:
         """
-        Potentially map the input data as needed. As of now, this method serves as a placeholder and simply returns the
-        input data directly.
+        Map the input data to the expected sn3 format. Malformed items are skipped.
 
         Args:
             input (list): The data to potentially map or transform.
@@ -97,17 +121,7 @@ class TweetFlashQuery:
         Returns:
             list: The mapped or transformed data.
         """
-        filtered_input = [{
-            'id': item['tweet_id'], 
-            'url': item['url'], 
-            'text': item['text'], 
-            'likes': item['likes'], 
-            'images': item['images'], 
-            'username': item['username'],
-            'hashtags': item['tweet_hashtags'],
-            'timestamp': item['timestamp']
-        } for item in input]
-        return filtered_input
+        return self.mapper.map(input)
 
 
 if __name__ == '__main__':
@@ -1,4 +1,5 @@
-from neurons.apify.actors import run_actor, ActorConfig
+from neurons.apify.actors import run_actor, run_actor_async, ActorConfig
+from neurons.apify.mapping import Mapper
 
 
 class TweetScraperQuery:
@@ -9,65 +10,87 @@ class TweetScraperQuery:
         actor_config (ActorConfig): Configuration settings specific to the Apify actor.
     """
 
+    # Output field <- actor item field
+    mapper = Mapper("tweet_scraper", {
+        'id': 'tweet_id',
+        'url': 'url',
+        'text': 'text',
+        'likes': 'likes',
+        'images': 'images',
+        'timestamp': 'timestamp',
+    })
+
     def __init__(self):
         """
         Initialize the TweetScraperQuery.
         """
         self.actor_config = ActorConfig("2s3kSMq7tpuC3bI6M")
+        # Only download the fields map() reads
+        self.actor_config.fields = ["tweet_id", "url", "text", "likes", "images", "timestamp"]
 
-    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15) -> list:
+    def build_run_input(self, search_queries: list, limit_number: int) -> dict:
         """
-        Execute the tweet scraping process using the specified search queries.
-
-        Args:
-            search_queries (list, optional): A list of search terms to be queried. Defaults to ["bittensor"].
-
-        Returns:
-            list: A list of scraped tweet data.
+        Build the actor input for a search.
         """
-        run_input = {
-            "excludeImages": false,
-            "excludeLinks": false,
-            "excludeMedia": false,
-            "excludeNativeRetweets": false,
-            "excludeNativeVideo": false,
-            "excludeNews": false,
-            "excludeProVideo": false,
-            "excludeQuote": false,
-            "excludeReplies": false,
-            "excludeSafe": false,
-            "excludeVerified": false,
-            "excludeVideos": false,
-            "images": false,
-            "includeUserId": true,
-            "includeUserInfo": true,
+        return {
+            "excludeImages": False,
+            "excludeLinks": False,
+            "excludeMedia": False,
+            "excludeNativeRetweets": False,
+            "excludeNativeVideo": False,
+            "excludeNews": False,
+            "excludeProVideo": False,
+            "excludeQuote": False,
+            "excludeReplies": False,
+            "excludeSafe": False,
+            "excludeVerified": False,
+            "excludeVideos": False,
+            "images": False,
+            "includeUserId": True,
+            "includeUserInfo": True,
             "language": "any",
-            "links": false,
-            "media": false,
-            "nativeRetweets": false,
-            "nativeVideo": false,
-            "news": false,
-            "proVideo": false,
+            "links": False,
+            "media": False,
+            "nativeRetweets": False,
+            "nativeVideo": False,
+            "news": False,
+            "proVideo": False,
             "proxyConfig": {
-                "useApifyProxy": true,
+                "useApifyProxy": True,
                 "apifyProxyGroups": [
                     "RESIDENTIAL"
                 ]
             },
-            "quote": false,
-            "replies": false,
-            "safe": false,
+            "quote": False,
+            "replies": False,
+            "safe": False,
             "searchQueries": search_queries,
             "tweetsDesired": 10,
-            "verified": false,
-            "videos": false
+            "verified": False,
+            "videos": False
         }
-        return self.map(run_actor(self.actor_config, run_input))
+
+    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Execute the tweet scraping process using the specified search queries.
+
+        Args:
+            search_queries (list, optional): A list of search terms to be queried. Defaults to ["bittensor"].
+
+        Returns:
+            list: A list of scraped tweet data.
+        """
+        return self.map(run_actor(self.actor_config, self.build_run_input(search_queries, limit_number)))
+
+    async def execute_async(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Same as `execute`, without blocking the event loop while the actor runs.
+        """
+        return self.map(await run_actor_async(self.actor_config, self.build_run_input(search_queries, limit_number), map_fn=self.map))
 
     def map(self, input: list) -> list:
         """
-        Potentially map the input data as needed. As of now, this method serves as a placeholder and simply returns the
-        input data directly.
+        Map the input data to the expected sn3 format. Malformed items are skipped.
 
         Args:
             input (list): The data to potentially map or transform.
@@ -75,8 +98,7 @@ class TweetScraperQuery:
         Returns:
             list: The mapped or transformed data.
         """
-        filtered_input = [{'id': item['tweet_id'], 'url': item['url'], 'text': item['text'], 'likes': item['likes'], 'images': item['images'], 'timestamp': item['timestamp']} for item in input]
-        return filtered_input
+        return self.mapper.map(input)
 
 
 if __name__ == '__main__':
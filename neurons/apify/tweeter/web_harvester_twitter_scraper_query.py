@@ -1,6 +1,6 @@
 import logging
-from datetime import datetime
 from neurons.apify.actors import run_actor, ActorConfig
+from neurons.apify.mapping import Mapper, Field, iso_to_str
 
 # Setting up logger for debugging and information purposes
 logger = logging.getLogger(__name__)
@@ -13,11 +13,22 @@ class WebHarvesterTwitterScraperQuery:
         actor_config (ActorConfig): Configuration settings specific to the Apify actor.
     """
 
+    # Output field <- actor item field
+    mapper = Mapper("web_harvester_twitter", {
+        'id': 'id',
+        'url': 'url',
+        'text': 'text',
+        'likes': 'likes',
+        'timestamp': Field('timestamp', transform=iso_to_str),
+    })
+
     def __init__(self):
         """
         Initialize the WebHarvesterTwitterScraperQuery.
         """
         self.actor_config = ActorConfig("VsTreSuczsXhhRIqa")
+        # Only download the fields map() reads
+        self.actor_config.fields = ["id", "url", "text", "likes", "timestamp"]
 
     def searchByUrl(self, urls: list = ["https://twitter.com/const_reborn/status/1725967725762134121", "https://twitter.com/opentensor/status/1713958073226649948"]):
         """
@@ -37,7 +48,7 @@ class WebHarvesterTwitterScraperQuery:
         }
         return self.map(run_actor(self.actor_config, run_input))
     
-    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15) -> list:
+    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
         """
         Execute the tweet query process using the specified search queries.
 
@@ -49,10 +60,15 @@ class WebHarvesterTwitterScraperQuery:
         """
         raise Exception("This actor does not support general search queries")
 
+    async def execute_async(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Same as `execute`.
+        """
+        raise Exception("This actor does not support general search queries")
+
     def map(self, input: list) -> list:
         """
-        Potentially map the input data as needed. As of now, this method serves as a placeholder and simply returns the
-        input data directly.
+        Map the input data to the expected sn3 format. Malformed items are skipped.
 
         Args:
             input (list): The data to potentially map or transform.
@@ -60,14 +76,7 @@ class WebHarvesterTwitterScraperQuery:
         Returns:
             list: The mapped or transformed data.
         """
-        filtered_input = [{
-            'id': item['id'], 
-            'url': item['url'], 
-            'text': item['text'], 
-            'likes': item['likes'],
-            'timestamp': str(datetime.fromisoformat(item['timestamp'].replace("Z", "+00:00")))
-            } for item in input]
-        return filtered_input
+        return self.mapper.map(input)
 
 
 if __name__ == '__main__':
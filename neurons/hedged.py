@@ -0,0 +1,190 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from neurons.queries import QueryProvider
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """
+    Keeps a window of recent successful run latencies and answers percentile queries over it.
+    """
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, p: float) -> float:
+        """
+        Return the `p` percentile (0..1) of the recorded latencies, or None without samples.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(p * (len(samples) - 1)))))
+        return samples[index]
+
+
+class HedgedQuery:
+    """
+    Races a backup provider against a slow primary provider.
+
+    The primary provider is started first. If it hasn't returned a valid (non-empty) result by the `percentile`
+    of its recent latencies, the backup provider is started as well, and whichever valid result lands first is
+    returned. The other run is cancelled, which aborts its Apify run.
+
+    Any attribute that is not overridden here is forwarded to the primary query.
+    """
+
+    def __init__(self, primary, primary_provider: QueryProvider, backup, backup_provider: QueryProvider,
+                 percentile: float = 0.9, default_delay: float = 20, min_delay: float = 3, max_delay: float = 40, min_samples: int = 10):
+        """
+        Initialize the HedgedQuery.
+
+        Args:
+            primary: The query object tried first.
+            primary_provider (QueryProvider): The provider of the primary query.
+            backup: The query object started when the primary is slow or fails.
+            backup_provider (QueryProvider): The provider of the backup query.
+            percentile (float, optional): Percentile of the primary's latency after which the backup is started. Defaults to 0.9.
+            default_delay (float, optional): Hedge delay in seconds until enough latencies are recorded. Defaults to 20.
+            min_delay (float, optional): Lower bound of the hedge delay in seconds. Defaults to 3.
+            max_delay (float, optional): Upper bound of the hedge delay in seconds. Defaults to 40.
+            min_samples (int, optional): Number of latencies needed before the percentile is used. Defaults to 10.
+        """
+        self.primary = primary
+        self.primary_provider = primary_provider
+        self.backup = backup
+        self.backup_provider = backup_provider
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.latency = {primary_provider: LatencyTracker(), backup_provider: LatencyTracker()}
+
+        self.hedged = 0
+        self.wins = {primary_provider: 0, backup_provider: 0}
+
+    def __getattr__(self, name):
+        return getattr(self.primary, name)
+
+    def hedge_delay(self) -> float:
+        """
+        Seconds to wait on the primary provider before starting the backup.
+        """
+        tracker = self.latency[self.primary_provider]
+        if len(tracker) < self.min_samples:
+            return self.default_delay
+        return min(self.max_delay, max(self.min_delay, tracker.percentile(self.percentile)))
+
+    def stats(self) -> dict:
+        return {
+            "hedge_delay": self.hedge_delay(),
+            "hedged": self.hedged,
+            "wins": {provider.value: wins for provider, wins in self.wins.items()},
+        }
+
+    async def _timed(self, query, provider: QueryProvider, args: tuple) -> list:
+        start = time.monotonic()
+        items = await query.execute_async(*args)
+        if items:
+            self.latency[provider].record(time.monotonic() - start)
+        return items
+
+    async def execute_async(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Search with the primary provider, hedging with the backup provider if the primary is slow.
+        """
+        args = (search_queries, limit_number, validator_key, validator_version, miner_uid)
+        primary_task = asyncio.ensure_future(self._timed(self.primary, self.primary_provider, args))
+        providers = {primary_task: self.primary_provider}
+        pending = {primary_task}
+
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_delay())
+            result, error = None, None
+            for task in done:
+                result, error = self._outcome(task)
+                if result:
+                    self.wins[self.primary_provider] += 1
+                    return result
+
+            # The primary is slow, failed or came back empty: start the backup and take the first valid result
+            self.hedged += 1
+            logger.info(f"Hedging {self.primary_provider.value} with {self.backup_provider.value} for {search_queries}")
+            backup_task = asyncio.ensure_future(self._timed(self.backup, self.backup_provider, args))
+            providers[backup_task] = self.backup_provider
+            pending.add(backup_task)
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task_result, task_error = self._outcome(task)
+                    if task_result:
+                        self.wins[providers[task]] += 1
+                        return task_result
+                    if task_error is not None:
+                        error = task_error
+                    elif result is None:
+                        result = task_result
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if result is not None:
+            return result
+        raise error
+
+    def _outcome(self, task: asyncio.Future) -> tuple:
+        """
+        Return (result, exception) for a finished task.
+        """
+        if task.exception() is not None:
+            logger.warning(f"Hedged run failed: {task.exception()}")
+            return None, task.exception()
+        return task.result(), None
+
+    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Search with the primary provider, falling back to the backup provider if it fails or returns nothing.
+        Sync callers such as the prewarmer aren't latency sensitive, so they aren't hedged.
+        """
+        try:
+            items = self.primary.execute(search_queries, limit_number, validator_key, validator_version, miner_uid)
+            if items:
+                return items
+        except Exception as e:
+            logger.warning(f"{self.primary_provider.value} failed, falling back to {self.backup_provider.value}: {e}")
+        return self.backup.execute(search_queries, limit_number, validator_key, validator_version, miner_uid)
@@ -0,0 +1,283 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from neurons.queries import QueryType
+from neurons.utils import timestamp_to_epoch
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    source TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    id TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    scraped_at INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (source, keyword, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS items_by_keyword_timestamp ON items (source, keyword, timestamp DESC);
+CREATE INDEX IF NOT EXISTS items_by_id ON items (source, id);
+CREATE TABLE IF NOT EXISTS keywords (
+    source TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    refreshed_at INTEGER NOT NULL,
+    PRIMARY KEY (source, keyword)
+) WITHOUT ROWID;
+"""
+
+
+def normalize_keyword(keyword: str) -> str:
+    return str(keyword).strip().lower()
+
+
+class ItemStore:
+    """
+    Embedded on-disk store for the normalized items produced by the scrapers' `map()` methods.
+
+    Items are indexed by (source, keyword, timestamp DESC) for "freshest N items for keyword K" lookups and by
+    (source, id). The store survives restarts, so a miner comes back up with a warm dataset.
+    """
+
+    def __init__(self, path: str, retention: float = 2 * 24 * 3600):
+        """
+        Initialize the ItemStore.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            retention (float, optional): Seconds an item is kept after it was scraped. Defaults to two days.
+        """
+        self.path = path
+        self.retention = retention
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        new_database = not os.path.exists(path)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if new_database:
+            # auto_vacuum can only be switched on before the first table is created
+            self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add(self, source: str, keywords: list, items: list) -> int:
+        """
+        Store items scraped for `keywords` and mark those keywords as refreshed. Items of a run that searched several
+        keywords are only filed under the keywords they mention, or under all of them if they mention none.
+
+        Args:
+            source (str): The source of the items, e.g. "twitter" or "reddit".
+            keywords (list): The search keys the items were scraped for.
+            items (list): The mapped items.
+
+        Returns:
+            int: The number of items written.
+        """
+        now = int(time.time())
+        keywords = [normalize_keyword(keyword) for keyword in keywords]
+        rows = []
+        written = 0
+        for item in items:
+            try:
+                item_id = str(item['id'])
+                timestamp = timestamp_to_epoch(item['timestamp'])
+                data = json.dumps(item)
+            except Exception as e:
+                logger.warning(f"Skipping item that can't be stored: {e}, item = {item}")
+                continue
+            item_keywords = keywords
+            if len(keywords) > 1:
+                text = json.dumps(item, ensure_ascii=False).lower()
+                item_keywords = [keyword for keyword in keywords if keyword in text] or keywords
+            for keyword in item_keywords:
+                rows.append((source, keyword, item_id, timestamp, now, data))
+            written += 1
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO keywords VALUES (?, ?, ?)",
+                    [(source, normalize_keyword(keyword), now) for keyword in keywords],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return written
+
+    def refreshed_at(self, source: str, keyword: str) -> float:
+        """
+        Return the epoch time `keyword` was last stored for `source`, or 0 if it never was.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT refreshed_at FROM keywords WHERE source = ? AND keyword = ?",
+                (source, normalize_keyword(keyword)),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def freshest(self, source: str, keyword: str, limit: int, max_age: float = None) -> list:
+        """
+        Return the `limit` newest items stored for `keyword`.
+
+        Args:
+            source (str): The source of the items.
+            keyword (str): The search key.
+            limit (int): Maximum number of items to return.
+            max_age (float, optional): Return None unless the keyword was refreshed within this many seconds. Defaults to None.
+
+        Returns:
+            list: The items, newest first, or None if the keyword is missing or older than `max_age`.
+        """
+        keyword = normalize_keyword(keyword)
+        with self._lock:
+            if max_age is not None:
+                row = self._conn.execute(
+                    "SELECT refreshed_at FROM keywords WHERE source = ? AND keyword = ?", (source, keyword)
+                ).fetchone()
+                if row is None or row[0] < time.time() - max_age:
+                    return None
+            rows = self._conn.execute(
+                "SELECT data FROM items WHERE source = ? AND keyword = ? ORDER BY timestamp DESC LIMIT ?",
+                (source, keyword, limit),
+            ).fetchall()
+        if not rows:
+            return None
+        return [json.loads(data) for (data,) in rows]
+
+    def get(self, source: str, item_id: str) -> dict:
+        """
+        Return a stored item by id, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM items WHERE source = ? AND id = ? LIMIT 1", (source, str(item_id))
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def expire(self) -> int:
+        """
+        Delete items scraped longer than `retention` seconds ago and give the freed pages back to the file system.
+
+        Returns:
+            int: The number of rows deleted.
+        """
+        cutoff = int(time.time() - self.retention)
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM items WHERE scraped_at < ?", (cutoff,)).rowcount
+            self._conn.execute("DELETE FROM keywords WHERE refreshed_at < ?", (cutoff,))
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            items = self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+            keywords = self._conn.execute("SELECT COUNT(*) FROM keywords").fetchone()[0]
+        return {"items": items, "keywords": keywords}
+
+
+class StoredQuery:
+    """
+    Wraps a query object and answers searches from an ItemStore when every search key was refreshed recently.
+    Live results are written back to the store.
+
+    Any attribute that is not overridden here is forwarded to the wrapped query.
+    """
+
+    def __init__(self, query, query_type: QueryType, store: ItemStore, max_age: float):
+        """
+        Initialize the StoredQuery.
+
+        Args:
+            query: The query object to wrap.
+            query_type (QueryType): The type of the wrapped query.
+            store (ItemStore): The store to read from and write to.
+            max_age (float): Serve stored items only for keywords refreshed within this many seconds.
+        """
+        self.query = query
+        self.query_type = query_type
+        self.source = query_type.name.lower()
+        self.store = store
+        self.max_age = max_age
+
+    def __getattr__(self, name):
+        return getattr(self.query, name)
+
+    def lookup(self, search_queries: list, limit_number: int) -> list:
+        """
+        Return the freshest stored items for the search, or None if any search key is missing or stale. With several
+        search keys, each gets an equal share of `limit_number`.
+        """
+        share = -(-limit_number // max(1, len(search_queries)))
+        merged = {}
+        for keyword in search_queries:
+            items = self.store.freshest(self.source, keyword, share, self.max_age)
+            if items is None:
+                return None
+            for item in items:
+                merged.setdefault(item['id'], item)
+        items = sorted(merged.values(), key=lambda item: timestamp_to_epoch(item['timestamp']), reverse=True)
+        return items[:limit_number]
+
+    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Return stored results for the search if they are fresh enough, otherwise run the wrapped query and store its result.
+        """
+        items = self.lookup(search_queries, limit_number)
+        if items is not None:
+            logger.info(f"Serving {len(items)} stored {self.source} items for {search_queries}")
+            return items
+
+        items = self.query.execute(search_queries, limit_number, validator_key, validator_version, miner_uid)
+        if items:
+            self.store.add(self.source, search_queries, items)
+        return items
+
+    async def execute_async(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Same as `execute`, awaiting the wrapped query's `execute_async` when the store can't answer. The SQLite reads
+        and writes run in a thread, so they don't block the other requests on the event loop.
+        """
+        items = await asyncio.to_thread(self.lookup, search_queries, limit_number)
+        if items is not None:
+            logger.info(f"Serving {len(items)} stored {self.source} items for {search_queries}")
+            return items
+
+        items = await self.query.execute_async(search_queries, limit_number, validator_key, validator_version, miner_uid)
+        if items:
+            await asyncio.to_thread(self.store.add, self.source, search_queries, items)
+        return items
@@ -23,6 +23,7 @@ DEALINGS IN THE SOFTWARE.
 import os
 import sys
 import time
+import asyncio
 import argparse
 import traceback
 import bittensor as bt
@@ -30,6 +31,15 @@ import scraping
 from typing import Tuple
 import torch
 from neurons.queries import get_query, QueryType, QueryProvider
+from neurons.apify.actors import actor_deadline, stream_items
+from neurons.apify.telemetry import actor_caller, telemetry
+from neurons.query_cache import QueryCache, CachedQuery
+from neurons.prewarm import KeywordPrewarmer, PrewarmJob, load_keywords
+from neurons.item_store import ItemStore, StoredQuery
+from neurons.single_flight import SingleFlight, SingleFlightQuery
+from neurons.hedged import HedgedQuery
+from neurons.router import ProviderRouter
+from neurons.admission import AdmissionControl
 # TODO: Check if all the necessary libraries are installed and up-to-date
 
 def get_config():
@@ -41,6 +51,42 @@ def get_config():
     # Adds override arguments for network and netuid.
     parser.add_argument( '--netuid', type = int, default = 3, help = "The chain subnet uid." )
     parser.add_argument( '--auto-update', type = str, default = True, help = "Set to \"no\" to disable auto update.")
+    # Adds result cache arguments. Validators draw keywords from the same list, so repeated searches are common.
+    parser.add_argument( '--cache.off', action = 'store_true', default = False, help = "Disable the scrape result cache." )
+    parser.add_argument( '--cache.max_items', type = int, default = 20000, help = "Maximum number of items held in the result cache." )
+    parser.add_argument( '--cache.twitter_ttl', type = float, default = 90, help = "Seconds a cached twitter result stays valid." )
+    parser.add_argument( '--cache.reddit_ttl', type = float, default = 300, help = "Seconds a cached reddit result stays valid." )
+    # Adds deadline arguments. Items are returned before the validator's timeout instead of being thrown away.
+    parser.add_argument( '--deadline.margin', type = float, default = 5, help = "Seconds before the validator's timeout at which the actor run is aborted and partial results are returned." )
+    # Adds hedging arguments. A backup provider is raced against a slow primary provider.
+    parser.add_argument( '--hedge.on', action = 'store_true', default = False, help = "Race a backup provider when the primary provider is slow." )
+    parser.add_argument( '--hedge.twitter_backup', type = str, default = QueryProvider.MICROWORLDS_TWITTER_SCRAPER.value, help = "Backup twitter provider." )
+    parser.add_argument( '--hedge.reddit_backup', type = str, default = QueryProvider.REDDIT_SCRAPER.value, help = "Backup reddit provider." )
+    parser.add_argument( '--hedge.percentile', type = float, default = 0.9, help = "Start the backup after this percentile of the primary provider's latency." )
+    parser.add_argument( '--hedge.max_delay', type = float, default = 40, help = "Start the backup after at most this many seconds." )
+    # Adds provider router arguments. Each search goes to the provider that is currently fastest and healthiest.
+    parser.add_argument( '--router.on', action = 'store_true', default = False, help = "Route searches between several providers by observed latency, errors and fill rate." )
+    parser.add_argument( '--router.twitter_providers', type = str, default = ",".join([QueryProvider.TWEET_FLASH.value, QueryProvider.MICROWORLDS_TWITTER_SCRAPER.value, QueryProvider.APIDOJO_TWEET_SCRAPER.value]), help = "Comma separated twitter providers, in order of preference." )
+    parser.add_argument( '--router.reddit_providers', type = str, default = ",".join([QueryProvider.REDDIT_SCRAPER_LITE.value, QueryProvider.REDDIT_SCRAPER.value]), help = "Comma separated reddit providers, in order of preference." )
+    parser.add_argument( '--router.cooldown', type = float, default = 60, help = "Seconds a provider gets no traffic after repeated failures. Doubles on each failed probe." )
+    # Adds admission control arguments. Callers are rate limited by stake and low stake callers are shed under load.
+    parser.add_argument( '--admission.rate', type = float, default = 0.2, help = "Requests per second allowed for the caller with the largest stake. Smaller stakes get a proportional share." )
+    parser.add_argument( '--admission.burst', type = float, default = 10, help = "Requests a caller may send back to back." )
+    parser.add_argument( '--admission.min_weight', type = float, default = 0.1, help = "Share of the rate allowed for callers without stake." )
+    parser.add_argument( '--admission.max_in_flight', type = int, default = 16, help = "Requests in flight at which every new request is refused." )
+    parser.add_argument( '--admission.shed_at', type = float, default = 0.5, help = "Share of max_in_flight from which the lowest stake callers are refused first." )
+    # Adds item store arguments. Scraped items are kept on disk and survive restarts.
+    parser.add_argument( '--store.off', action = 'store_true', default = False, help = "Disable the on-disk item store." )
+    parser.add_argument( '--store.path', type = str, default = None, help = "Path of the item store database. Defaults to items.db in the miner's logging directory." )
+    parser.add_argument( '--store.retention', type = float, default = 2 * 24 * 3600, help = "Seconds scraped items are kept in the store." )
+    parser.add_argument( '--store.twitter_max_age', type = float, default = 1200, help = "Serve stored twitter items for keywords refreshed within this many seconds." )
+    parser.add_argument( '--store.reddit_max_age', type = float, default = 3600, help = "Serve stored reddit items for keywords refreshed within this many seconds." )
+    # Adds keyword prewarming arguments. Prewarming trades Apify spend for latency and freshness.
+    parser.add_argument( '--prewarm.on', action = 'store_true', default = False, help = "Keep scraping every keyword in the background." )
+    parser.add_argument( '--prewarm.keywords', type = str, default = "keywords.txt", help = "Keyword file to prewarm." )
+    parser.add_argument( '--prewarm.twitter_staleness', type = float, default = 600, help = "Seconds before a prewarmed twitter result is scraped again." )
+    parser.add_argument( '--prewarm.reddit_staleness', type = float, default = 1800, help = "Seconds before a prewarmed reddit result is scraped again." )
+    parser.add_argument( '--prewarm.concurrency', type = int, default = 2, help = "Maximum number of concurrent prewarm actor runs." )
     # Adds subtensor specific arguments i.e. --subtensor.chain_endpoint ... --subtensor.network ...
     bt.subtensor.add_args(parser)
     # Adds logging specific arguments i.e. --logging.debug ..., --logging.trace .. or --logging.logging_dir ...
@@ -66,6 +112,8 @@ def get_config():
     )
     # Ensure the directory for logging exists, else create one.
     if not os.path.exists(config.full_path): os.makedirs(config.full_path, exist_ok=True)
+    if config.store.path is None:
+        config.store.path = os.path.join(config.full_path, 'items.db')
     return config
 
 # TODO: Add error handling for when the directory for logging cannot be created
@@ -79,6 +127,30 @@ def random_line(a_file="keywords.txt"):
     lines = open(a_file).read().splitlines()
     return random.choice(lines)
 
+# Items returned for each keyword of a request, and the most keywords searched for one request
+ITEMS_PER_KEYWORD = 15
+MAX_KEYWORDS_PER_REQUEST = 10
+
+def search_request(scrap_input):
+    """
+    Read the keywords of a request, which are all searched in one actor run.
+
+    Args:
+        scrap_input (dict): The synapse's scrap_input, with the keywords in "search_key". A random keyword is searched without it.
+
+    Returns:
+        tuple: (search_key, limit): the list of keywords, and the number of items to return for all of them together.
+    """
+    if scrap_input is not None and len(scrap_input) > 0:
+        search_key = scrap_input["search_key"]
+        if isinstance(search_key, str):
+            search_key = [search_key]
+        search_key = list(search_key)[:MAX_KEYWORDS_PER_REQUEST]
+    else:
+        search_key = [random_line()]
+        bt.logging.info(f"picking random keyword: {search_key} \n")
+    return search_key, ITEMS_PER_KEYWORD * max(1, len(search_key))
+
 
 # Main takes the config and starts the miner.
 def main( config ):
@@ -86,8 +158,72 @@ def main( config ):
     This function takes the configuration and starts the miner.
     It sets up the necessary Bittensor objects, attaches the necessary functions to the axon, and starts the main loop.
     """
-    twitter_query = get_query(QueryType.TWITTER, QueryProvider.TWEET_FLASH)
-    reddit_query = get_query(QueryType.REDDIT, QueryProvider.REDDIT_SCRAPER_LITE)
+    twitter_provider = QueryProvider.TWEET_FLASH
+    reddit_provider = QueryProvider.REDDIT_SCRAPER_LITE
+    twitter_query = get_query(QueryType.TWITTER, twitter_provider)
+    reddit_query = get_query(QueryType.REDDIT, reddit_provider)
+
+    # Send each search to the provider with the best recent latency, error rate and fill rate.
+    routers = []
+    if config.router.on:
+        twitter_query = ProviderRouter(
+            QueryType.TWITTER, [QueryProvider(provider.strip()) for provider in config.router.twitter_providers.split(",")],
+            state_path = os.path.join(config.full_path, 'router_twitter.json'), base_cooldown = config.router.cooldown,
+        )
+        reddit_query = ProviderRouter(
+            QueryType.REDDIT, [QueryProvider(provider.strip()) for provider in config.router.reddit_providers.split(",")],
+            state_path = os.path.join(config.full_path, 'router_reddit.json'), base_cooldown = config.router.cooldown,
+        )
+        routers = [twitter_query, reddit_query]
+        # The wrappers below are labelled with the router's first choice; the router keeps statistics per provider
+        twitter_provider = twitter_query.providers[0]
+        reddit_provider = reddit_query.providers[0]
+
+    # Race a backup provider against the primary one when the primary is slower than usual.
+    twitter_hedge = reddit_hedge = None
+    if config.hedge.on:
+        twitter_backup = QueryProvider(config.hedge.twitter_backup)
+        reddit_backup = QueryProvider(config.hedge.reddit_backup)
+        twitter_query = twitter_hedge = HedgedQuery(
+            twitter_query, twitter_provider, get_query(QueryType.TWITTER, twitter_backup), twitter_backup,
+            percentile = config.hedge.percentile, max_delay = config.hedge.max_delay,
+        )
+        reddit_query = reddit_hedge = HedgedQuery(
+            reddit_query, reddit_provider, get_query(QueryType.REDDIT, reddit_backup), reddit_backup,
+            percentile = config.hedge.percentile, max_delay = config.hedge.max_delay,
+        )
+
+    # Concurrent identical searches, from validators or the prewarmer, share one actor run.
+    single_flight = SingleFlight()
+    twitter_query = SingleFlightQuery(twitter_query, QueryType.TWITTER, twitter_provider, single_flight)
+    reddit_query = SingleFlightQuery(reddit_query, QueryType.REDDIT, reddit_provider, single_flight)
+
+    # Answer repeated searches for hot keywords from memory instead of starting a new actor run.
+    query_cache = QueryCache(
+        max_items = config.cache.max_items,
+        ttls = { QueryType.TWITTER: config.cache.twitter_ttl, QueryType.REDDIT: config.cache.reddit_ttl },
+    )
+    # Keep scraped items on disk, so the miner comes back from a restart with a warm dataset.
+    item_store = None if config.store.off else ItemStore(config.store.path, retention = config.store.retention)
+
+    # Keep every keyword warm in the store so forward functions don't wait on an actor run.
+    prewarmer = None
+    if config.prewarm.on and item_store is not None:
+        prewarmer = KeywordPrewarmer(
+            jobs = [
+                PrewarmJob(QueryType.TWITTER, twitter_provider, twitter_query, config.prewarm.twitter_staleness),
+                PrewarmJob(QueryType.REDDIT, reddit_provider, reddit_query, config.prewarm.reddit_staleness),
+            ],
+            store = item_store,
+            keywords = load_keywords(config.prewarm.keywords),
+            concurrency = config.prewarm.concurrency,
+        )
+    if item_store is not None:
+        twitter_query = StoredQuery(twitter_query, QueryType.TWITTER, item_store, config.store.twitter_max_age)
+        reddit_query = StoredQuery(reddit_query, QueryType.REDDIT, item_store, config.store.reddit_max_age)
+    if not config.cache.off:
+        twitter_query = CachedQuery(twitter_query, QueryType.TWITTER, twitter_provider, query_cache)
+        reddit_query = CachedQuery(reddit_query, QueryType.REDDIT, reddit_provider, query_cache)
     # Activating Bittensor's logging with the set configurations.
     bt.logging(config=config, logging_dir=config.full_path)
     bt.logging.info(f"Running miner for subnet: {config.netuid} on network: {config.subtensor.chain_endpoint} with config:")
@@ -130,6 +266,16 @@ def main( config ):
         my_subnet_uid = metagraph.hotkeys.index(wallet.hotkey.ss58_address)
         bt.logging.info(f"Running miner on uid: {my_subnet_uid}")
 
+    # Index callers by hotkey and rate limit them by stake. The index is rebuilt whenever the metagraph is refreshed.
+    admission = AdmissionControl(
+        rate = config.admission.rate,
+        burst = config.admission.burst,
+        min_weight = config.admission.min_weight,
+        max_in_flight = config.admission.max_in_flight,
+        shed_at = config.admission.shed_at,
+    )
+    admission.update(metagraph.hotkeys, metagraph.S.tolist())
+
     # Set up miner functionalities
     # The blacklist function decides if a request should be ignored.
     def blacklist_twitter( synapse: scraping.protocol.TwitterScrap ) -> Tuple[bool, str]:
@@ -137,18 +283,12 @@ def main( config ):
         This function runs before the synapse data has been deserialized (i.e. before synapse.data is available).
         The synapse is instead contructed via the headers of the request. It is important to blacklist
         requests before they are deserialized to avoid wasting resources on requests that will be ignored.
-        Below: Check that the hotkey is a registered entity in the metagraph.
+        Below: Check that the hotkey is registered, within its rate and not shed because we are overloaded.
         """
-        if synapse.dendrite.hotkey not in metagraph.hotkeys:
-            # Ignore requests from unrecognized entities.
-            bt.logging.trace(f'Blacklisting unrecognized hotkey {synapse.dendrite.hotkey}')
-            return True, ""
-        # are not validators, or do not have enough stake. This can be checked via metagraph.S
-        # and metagraph.validator_permit. You can always attain the uid of the sender via a
-        # metagraph.hotkeys.index( synapse.dendrite.hotkey ) call.
-        # Otherwise, allow the request to be processed further.
-        bt.logging.trace(f'Not Blacklisting recognized hotkey {synapse.dendrite.hotkey}')
-        return False, ""
+        blacklisted, reason = admission.admit( synapse.dendrite.hotkey )
+        if blacklisted:
+            bt.logging.trace(f'Blacklisting hotkey {synapse.dendrite.hotkey}: {reason}')
+        return blacklisted, reason
 
     # The priority function determines the order in which requests are handled.
     # More valuable or higher-priority requests are processed before others.
@@ -160,8 +300,7 @@ def main( config ):
         request should be processed later.
         Below: simple logic, prioritize requests from entities with more stake.
         """
-        caller_uid = metagraph.hotkeys.index( synapse.dendrite.hotkey ) # Get the caller index.
-        prirority = float( metagraph.S[ caller_uid ] ) # Return the stake as the priority.
+        prirority = admission.priority( synapse.dendrite.hotkey ) # Return the stake as the priority.
         bt.logging.trace(f'Prioritizing {synapse.dendrite.hotkey} with value: ', prirority)
         return prirority
     def blacklist_reddit( synapse: scraping.protocol.RedditScrap ) -> Tuple[bool, str]:
@@ -169,18 +308,12 @@ def main( config ):
         This function runs before the synapse data has been deserialized (i.e. before synapse.data is available).
         The synapse is instead contructed via the headers of the request. It is important to blacklist
         requests before they are deserialized to avoid wasting resources on requests that will be ignored.
-        Below: Check that the hotkey is a registered entity in the metagraph.
+        Below: Check that the hotkey is registered, within its rate and not shed because we are overloaded.
         """
-        if synapse.dendrite.hotkey not in metagraph.hotkeys:
-            # Ignore requests from unrecognized entities.
-            bt.logging.trace(f'Blacklisting unrecognized hotkey {synapse.dendrite.hotkey}')
-            return True, ""
-        # are not validators, or do not have enough stake. This can be checked via metagraph.S
-        # and metagraph.validator_permit. You can always attain the uid of the sender via a
-        # metagraph.hotkeys.index( synapse.dendrite.hotkey ) call.
-        # Otherwise, allow the request to be processed further.
-        bt.logging.trace(f'Not Blacklisting recognized hotkey {synapse.dendrite.hotkey}')
-        return False, ""
+        blacklisted, reason = admission.admit( synapse.dendrite.hotkey )
+        if blacklisted:
+            bt.logging.trace(f'Blacklisting hotkey {synapse.dendrite.hotkey}: {reason}')
+        return blacklisted, reason
 
     # The priority function determines the order in which requests are handled.
     # More valuable or higher-priority requests are processed before others.
@@ -192,17 +325,39 @@ def main( config ):
         request should be processed later.
         Below: simple logic, prioritize requests from entities with more stake.
         """
-        caller_uid = metagraph.hotkeys.index( synapse.dendrite.hotkey ) # Get the caller index.
-        prirority = float( metagraph.S[ caller_uid ] ) # Return the stake as the priority.
+        prirority = admission.priority( synapse.dendrite.hotkey ) # Return the stake as the priority.
         bt.logging.trace(f'Prioritizing {synapse.dendrite.hotkey} with value: ', prirority)
         return prirority
 
-    def twitterScrap( synapse: scraping.protocol.TwitterScrap) -> scraping.protocol.TwitterScrap: 
+    # The streaming synapses are admitted and prioritized like their batch counterparts.
+    def blacklist_twitter_stream( synapse: scraping.protocol.TwitterScrapStream ) -> Tuple[bool, str]:
+        return blacklist_twitter( synapse )
+
+    def priority_twitter_stream( synapse: scraping.protocol.TwitterScrapStream ) -> float:
+        return priority_twitter( synapse )
+
+    def blacklist_reddit_stream( synapse: scraping.protocol.RedditScrapStream ) -> Tuple[bool, str]:
+        return blacklist_reddit( synapse )
+
+    def priority_reddit_stream( synapse: scraping.protocol.RedditScrapStream ) -> float:
+        return priority_reddit( synapse )
+
+    def request_deadline( synapse: scraping.protocol.ScrapingSynapse ) -> float:
+        """
+        Returns the time.monotonic() deadline by which the response must be ready, so the validator doesn't time out
+        and throw it away. Returns None when the request doesn't carry a timeout.
+        """
+        if not synapse.timeout:
+            return None
+        return time.monotonic() + max(1.0, synapse.timeout - config.deadline.margin)
+
+    async def twitterScrap( synapse: scraping.protocol.TwitterScrap) -> scraping.protocol.TwitterScrap: 
         """
         This function runs after the TwitterScrap synapse has been deserialized (i.e. after synapse.data is available).
         This function runs after the blacklist and priority functions have been called.
+        The actor run is awaited, so the axon can serve other requests while Apify is working.
         """
-        validator_uid = metagraph.hotkeys.index( synapse.dendrite.hotkey )
+        validator_uid = admission.uid( synapse.dendrite.hotkey )
 
         # Version checking
         validator_version_str=None
@@ -219,24 +374,22 @@ def main( config ):
             return synapse
         
         bt.logging.info(f"Search from validator(version={validator_version_str}): {synapse.scrap_input} \n")
-        if synapse.scrap_input is not None and len(synapse.scrap_input) > 0:
-            search_key = synapse.scrap_input["search_key"]
-        else:
-            search_key = [random_line()]
-            bt.logging.info(f"picking random keyword: {search_key} \n")
+        search_key, limit = search_request(synapse.scrap_input)
 
-        tweets = twitter_query.execute(search_key, 15, synapse.dendrite.hotkey, validator_version_str, my_subnet_uid)
+        with admission.track(), actor_caller("miner_forward"), actor_deadline(request_deadline(synapse)):
+            tweets = await twitter_query.execute_async(search_key, limit, synapse.dendrite.hotkey, validator_version_str, my_subnet_uid)
         synapse.version = scraping.utils.get_my_version()        
         synapse.scrap_output = tweets
         bt.logging.info(f"✅ success: returning {len(synapse.scrap_output)} tweets\n")
         return synapse
     
-    def redditScrap( synapse: scraping.protocol.RedditScrap) -> scraping.protocol.RedditScrap: 
+    async def redditScrap( synapse: scraping.protocol.RedditScrap) -> scraping.protocol.RedditScrap: 
         """
         This function runs after the RedditScrap synapse has been deserialized (i.e. after synapse.data is available).
         This function runs after the blacklist and priority functions have been called.
+        The actor run is awaited, so the axon can serve other requests while Apify is working.
         """
-        validator_uid = metagraph.hotkeys.index( synapse.dendrite.hotkey )
+        validator_uid = admission.uid( synapse.dendrite.hotkey )
 
         # Version checking
         validator_version_str=None
@@ -253,18 +406,82 @@ def main( config ):
             return synapse
         
         bt.logging.info(f"Search from validator(version={validator_version_str}): {synapse.scrap_input} \n")
-        if synapse.scrap_input is not None and len(synapse.scrap_input) > 0:
-            search_key = synapse.scrap_input["search_key"]
-        else:
-            search_key = [random_line()]
-            bt.logging.info(f"picking random keyword: {search_key} \n")
+        search_key, limit = search_request(synapse.scrap_input)
         # Fetch latest N posts from miner's local database.
-        posts = reddit_query.execute(search_key, 15, synapse.dendrite.hotkey, validator_version_str, my_subnet_uid)
+        with admission.track(), actor_caller("miner_forward"), actor_deadline(request_deadline(synapse)):
+            posts = await reddit_query.execute_async(search_key, limit, synapse.dendrite.hotkey, validator_version_str, my_subnet_uid)
         synapse.scrap_output = posts
         synapse.version = scraping.utils.get_my_version()        
         bt.logging.info(f"✅ success: returning {len(synapse.scrap_output)} reddit posts\n")
         return synapse
 
+    def stream_scrap( synapse: scraping.protocol.ScrapStreamingSynapse, query, source: str ):
+        """
+        Build the streaming response for a streaming scrap request. Items are written as NDJSON lines as soon as the
+        actor run produces them; items that only come back at the end (cache or store hits, runs shared with another
+        request) are written once the search returns.
+        """
+        validator_uid = admission.uid( synapse.dendrite.hotkey )
+
+        # Version checking
+        validator_version_str = None
+        if synapse.version is None:
+            bt.logging.info(f"Received streaming {source} request from validator without version (validator uid = {validator_uid})")
+        elif scraping.utils.check_version(synapse.version):
+            validator_version_str = f"{synapse.version.major_version}.{synapse.version.minor_version}.{synapse.version.patch_version}"
+        accepted = (synapse.version is None or validator_version_str is not None) and not scraping.utils.update_flag
+        # Like the batch forward, tell the validator our version when its version is rejected or the search is served.
+        # The response headers are built from the synapse, so it has to be set before the stream starts.
+        if accepted or (synapse.version is not None and validator_version_str is None):
+            synapse.version = scraping.utils.get_my_version()
+
+        search_key, limit = search_request(synapse.scrap_input)
+
+        async def _stream( send ):
+            sent = set()
+
+            async def send_items( items ):
+                new_items = [item for item in items if str(item.get('id')) not in sent]
+                sent.update(str(item.get('id')) for item in new_items)
+                if new_items:
+                    await send({"type": "http.response.body", "body": synapse.encode_items(new_items), "more_body": True})
+
+            if accepted:
+                bt.logging.info(f"Streaming search from validator(version={validator_version_str}): {synapse.scrap_input} \n")
+                pages = asyncio.Queue()
+                with admission.track(), actor_caller("miner_forward"), actor_deadline(request_deadline(synapse)), stream_items(pages.put_nowait):
+                    search = asyncio.ensure_future(query.execute_async(search_key, limit, synapse.dendrite.hotkey, validator_version_str, my_subnet_uid))
+                    try:
+                        while not search.done() or not pages.empty():
+                            page = asyncio.ensure_future(pages.get())
+                            done, _ = await asyncio.wait({page, search}, return_when = asyncio.FIRST_COMPLETED)
+                            if page in done:
+                                await send_items(page.result())
+                            else:
+                                page.cancel()
+                        await send_items(search.result())
+                    except Exception as e:
+                        bt.logging.error(f"❌ Streaming {source} search failed: {e}")
+                    finally:
+                        if not search.done():
+                            search.cancel()
+                bt.logging.info(f"✅ success: streamed {len(sent)} {source} items\n")
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        return synapse.create_streaming_response(_stream)
+
+    async def twitterScrapStream( synapse: scraping.protocol.TwitterScrapStream ) -> scraping.protocol.TwitterScrapStream:
+        """
+        Streaming variant of twitterScrap.
+        """
+        return stream_scrap( synapse, twitter_query, "twitter" )
+
+    async def redditScrapStream( synapse: scraping.protocol.RedditScrapStream ) -> scraping.protocol.RedditScrapStream:
+        """
+        Streaming variant of redditScrap.
+        """
+        return stream_scrap( synapse, reddit_query, "reddit" )
+
     # Build and link miner functions to the axon.
     # The axon handles request processing, allowing validators to send this process requests.
     
@@ -273,20 +490,38 @@ def main( config ):
 
     # Attach determiners which functions are called when servicing a request.
     bt.logging.info(f"Attaching forward function to axon.")
-    axon.attach(forward_fn = redditScrap).attach(
+    axon.attach(
+        forward_fn = redditScrap,
+        blacklist_fn = blacklist_reddit,
+        priority_fn = priority_reddit,
+    ).attach(
         forward_fn = twitterScrap,
-        # blacklist_fn = blacklist_twitter,
-        # priority_fn = priority_twitter,
+        blacklist_fn = blacklist_twitter,
+        priority_fn = priority_twitter,
+    ).attach(
+        forward_fn = redditScrapStream,
+        blacklist_fn = blacklist_reddit_stream,
+        priority_fn = priority_reddit_stream,
+    ).attach(
+        forward_fn = twitterScrapStream,
+        blacklist_fn = blacklist_twitter_stream,
+        priority_fn = priority_twitter_stream,
     )
 
     # Serve passes the axon information to the network + netuid we are hosting on.
     # This will auto-update if the axon port of external ip have changed.
-    bt.logging.info(f"Serving axon {redditScrap, twitterScrap} on network: {config.subtensor.chain_endpoint} with netuid: {config.netuid}")
+    bt.logging.info(f"Serving axon {redditScrap, twitterScrap, redditScrapStream, twitterScrapStream} on network: {config.subtensor.chain_endpoint} with netuid: {config.netuid}")
     axon.serve( netuid = config.netuid, subtensor = subtensor )
 
     # Start  starts the miner's axon, making it active on the network.
     bt.logging.info(f"Starting axon server on port: {config.axon.port}")
     axon.start()
+
+    if prewarmer is not None:
+        bt.logging.info(f"Starting keyword prewarmer")
+        prewarmer.start()
+    elif config.prewarm.on:
+        bt.logging.warning(f"Keyword prewarming needs the item store, ignoring --prewarm.on")
     
     # Keep the miner alive
     # This loop maintains the miner's operations until intentionally stopped.
@@ -305,6 +540,7 @@ def main( config ):
                 if subtensor.block - metagraph.block.item() > 5:
                     bt.logging.info(f"Metagraph is old, syncing with subtensor")
                     metagraph = subtensor.metagraph(config.netuid)
+                admission.update(metagraph.hotkeys, metagraph.S.tolist())
 
                 log =  (f'Step:{step} | '\
                         f'Block:{metagraph.block.item()} | '\
@@ -315,19 +551,44 @@ def main( config ):
                         f'Incentive:{metagraph.I[my_subnet_uid]} | '\
                         f'Emission:{metagraph.E[my_subnet_uid]}')
                 bt.logging.info(log)
+
+                bt.logging.info(f"Admission: {admission.stats()}")
+                bt.logging.info(f"Actor runs: {single_flight.stats()}")
+                telemetry.log_summary(bt.logging.info)
+                telemetry.write(os.path.join(config.full_path, 'actor_metrics.json'))
+                if config.hedge.on:
+                    bt.logging.info(f"Hedging: twitter {twitter_hedge.stats()}, reddit {reddit_hedge.stats()}")
+                if not config.cache.off:
+                    bt.logging.info(f"Result cache: {query_cache.stats()}")
+                if prewarmer is not None:
+                    bt.logging.info(f"Prewarmer: {prewarmer.stats()}")
+                for router in routers:
+                    bt.logging.info(f"Router {router.query_type.name.lower()}: {router.summary()}")
+                    router.save()
             
                 # Check for auto update
                 if config.auto_update != "no":
                     if scraping.utils.update_repository(config.auto_update):
                         bt.logging.success("🔁 Repository updated, exiting miner")
                         exit(0)
+
+            # Expire old items and compact the store every 10 minutes
+            if item_store is not None and step % 600 == 0:
+                expired = item_store.expire()
+                bt.logging.info(f"Item store: {item_store.stats()}, expired {expired} rows")
             
             step += 1
             time.sleep(1)
 
         # If someone intentionally stops the miner, it'll safely terminate operations.
         except KeyboardInterrupt:
+            if prewarmer is not None:
+                prewarmer.stop()
             axon.stop()
+            for router in routers:
+                router.save()
+            if item_store is not None:
+                item_store.close()
             bt.logging.success('Miner killed by keyboard interrupt.')
             break
         # In case of unforeseen errors, the miner will log the error and continue operations.
@@ -0,0 +1,161 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import time
+import asyncio
+import logging
+import traceback
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """
+    One step of a `Pipeline`: a bounded input queue and a pool of workers running `handler` on its jobs.
+    """
+
+    def __init__(self, name: str, handler, workers: int = 1, queue_size: int = 8):
+        """
+        Initialize the Stage.
+
+        Args:
+            name (str): Name used in logs and metrics.
+            handler (callable): Async function taking a job and returning the job for the next stage, or None to drop it.
+            workers (int, optional): Jobs handled at once. Defaults to 1.
+            queue_size (int, optional): Jobs waiting before `put` blocks. Defaults to 8.
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue = None
+        self.next = None
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0
+        self.wait_secs = 0.0
+        self.run_secs = 0.0
+        self.max_run_secs = 0.0
+
+    def metrics(self) -> dict:
+        done = max(1, self.processed + self.failed)
+        return {
+            "depth": self.queue.qsize() if self.queue else 0,
+            "busy": self.busy,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_wait_secs": round(self.wait_secs / done, 2),
+            "avg_run_secs": round(self.run_secs / done, 2),
+            "max_run_secs": round(self.max_run_secs, 2),
+        }
+
+    async def work(self):
+        while True:
+            queued_at, job = await self.queue.get()
+            started = time.monotonic()
+            self.wait_secs += started - queued_at
+            self.busy += 1
+            try:
+                result = await self.handler(job)
+                self.processed += 1
+            except Exception as e:
+                result = None
+                self.failed += 1
+                logger.error(f"Pipeline stage {self.name} failed: {e}")
+                traceback.print_exc()
+            finally:
+                elapsed = time.monotonic() - started
+                self.run_secs += elapsed
+                self.max_run_secs = max(self.max_run_secs, elapsed)
+                self.busy -= 1
+            try:
+                # Blocks while the next stage is full, which in turn fills this stage's queue
+                if result is not None and self.next is not None:
+                    await self.next.put(result)
+            finally:
+                self.queue.task_done()
+
+    async def put(self, job):
+        await self.queue.put((time.monotonic(), job))
+
+
+class Pipeline:
+    """
+    Stages connected by bounded queues. A job put into the pipeline goes through every stage in order.
+
+    When a stage falls behind its queue fills up and the stage before it waits, so backpressure reaches `put` instead
+    of jobs piling up in memory. `drain()` waits for every job in flight to go through, for a clean shutdown.
+    """
+
+    def __init__(self, stages: list):
+        """
+        Initialize the Pipeline.
+
+        Args:
+            stages (list): The `Stage`s, in order.
+        """
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next = next_stage
+        self._workers = []
+
+    def start(self):
+        """
+        Create the queues and start the workers. Must be called from the event loop the pipeline runs on.
+        """
+        for stage in self.stages:
+            stage.queue = asyncio.Queue(maxsize=stage.queue_size)
+            self._workers += [asyncio.create_task(stage.work()) for _ in range(stage.workers)]
+
+    async def put(self, job):
+        """
+        Add a job, waiting while the first stage's queue is full.
+        """
+        await self.stages[0].put(job)
+
+    def pending(self) -> int:
+        """
+        Jobs queued or being handled in any stage.
+        """
+        return sum(stage.queue.qsize() + stage.busy for stage in self.stages)
+
+    def metrics(self) -> dict:
+        return {stage.name: stage.metrics() for stage in self.stages}
+
+    async def drain(self, timeout: float = None):
+        """
+        Wait until every job in flight went through the pipeline, then stop the workers.
+
+        Args:
+            timeout (float, optional): Seconds to wait before giving up on the remaining jobs. Defaults to no limit.
+        """
+        async def join():
+            # Each stage only feeds later ones, so once a stage is empty it stays empty
+            for stage in self.stages:
+                await stage.queue.join()
+        try:
+            await asyncio.wait_for(join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {self.pending()} pipeline jobs that did not finish in {timeout}s")
+        finally:
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
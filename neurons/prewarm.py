@@ -0,0 +1,188 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from neurons.queries import QueryType, QueryProvider
+from neurons.item_store import ItemStore
+from neurons.apify.telemetry import actor_caller
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+
+def load_keywords(a_file: str = "keywords.txt") -> list:
+    """
+    Read the keyword list used by validators, skipping blank lines and duplicates.
+    """
+    if not os.path.exists(a_file):
+        raise FileNotFoundError(f"Keyword file not found at location: {a_file}")
+    keywords = []
+    for line in open(a_file).read().splitlines():
+        keyword = line.strip()
+        if keyword and keyword not in keywords:
+            keywords.append(keyword)
+    return keywords
+
+
+class PrewarmJob:
+    """
+    A query that the prewarmer keeps fresh for every keyword.
+
+    Attributes:
+        query_type (QueryType): The type of the query.
+        query_provider (QueryProvider): The provider of the query.
+        query: The uncached query object from `neurons.queries.get_query`.
+        staleness (float): Seconds after which a keyword's result is scraped again.
+    """
+
+    def __init__(self, query_type: QueryType, query_provider: QueryProvider, query, staleness: float):
+        self.query_type = query_type
+        self.query_provider = query_provider
+        self.query = query
+        self.staleness = staleness
+
+
+class KeywordPrewarmer:
+    """
+    Keeps scraping every keyword through the miner's configured providers in the background, so forward
+    functions can answer validators from the local store instead of waiting on an actor run.
+
+    Each (job, keyword) pair is refreshed once its result is older than the job's staleness budget, oldest first.
+    Refresh times are read back from the store, so a restarted miner doesn't scrape everything again.
+    At most `concurrency` actor runs are in flight at any time.
+    """
+
+    def __init__(self, jobs: list, store: ItemStore, keywords: list, concurrency: int = 2, limit_number: int = 15):
+        """
+        Initialize the KeywordPrewarmer.
+
+        Args:
+            jobs (list): The PrewarmJob objects to keep fresh.
+            store (ItemStore): The store the forward functions read from.
+            keywords (list): The keywords to scrape.
+            concurrency (int, optional): Maximum number of concurrent actor runs. Defaults to 2.
+            limit_number (int, optional): Number of items requested per run. Must match the forward functions. Defaults to 15.
+        """
+        self.jobs = jobs
+        self.store = store
+        self.keywords = list(keywords)
+        self.concurrency = max(1, concurrency)
+        self.limit_number = limit_number
+
+        # Shuffle once so that several miners started together don't scrape keywords in the same order
+        random.shuffle(self.keywords)
+        # (job index, keyword) -> epoch time of the last successful refresh, 0 when never refreshed
+        self.last_refreshed = {
+            (j, keyword): store.refreshed_at(job.query_type.name.lower(), keyword)
+            for j, job in enumerate(jobs)
+            for keyword in self.keywords
+        }
+        self.in_flight = set()
+
+        self.refreshed = 0
+        self.failed = 0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = None
+        self._thread = None
+
+    def start(self):
+        """
+        Start the scheduler thread.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="prewarm")
+        self._thread = threading.Thread(target=self._run, name="prewarm-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Prewarming {len(self.keywords)} keywords for {len(self.jobs)} queries with concurrency {self.concurrency}")
+
+    def stop(self):
+        """
+        Stop scheduling new runs. Runs already in flight are left to finish in the background.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        """
+        Return refresh counters and the number of stale (job, keyword) pairs.
+        """
+        now = time.time()
+        with self._lock:
+            stale = sum(1 for (j, _), refreshed_at in self.last_refreshed.items() if now - refreshed_at >= self.jobs[j].staleness)
+            return {
+                "refreshed": self.refreshed,
+                "failed": self.failed,
+                "in_flight": len(self.in_flight),
+                "stale": stale,
+            }
+
+    def _due(self) -> list:
+        """
+        Return stale (job index, keyword) pairs that aren't being refreshed, oldest first.
+        """
+        now = time.time()
+        with self._lock:
+            due = [
+                (refreshed_at, pair)
+                for pair, refreshed_at in self.last_refreshed.items()
+                if pair not in self.in_flight and now - refreshed_at >= self.jobs[pair[0]].staleness
+            ]
+        due.sort(key=lambda entry: entry[0])
+        return [pair for _, pair in due]
+
+    def _run(self):
+        while not self._stop.is_set():
+            for pair in self._due():
+                with self._lock:
+                    if len(self.in_flight) >= self.concurrency:
+                        break
+                    self.in_flight.add(pair)
+                self._executor.submit(self._refresh, pair)
+            self._stop.wait(1)
+
+    def _refresh(self, pair: tuple):
+        j, keyword = pair
+        job = self.jobs[j]
+        try:
+            with actor_caller("miner_prewarm"):
+                items = job.query.execute([keyword], self.limit_number)
+            if not items:
+                raise Exception("actor returned no items")
+            self.store.add(job.query_type.name.lower(), [keyword], items)
+            with self._lock:
+                self.last_refreshed[pair] = time.time()
+                self.refreshed += 1
+        except Exception as e:
+            logger.warning(f"Prewarm of {job.query_provider.value} for '{keyword}' failed: {e}")
+            with self._lock:
+                # Back off for a fraction of the staleness budget before retrying a failing keyword
+                self.last_refreshed[pair] = time.time() - job.staleness * 0.75
+                self.failed += 1
+        finally:
+            with self._lock:
+                self.in_flight.discard(pair)
@@ -0,0 +1,192 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from neurons.queries import QueryType, QueryProvider
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """
+    A bounded in-process cache for scrape results with per-source TTLs and LRU eviction.
+
+    Entries are keyed by (QueryType, QueryProvider, normalized search keys, limit). The cache is bounded by the
+    total number of cached items, so a few very large results can't push the process out of memory.
+    """
+
+    def __init__(self, max_items: int = 20000, ttls: dict = None, default_ttl: float = 60):
+        """
+        Initialize the QueryCache.
+
+        Args:
+            max_items (int, optional): Maximum number of items held across all entries. Defaults to 20000.
+            ttls (dict, optional): Mapping of QueryType to time-to-live in seconds. Defaults to None.
+            default_ttl (float, optional): TTL used for query types missing from `ttls`. Defaults to 60.
+        """
+        self.max_items = max_items
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (expires_at, items)
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(query_type: QueryType, query_provider: QueryProvider, search_queries: list, limit_number: int) -> tuple:
+        """
+        Build a cache key. Search keys are stripped, lowercased, de-duplicated and sorted so that
+        ["Bitcoin"] and ["bitcoin "] share an entry.
+        """
+        normalized = tuple(sorted({str(key).strip().lower() for key in search_queries}))
+        return (query_type, query_provider, normalized, limit_number)
+
+    def get(self, key: tuple):
+        """
+        Return a copy of the cached items for `key`, or None on a miss or an expired entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, items = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(items)
+
+    def put(self, key: tuple, items: list, ttl: float = None):
+        """
+        Store `items` under `key`. Empty results are not cached so a transient actor failure isn't served again.
+        """
+        if not items:
+            return
+        if ttl is None:
+            ttl = self.ttls.get(key[0], self.default_ttl)
+        if ttl <= 0 or len(items) > self.max_items:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, list(items))
+            self._size += len(items)
+
+            # Evict least recently used entries until we are back under the size bound
+            while self._size > self.max_items:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop every cached entry.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss counters and the current size of the cache.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "items": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, key: tuple):
+        _, items = self._entries.pop(key)
+        self._size -= len(items)
+
+
+class CachedQuery:
+    """
+    Wraps a query object from `neurons.queries.get_query` and answers repeated searches from a QueryCache.
+
+    Any attribute that is not overridden here (e.g. `searchByUrl`, `actor_config`) is forwarded to the wrapped query.
+    """
+
+    def __init__(self, query, query_type: QueryType, query_provider: QueryProvider, cache: QueryCache):
+        """
+        Initialize the CachedQuery.
+
+        Args:
+            query: The query object to wrap.
+            query_type (QueryType): The type of the wrapped query.
+            query_provider (QueryProvider): The provider of the wrapped query.
+            cache (QueryCache): The cache shared between wrapped queries.
+        """
+        self.query = query
+        self.query_type = query_type
+        self.query_provider = query_provider
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.query, name)
+
+    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Return cached results for the search if present, otherwise run the wrapped query and cache its result.
+        """
+        key = QueryCache.make_key(self.query_type, self.query_provider, search_queries, limit_number)
+        items = self.cache.get(key)
+        if items is not None:
+            logger.info(f"Cache hit for {self.query_provider.value}: {search_queries}")
+            return items
+
+        items = self.query.execute(search_queries, limit_number, validator_key, validator_version, miner_uid)
+        self.cache.put(key, items)
+        return items
+
+    async def execute_async(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Same as `execute`, awaiting the wrapped query's `execute_async` on a miss.
+        """
+        key = QueryCache.make_key(self.query_type, self.query_provider, search_queries, limit_number)
+        items = self.cache.get(key)
+        if items is not None:
+            logger.info(f"Cache hit for {self.query_provider.value}: {search_queries}")
+            return items
+
+        items = await self.query.execute_async(search_queries, limit_number, validator_key, validator_version, miner_uid)
+        self.cache.put(key, items)
+        return items
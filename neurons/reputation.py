@@ -0,0 +1,236 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    source TEXT NOT NULL,
+    hotkey TEXT NOT NULL,
+    uid INTEGER NOT NULL,
+    block INTEGER,
+    time INTEGER NOT NULL,
+    score REAL NOT NULL,
+    items INTEGER NOT NULL,
+    average_age REAL NOT NULL,
+    relevancy_contrib REAL NOT NULL,
+    format INTEGER NOT NULL,
+    fake INTEGER NOT NULL,
+    checked INTEGER NOT NULL,
+    failed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_by_time ON history (time);
+"""
+
+# Rolling averages kept for every miner, by history column
+AVERAGED = ("score", "items", "average_age", "relevancy_contrib", "format", "fake")
+
+
+class MinerHistory:
+    """
+    Rolling aggregates of one miner's rounds of one source.
+    """
+
+    def __init__(self, uid: int, first_seen: int):
+        self.uid = uid
+        self.first_seen = first_seen
+        self.last_seen = first_seen
+        self.rounds = 0
+        # Exponentially weighted averages of the AVERAGED columns
+        self.averages = dict.fromkeys(AVERAGED, 0.0)
+        # Decayed counts of spot checked items that matched and that didn't
+        self.passed = 0.0
+        self.failed = 0.0
+
+    def add(self, row: dict, decay: float):
+        self.uid = row["uid"]
+        self.last_seen = row["time"]
+        self.rounds += 1
+        # The first rounds average over what there is, later ones decay
+        weight = max(1 - decay, 1 / self.rounds)
+        for column in AVERAGED:
+            self.averages[column] += (row[column] - self.averages[column]) * weight
+        self.passed = self.passed * decay + row["checked"] - row["failed"]
+        self.failed = self.failed * decay + row["failed"]
+
+    def to_dict(self) -> dict:
+        return {
+            "uid": self.uid,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "rounds": self.rounds,
+            "passed": round(self.passed, 3),
+            "failed": round(self.failed, 3),
+            **{column: round(value, 4) for column, value in self.averages.items()},
+        }
+
+
+class ReputationStore:
+    """
+    Local, append-only history of every miner's scoring results, keyed by hotkey so a recycled uid starts fresh.
+
+    Each scored round appends one row per miner. Rolling aggregates per (source, hotkey) are kept in memory and rebuilt
+    from the rows at start, so sampling, spot check budgeting and miner selection read a miner's record in O(1).
+    Rows older than `retention` are deleted by `expire`.
+    """
+
+    def __init__(self, path: str, retention: float = 7 * 24 * 3600, decay: float = 0.9):
+        """
+        Initialize the ReputationStore.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            retention (float, optional): Seconds rows are kept. Defaults to a week.
+            decay (float, optional): Weight of a miner's history at each new round. Defaults to 0.9.
+        """
+        self.path = path
+        self.retention = retention
+        self.decay = decay
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Histories written before the column was named after the weighted contribution it holds
+        if "relevancy" in [row[1] for row in self._conn.execute("PRAGMA table_info(history)")]:
+            self._conn.execute("ALTER TABLE history RENAME COLUMN relevancy TO relevancy_contrib")
+
+        self.histories = {}
+        self._load()
+
+    def _load(self):
+        # Counted once here, then kept up to date by `record` and `expire`
+        self.rows = self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        cutoff = int(time.time() - self.retention)
+        columns = ["source", "hotkey", "uid", "time", "checked", "failed", *AVERAGED]
+        cursor = self._conn.execute(f"SELECT {', '.join(columns)} FROM history WHERE time >= ? ORDER BY rowid", (cutoff,))
+        rows = 0
+        for values in cursor:
+            self._add(dict(zip(columns, values)))
+            rows += 1
+        logger.info(f"Loaded the history of {len(self.histories)} miners from {rows} rows")
+
+    def _add(self, row: dict):
+        key = (row["source"], row["hotkey"])
+        history = self.histories.get(key)
+        if history is None:
+            history = self.histories[key] = MinerHistory(row["uid"], row["time"])
+        history.add(row, self.decay)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record(self, source: str, hotkeys: list, uids: list, metrics: dict, block: int = None) -> int:
+        """
+        Append a scored round.
+
+        Args:
+            source (str): The source of the round, e.g. "twitter" or "reddit".
+            hotkeys (list): Hotkeys of the miners, in response order.
+            uids (list): Uids of the miners, in response order.
+            metrics (dict): The scoring metrics of the round, as returned by `calculateScore`.
+            block (int, optional): The block the round was scored at. Defaults to None.
+
+        Returns:
+            int: The number of rows written.
+        """
+        now = int(time.time())
+        rows = []
+        for i, (hotkey, uid) in enumerate(zip(hotkeys, uids)):
+            rows.append({
+                "source": source,
+                "hotkey": hotkey,
+                "uid": int(uid),
+                "block": block,
+                "time": now,
+                "score": float(metrics["filtered_scores"][i]),
+                "items": int(metrics["length"][i]),
+                "average_age": float(metrics["average_age"][i]),
+                "relevancy_contrib": float(metrics["relevancy_contrib"][i]),
+                "format": int(metrics["format"][i]),
+                "fake": int(metrics["fake"][i]),
+                "checked": int(metrics.get("spot_checked", [0] * len(hotkeys))[i]),
+                "failed": int(metrics.get("spot_check_failed", [0] * len(hotkeys))[i]),
+            })
+        columns = list(rows[0]) if rows else []
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    f"INSERT INTO history ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    [tuple(row.values()) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.rows += len(rows)
+            for row in rows:
+                self._add(row)
+        return len(rows)
+
+    def get(self, source: str, hotkey: str) -> MinerHistory:
+        """
+        Return the rolling aggregates of a miner, or None if it has no rounds.
+        """
+        with self._lock:
+            return self.histories.get((source, hotkey))
+
+    def spot_checks(self, source: str, hotkey: str) -> tuple:
+        """
+        Return the decayed counts of the miner's spot checked items that matched and that didn't.
+        """
+        with self._lock:
+            history = self.histories.get((source, hotkey))
+            return (history.passed, history.failed) if history else (0.0, 0.0)
+
+    def expire(self) -> int:
+        """
+        Delete rows older than `retention` and forget miners not seen since.
+
+        Returns:
+            int: The number of rows deleted.
+        """
+        cutoff = int(time.time() - self.retention)
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM history WHERE time < ?", (cutoff,)).rowcount
+            self.rows -= deleted
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            for key in [key for key, history in self.histories.items() if history.last_seen < cutoff]:
+                del self.histories[key]
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            miners = {}
+            for source, _ in self.histories:
+                miners[source] = miners.get(source, 0) + 1
+            return {"rows": self.rows, "miners": miners}
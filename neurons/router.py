@@ -0,0 +1,276 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+from neurons.queries import get_query, QueryType, QueryProvider
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+
+class ProviderStats:
+    """
+    Exponentially weighted statistics and circuit breaker state for one provider.
+
+    Latency percentiles are tracked with a streaming quantile estimate: each sample moves the estimate up by
+    `p * step` when it is above it and down by `(1 - p) * step` otherwise, which settles where a fraction p of
+    samples fall below the estimate.
+    """
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.samples = 0
+        self.latency_mean = None
+        self.latency_p50 = None
+        self.latency_p95 = None
+        self.error_rate = 0.0
+        self.fill_rate = 1.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.cooldown = 0.0
+        self.probing = False
+
+    def _quantile(self, estimate: float, sample: float, p: float) -> float:
+        if estimate is None:
+            return sample
+        step = self.alpha * max(self.latency_mean, 0.1)
+        return estimate + step * (p if sample > estimate else -(1 - p))
+
+    def record_success(self, latency: float, fill: float):
+        self.samples += 1
+        self.latency_mean = latency if self.latency_mean is None else (1 - self.alpha) * self.latency_mean + self.alpha * latency
+        self.latency_p50 = self._quantile(self.latency_p50, latency, 0.5)
+        self.latency_p95 = self._quantile(self.latency_p95, latency, 0.95)
+        self.error_rate = (1 - self.alpha) * self.error_rate
+        self.fill_rate = (1 - self.alpha) * self.fill_rate + self.alpha * fill
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        self.samples += 1
+        self.error_rate = (1 - self.alpha) * self.error_rate + self.alpha
+        self.consecutive_failures += 1
+
+    def to_dict(self) -> dict:
+        return {key: value for key, value in self.__dict__.items() if key not in ("alpha", "probing")}
+
+    def load(self, state: dict):
+        for key, value in state.items():
+            if key in self.__dict__:
+                setattr(self, key, value)
+
+
+class ProviderRouter:
+    """
+    Routes each call to the currently best provider of a query type.
+
+    Providers are ranked by expected latency (EWMA p50 plus a share of the p95 tail), penalized by their error rate
+    and by how far short of the requested number of items they come. After `failure_threshold` consecutive failures
+    a provider's circuit opens and it gets no traffic for a cooldown that doubles on each failed probe. Once the
+    cooldown is over a single probe call is let through, and a success closes the circuit again.
+
+    The statistics are saved to `state_path`, so a restarted process doesn't have to learn them again.
+    """
+
+    def __init__(self, query_type: QueryType, providers: list, state_path: str = None, failure_threshold: int = 3,
+                 base_cooldown: float = 60, max_cooldown: float = 1800, explore_rate: float = 0.05):
+        """
+        Initialize the ProviderRouter.
+
+        Args:
+            query_type (QueryType): The type of the routed queries.
+            providers (list): QueryProvider values to route between, in order of preference when no statistics exist.
+            state_path (str, optional): JSON file the statistics are saved to and loaded from. Defaults to None.
+            failure_threshold (int, optional): Consecutive failures that open a provider's circuit. Defaults to 3.
+            base_cooldown (float, optional): Seconds a circuit stays open after it first opens. Defaults to 60.
+            max_cooldown (float, optional): Upper bound of the cooldown in seconds. Defaults to 1800.
+            explore_rate (float, optional): Share of calls sent to a random healthy provider to keep its statistics fresh. Defaults to 0.05.
+        """
+        self.query_type = query_type
+        self.providers = list(providers)
+        self.queries = {provider: get_query(query_type, provider) for provider in self.providers}
+        self.stats = {provider: ProviderStats() for provider in self.providers}
+        self.state_path = state_path
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.explore_rate = explore_rate
+        self._lock = threading.Lock()
+        self.load()
+
+    def __getattr__(self, name):
+        # Forward everything else (e.g. `map`, `actor_config`) to the preferred provider
+        return getattr(self.queries[self.providers[0]], name)
+
+    def expected_cost(self, provider: QueryProvider) -> float:
+        """
+        Lower is better. Providers without samples cost 0, so each one gets tried.
+        """
+        stats = self.stats[provider]
+        if stats.latency_p50 is None:
+            return 0.0
+        latency = stats.latency_p50 + 0.25 * max(0.0, stats.latency_p95 - stats.latency_p50)
+        return latency * (1 + 4 * stats.error_rate) / max(stats.fill_rate, 0.1)
+
+    def ranked(self) -> list:
+        """
+        Return the providers that may receive a call now, best first. A provider whose cooldown is over is
+        let through for a single probe. If every circuit is open, the one that reopens first is returned.
+        """
+        now = time.time()
+        with self._lock:
+            available = []
+            for provider in self.providers:
+                stats = self.stats[provider]
+                if stats.open_until <= now and not stats.probing:
+                    available.append(provider)
+            if not available:
+                return [min(self.providers, key=lambda provider: self.stats[provider].open_until)]
+
+            available.sort(key=lambda provider: (self.expected_cost(provider), self.providers.index(provider)))
+            if len(available) > 1 and random.random() < self.explore_rate:
+                explored = random.choice(available[1:])
+                available.remove(explored)
+                available.insert(0, explored)
+            return available
+
+    def begin(self, provider: QueryProvider):
+        """
+        Mark the start of a call. A provider coming back from an open circuit gets one call at a time until it succeeds.
+        """
+        with self._lock:
+            stats = self.stats[provider]
+            if stats.cooldown > 0:
+                stats.probing = True
+
+    def record(self, provider: QueryProvider, latency: float = None, items: int = 0, requested: int = 0, error: Exception = None):
+        """
+        Record the outcome of a call and update the provider's circuit.
+        """
+        with self._lock:
+            stats = self.stats[provider]
+            stats.probing = False
+            if error is None:
+                stats.record_success(latency, min(1.0, items / requested) if requested else 1.0)
+                if stats.cooldown > 0:
+                    logger.info(f"Closing circuit for {provider.value}")
+                stats.cooldown = 0.0
+                stats.open_until = 0.0
+            else:
+                stats.record_failure()
+                if stats.consecutive_failures >= self.failure_threshold:
+                    stats.cooldown = min(self.max_cooldown, stats.cooldown * 2 if stats.cooldown else self.base_cooldown)
+                    stats.open_until = time.time() + stats.cooldown
+                    logger.warning(f"Opening circuit for {provider.value} for {stats.cooldown:.0f}s after {stats.consecutive_failures} failures: {error}")
+
+    def summary(self) -> dict:
+        """
+        Return the statistics of every provider.
+        """
+        with self._lock:
+            return {provider.value: stats.to_dict() for provider, stats in self.stats.items()}
+
+    def save(self):
+        """
+        Save the statistics to `state_path`.
+        """
+        if not self.state_path:
+            return
+        state = self.summary()
+        # Rounds verified in parallel may save at the same time, so each thread writes its own temporary file
+        tmp_path = f"{self.state_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def load(self):
+        """
+        Load statistics saved by `save`, ignoring providers that are no longer routed.
+        """
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            for provider in self.providers:
+                if provider.value in state:
+                    self.stats[provider].load(state[provider.value])
+            logger.info(f"Loaded router state from {self.state_path}")
+        except Exception as e:
+            logger.warning(f"Failed to load router state from {self.state_path}: {e}")
+
+    def _call(self, method: str, requested: int, *args):
+        """
+        Call `method` on the best provider, falling back to the next one if it raises.
+        """
+        error = None
+        for provider in self.ranked()[:2]:
+            self.begin(provider)
+            start = time.monotonic()
+            try:
+                items = getattr(self.queries[provider], method)(*args)
+            except Exception as e:
+                self.record(provider, error=e)
+                error = e
+                continue
+            self.record(provider, time.monotonic() - start, len(items), requested)
+            return items
+        raise error
+
+    async def _call_async(self, method: str, requested: int, *args):
+        error = None
+        for provider in self.ranked()[:2]:
+            self.begin(provider)
+            start = time.monotonic()
+            try:
+                items = await getattr(self.queries[provider], method)(*args)
+            except Exception as e:
+                self.record(provider, error=e)
+                error = e
+                continue
+            except BaseException:
+                # Cancelled: release the probe slot without counting it against the provider
+                with self._lock:
+                    self.stats[provider].probing = False
+                raise
+            self.record(provider, time.monotonic() - start, len(items), requested)
+            return items
+        raise error
+
+    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Search with the best provider.
+        """
+        return self._call("execute", limit_number, search_queries, limit_number, validator_key, validator_version, miner_uid)
+
+    async def execute_async(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Same as `execute`, without blocking the event loop.
+        """
+        return await self._call_async("execute_async", limit_number, search_queries, limit_number, validator_key, validator_version, miner_uid)
+
+    def searchByUrl(self, urls: list) -> list:
+        """
+        Look up items by url with the best provider.
+        """
+        return self._call("searchByUrl", len(urls), urls)
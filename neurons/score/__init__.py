@@ -17,4 +17,24 @@ OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE S
 DEALINGS IN THE SOFTWARE.
 """
 from . import twitter_score
-from . import reddit_score
\ No newline at end of file
+from . import reddit_score
+from neurons.queries import QueryType
+
+# Mapping between query types and the scorers of their responses, next to QUERY_MAP's scrapers
+SCORER_MAP = {
+    QueryType.TWITTER: twitter_score.scorer,
+    QueryType.REDDIT: reddit_score.scorer,
+}
+
+
+def get_scorer(query_type: QueryType):
+    """
+    Retrieve the scorer of a query type's responses.
+
+    Raises:
+        Exception: If no scorer is registered for the query type.
+    """
+    scorer = SCORER_MAP.get(query_type)
+    if scorer is None:
+        raise Exception("Invalid query type")
+    return scorer
@@ -0,0 +1,119 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import heapq
+import threading
+
+
+class MinerRecord:
+    """
+    Decayed counts of a miner's spot checked items that matched and that didn't.
+    """
+
+    def __init__(self):
+        self.passed = 0.0
+        self.failed = 0.0
+
+
+class BudgetAllocator:
+    """
+    Spreads a fixed number of spot checked items per round over the miners of the round.
+
+    Every miner with items gets one sample, as before. The rest of the budget goes, one sample at a time, to the
+    miner with the highest risk per sample already given: risk is the miner's failure rate with a prior of one
+    failure in two checks, so new miners and miners that were caught before get more samples, while consistently
+    correct miners get close to one. Older checks count for less and less through `decay`.
+    """
+
+    def __init__(self, budget: int = 50, max_per_miner: int = 5, decay: float = 0.9, history = None):
+        """
+        Initialize the BudgetAllocator.
+
+        Args:
+            budget (int, optional): Items spot checked per round. Never fewer than one per miner with items. Defaults to 50.
+            max_per_miner (int, optional): Most items checked for one miner in a round. Defaults to 5.
+            decay (float, optional): Weight of a miner's history at each new round it is checked in. Defaults to 0.9.
+            history (callable, optional): Returns the decayed (passed, failed) counts of a miner, e.g. from the
+                reputation store, which then keeps the record instead of the allocator. Defaults to None.
+        """
+        self.budget = budget
+        self.max_per_miner = max_per_miner
+        self.decay = decay
+        self.history = history
+        self.records = {}
+        self._lock = threading.Lock()
+
+    def risk(self, miner) -> float:
+        """
+        Return the chance the miner's next item is wrong, from its history.
+        """
+        if self.history is not None:
+            passed, failed = self.history(miner)
+        else:
+            with self._lock:
+                record = self.records.get(miner)
+                passed, failed = (record.passed, record.failed) if record else (0.0, 0.0)
+        return (failed + 1) / (passed + failed + 2)
+
+    def allocate(self, miners: list, lengths: list) -> list:
+        """
+        Decide how many items of each response to spot check.
+
+        Args:
+            miners (list): Hotkeys (or other stable keys) of the miners, in response order.
+            lengths (list): Number of items in each response.
+
+        Returns:
+            list: Number of items to check per response.
+        """
+        counts = [1 if length > 0 else 0 for length in lengths]
+        caps = [min(length, self.max_per_miner) for length in lengths]
+        spare = self.budget - sum(counts)
+        risks = [self.risk(miner) for miner in miners]
+        # Largest risk per sample first; ties go to the earlier response
+        heap = [(-risks[i] / (counts[i] + 1), i) for i in range(len(lengths)) if counts[i] < caps[i]]
+        heapq.heapify(heap)
+        while spare > 0 and heap:
+            _, i = heapq.heappop(heap)
+            counts[i] += 1
+            spare -= 1
+            if counts[i] < caps[i]:
+                heapq.heappush(heap, (-risks[i] / (counts[i] + 1), i))
+        return counts
+
+    def record(self, miner, passed: int, failed: int):
+        """
+        Add the outcome of a round's spot checks of a miner, unless the record is kept by `history`.
+        """
+        if passed + failed == 0 or self.history is not None:
+            return
+        with self._lock:
+            record = self.records.setdefault(miner, MinerRecord())
+            record.passed = record.passed * self.decay + passed
+            record.failed = record.failed * self.decay + failed
+
+    def stats(self) -> dict:
+        with self._lock:
+            records = list(self.records.values())
+        risks = [(record.failed + 1) / (record.passed + record.failed + 2) for record in records]
+        return {
+            "miners": len(records),
+            "budget": self.budget,
+            "mean_risk": round(sum(risks) / len(risks), 3) if risks else 0.0,
+        }
@@ -0,0 +1,376 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import array
+import torch
+
+# Marks an item without an id, or with an id that can't be counted
+NO_ID = -1
+
+# Weights of the score contributions, used unless a source brings its own table
+DEFAULT_WEIGHTS = {"age": 0.4, "length": 0.3, "similarity": 0.1, "relevancy": 0.2}
+
+
+def as_tensor(column: array.array, dtype: torch.dtype) -> torch.Tensor:
+    """
+    Copy a column into a tensor in one go, rather than converting it element by element as for a list.
+    """
+    if len(column) == 0:
+        # frombuffer rejects empty buffers
+        return torch.zeros(0, dtype=dtype)
+    return torch.frombuffer(column, dtype=dtype).clone()
+
+
+class ResponseColumns:
+    """
+    All items of a round's responses as flat columns: miner index, interned id, epoch timestamp and relevance, with
+    the round's keywords each item matches as a bit mask when a round searches several.
+
+    The scorers fill the columns in one pass over the items (the per-item format checks need Python anyway) and
+    `aggregate` computes every per-miner sum with tensor ops.
+    """
+
+    def __init__(self, miners: int):
+        """
+        Initialize the ResponseColumns.
+
+        Args:
+            miners (int): Number of responses in the round.
+        """
+        self.miners = miners
+        # Typed arrays, so the columns turn into tensors without a per-element conversion
+        self.miner = array.array('q')
+        self.code = array.array('q')
+        self.counted = array.array('b')
+        self.epoch = array.array('d')
+        self.relevant = array.array('b')
+        self.relevance_error = array.array('b')
+        self.keywords = []
+        self._codes = {}
+
+    def intern(self, item_id) -> int:
+        """
+        Return a dense integer code for an item id, the same for equal ids.
+        """
+        try:
+            return self._codes.setdefault(item_id, len(self._codes))
+        except TypeError:
+            return NO_ID
+
+    def add(self, miner: int, code: int, counted: bool, epoch: float, relevant: bool, relevance_error: bool = False,
+            keywords: int = 0):
+        """
+        Add an item. Items must be added miner by miner, in response order.
+
+        Args:
+            miner (int): Index of the response the item is in.
+            code (int): The interned id, or NO_ID.
+            counted (bool): Whether the item passed the checks that count its id towards duplicates.
+            epoch (float): The parsed timestamp, or None if it doesn't parse.
+            relevant (bool): Whether the item matches the search key.
+            relevance_error (bool, optional): Whether checking relevance failed on a malformed item. Defaults to False.
+            keywords (int, optional): Bit k is set if the item matches the round's k-th keyword. Defaults to 0.
+        """
+        self.miner.append(miner)
+        self.code.append(code)
+        self.counted.append(counted)
+        self.epoch.append(float("nan") if epoch is None else epoch)
+        self.relevant.append(relevant)
+        self.relevance_error.append(relevance_error)
+        self.keywords.append(keywords)
+
+    def aggregate(self, now: float, stop_on_error: bool = False, keywords: int = 1) -> dict:
+        """
+        Compute the per-miner sums.
+
+        An item's duplicate count is the number of counted items across all responses with its id, minus one. An item
+        whose id was never counted is an "id error", one whose timestamp doesn't parse an "epoch error".
+
+        Args:
+            now (float): Epoch seconds ages are measured from.
+            stop_on_error (bool, optional): Drop the rest of a response after its first erroring item, keeping what
+                that item contributed before the error (relevance, then duplicates, then age). Defaults to False, where
+                items with errors just don't contribute the failing part.
+            keywords (int, optional): Number of keywords of the round. With more than one, the relevant count,
+                similarity and age sum are also summed over the items matching each keyword. Defaults to 1.
+
+        Returns:
+            dict: Tensors with one entry per miner: relevant_count, similarity, age_sum (float64) and the bool
+                relevance_error, id_error and epoch_error. With several keywords, keyword_relevant_count,
+                keyword_similarity and keyword_age_sum are lists with one such tensor per keyword.
+        """
+        n = self.miners
+        miner = as_tensor(self.miner, torch.long)
+        code = as_tensor(self.code, torch.long)
+        counted = as_tensor(self.counted, torch.bool)
+        epoch = as_tensor(self.epoch, torch.float64)
+        relevant = as_tensor(self.relevant, torch.bool)
+        relevance_error = as_tensor(self.relevance_error, torch.bool)
+
+        has_id = code >= 0
+        counts = torch.bincount(code[counted & has_id], minlength=max(1, len(self._codes)))
+        item_counts = torch.where(has_id, counts[code.clamp(min=0)], torch.zeros_like(code))
+        id_error = item_counts == 0
+        duplicates = (item_counts - 1).clamp(min=0)
+        epoch_error = torch.isnan(epoch)
+
+        if stop_on_error:
+            error = relevance_error | id_error | epoch_error
+            # Errors in earlier items of the same response: a running count, minus the count before the response
+            per_miner = torch.bincount(miner, weights=error.to(torch.float64), minlength=n)
+            before_miner = torch.cumsum(per_miner, 0) - per_miner
+            errors_before = torch.cumsum(error.to(torch.float64), 0) - error.to(torch.float64) - before_miner[miner]
+            alive = errors_before == 0
+            relevance_ok = alive & ~relevance_error
+            similarity_ok = relevance_ok & ~id_error
+            age_ok = alive & ~error
+            # Only the first error of a response is reached, and it is of the first kind that fails
+            first_error = alive & error
+            relevance_error = first_error & relevance_error
+            id_error = first_error & ~relevance_error & id_error
+            epoch_error = first_error & ~relevance_error & ~id_error & epoch_error
+        else:
+            relevance_ok = ~relevance_error
+            similarity_ok = torch.ones_like(relevance_ok)
+            age_ok = ~epoch_error
+
+        relevant_count = torch.bincount(miner, weights=(relevant & relevance_ok).to(torch.float64), minlength=n)
+        similarity = torch.bincount(miner, weights=(duplicates * similarity_ok).to(torch.float64), minlength=n)
+        # Sums the ages of each response in item order, like adding them up one by one
+        age_sum = torch.zeros(n, dtype=torch.float64).index_add_(0, miner[age_ok], now - epoch[age_ok])
+
+        def any_per_miner(flags):
+            return torch.bincount(miner, weights=flags.to(torch.float64), minlength=n) > 0
+
+        aggregates = {
+            "relevant_count": relevant_count,
+            "similarity": similarity,
+            "age_sum": age_sum,
+            "relevance_error": any_per_miner(relevance_error),
+            "id_error": any_per_miner(id_error),
+            "epoch_error": any_per_miner(epoch_error),
+        }
+        if keywords > 1:
+            aggregates["keyword_relevant_count"] = []
+            aggregates["keyword_similarity"] = []
+            aggregates["keyword_age_sum"] = []
+            for k in range(keywords):
+                matches = torch.tensor([(mask >> k) & 1 == 1 for mask in self.keywords], dtype=torch.bool) & relevance_ok
+                aggregates["keyword_relevant_count"].append(torch.bincount(miner, weights=matches.to(torch.float64), minlength=n))
+                aggregates["keyword_similarity"].append(torch.bincount(miner, weights=(duplicates * (similarity_ok & matches)).to(torch.float64), minlength=n))
+                keyword_age_ok = age_ok & matches
+                aggregates["keyword_age_sum"].append(torch.zeros(n, dtype=torch.float64).index_add_(0, miner[keyword_age_ok], now - epoch[keyword_age_ok]))
+        return aggregates
+
+
+def keyword_metrics(lengths: list, aggregates: dict, keywords: list) -> dict:
+    """
+    Break a round with several keywords down by keyword, and replace the relevant count with the coverage of the
+    keywords: a response only counts as fully relevant if it has its share of items for every keyword.
+
+    Each keyword contributes min(1, K * matching items / items) / K to the relevant ratio, so a response split evenly
+    over the K keywords is as relevant as a response to a single keyword search that only has matching items, and one
+    that answers a single keyword of three at most a third.
+
+    Args:
+        lengths (list): Number of items in each response.
+        aggregates (dict): Output of `ResponseColumns.aggregate` with the per-keyword sums. The relevant count is replaced.
+        keywords (list): The keywords of the round, in bit order.
+
+    Returns:
+        dict: For every keyword, lists of the per-miner relevant ratio, average age and duplicate count of the items
+            matching it.
+    """
+    lengths64 = torch.tensor(lengths, dtype=torch.float64)
+    safe_lengths = lengths64.clamp(min=1)
+    coverage = torch.zeros_like(lengths64)
+    metrics = {}
+    for k, keyword in enumerate(keywords):
+        relevant_count = aggregates["keyword_relevant_count"][k]
+        has_matches = relevant_count > 0
+        relevant_ratio = relevant_count / safe_lengths
+        coverage = coverage + (relevant_ratio * len(keywords)).clamp(max=1) / len(keywords)
+        metrics[keyword] = {
+            "relevant_ratio": relevant_ratio.to(torch.float32).tolist(),
+            "average_age": torch.where(has_matches, aggregates["keyword_age_sum"][k] / relevant_count.clamp(min=1), torch.zeros_like(lengths64)).to(torch.float32).tolist(),
+            "similarity": aggregates["keyword_similarity"][k].tolist(),
+        }
+    aggregates["relevant_count"] = coverage * lengths64
+    return metrics
+
+
+def combine(lengths: list, aggregates: dict, correct: list, format_score: torch.Tensor, fake_score: torch.Tensor,
+            weights: dict = DEFAULT_WEIGHTS) -> dict:
+    """
+    Turn the per-miner figures of a round into the scoring metrics.
+
+    The arithmetic matches the original per-item loops exactly: per-miner averages are computed in float64 and
+    rounded to float32 once, as assigning a Python float into a float32 tensor did, and the maxima used for
+    normalization are taken over the float64 values.
+
+    Args:
+        lengths (list): Number of items in each response.
+        aggregates (dict): Output of `ResponseColumns.aggregate`.
+        correct (list): 1 for miners whose spot-checked item matched, else 0.
+        format_score (torch.Tensor): 1 for miners with malformed responses.
+        fake_score (torch.Tensor): 1 for miners caught faking items.
+        weights (dict, optional): Weights of the "age", "length", "similarity" and "relevancy" contributions. Defaults to DEFAULT_WEIGHTS.
+
+    Returns:
+        dict: Lists of per-miner metrics, including "normalized_scores".
+    """
+    age_weight, length_weight = weights["age"], weights["length"]
+    similarity_weight, relevancy_weight = weights["similarity"], weights["relevancy"]
+    lengths64 = torch.tensor(lengths, dtype=torch.float64)
+    has_items = lengths64 > 0
+    safe_lengths = lengths64.clamp(min=1)
+    zeros64 = torch.zeros_like(lengths64)
+
+    similarity64 = aggregates["similarity"]
+    average_age64 = torch.where(has_items, aggregates["age_sum"] / safe_lengths, zeros64)
+    relevant_ratio64 = torch.where(has_items, aggregates["relevant_count"] / safe_lengths, zeros64)
+
+    # Maxima start at 0, like the running maxima of the loops
+    max_similar_count = max(0, int(similarity64.max().item())) if len(lengths) else 0
+    max_correct_score = max([0] + list(correct))
+    max_length = max([0] + list(lengths))
+    max_average_age = max(0.0, average_age64.max().item()) if len(lengths) else 0.0
+
+    similarity_list = similarity64.to(torch.float32)
+    average_age_list = average_age64.to(torch.float32)
+    relevant_ratio = relevant_ratio64.to(torch.float32)
+    length_list = lengths64.to(torch.float32)
+    correct_list = torch.tensor(correct, dtype=torch.float32)
+
+    similarity_list = (similarity_list + 1) / (max_similar_count + 1)
+    correct_list = (correct_list + 1) / (max_correct_score + 1)
+    length_normalized = (length_list + 1) / (max_length + 1)
+
+    age_contribution = (1 - (average_age_list + 1) / (max_average_age + 1)) * age_weight
+    length_contribution = length_normalized * length_weight
+    similarity_contribution = (1 - similarity_list) * similarity_weight
+    relevancy_contribution = relevant_ratio * relevancy_weight
+
+    score_list = (similarity_contribution + age_contribution + length_contribution + relevancy_contribution)
+
+    pre_filtered_score = score_list.clone()
+
+    rejected = (correct_list < 1) | (format_score == 1) | (fake_score == 1) | (relevant_ratio < 0.5) | ~has_items
+    score_list = torch.where(rejected, torch.zeros_like(score_list), score_list)
+
+    filtered_scores = score_list.clone()
+
+    if torch.sum(score_list) == 0:
+        normalized_scores = score_list
+    else:
+        normalized_scores = score_list / torch.sum(score_list)
+
+    scoring_metrics = {
+        "correct": correct_list,
+        "similarity": similarity_list,
+        "average_age": average_age_list,
+        "time_contrib": age_contribution,
+        "length": length_list,
+        "length_contrib": length_contribution,
+        "similarity_contrib": similarity_contribution,
+        "relevancy_contrib": relevancy_contribution,
+        "format": format_score,
+        "fake": fake_score,
+        "pre_filtered_score": pre_filtered_score,
+        "filtered_scores": filtered_scores,
+        "normalized_scores": normalized_scores,
+    }
+
+    return {k: tensor.tolist() for k, tensor in scoring_metrics.items()}
+
+
+if __name__ == '__main__':
+    # Benchmark both scorers on a 256 miner round of 100 items each, with the spot checks answered locally, against
+    # the per-item scorers they replaced (neurons/score/baseline.py), and check that both give the same scores
+    import math
+    import time
+    import random
+    from datetime import datetime
+    from neurons.apify import stand_in
+    from neurons.apify.tweeter.tweet_flash_query import TweetFlashQuery
+    from neurons.apify.reddit.reddit_scraper_lite import RedditScraperLite
+    from neurons.score import twitter_score, reddit_score, baseline
+
+    miners, items = 256, 100
+    rng = random.Random(0)
+    tweets = TweetFlashQuery.mapper.map([stand_in.tweet_flash_item(stand_in.make_tweet(rng, "bittensor")) for _ in range(miners * items)])
+    posts = RedditScraperLite.mapper.map([stand_in.reddit_item(stand_in.make_reddit_post(rng, "bittensor")) for _ in range(miners * items)])
+
+    class LocalLookup:
+        def __init__(self, pool):
+            self.by_url = {item['url']: item for item in pool}
+            self.by_id = {item['id']: item for item in pool}
+
+        def searchByUrl(self, urls):
+            return [self.by_url[url] for url in urls if url in self.by_url]
+
+        def lookup(self, ids):
+            return [self.by_id[id] for id in ids if id in self.by_id]
+
+        def save(self):
+            pass
+
+    class RoundClock(datetime):
+        """
+        The per-item scorer's clock, stopped at the start of the round like the columnar scorer's, so both compute
+        the same ages.
+        """
+        started = None
+
+        @classmethod
+        def utcnow(cls):
+            return cls.started
+
+    def score_both(module, reference, responses):
+        RoundClock.started = datetime.utcfromtimestamp(time.time())
+        start = time.perf_counter()
+        scores = module.calculateScore(responses, "bittensor")
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        reference_scores = reference(responses, "bittensor")
+        reference_elapsed = time.perf_counter() - start
+        return scores, elapsed, reference_scores, reference_elapsed
+
+    baseline.datetime = RoundClock
+    twitter_score.twitter_query = baseline.twitter_query = LocalLookup(tweets)
+    reddit_score.reddit_query = baseline.reddit_query = LocalLookup(posts)
+    for name, module, reference, pool in [
+        ("twitter", twitter_score, baseline.twitter_calculateScore, tweets),
+        ("reddit", reddit_score, baseline.reddit_calculateScore, posts),
+    ]:
+        responses = [pool[i * items:(i + 1) * items] for i in range(miners)]
+        scores, elapsed, reference_scores, reference_elapsed = score_both(module, reference, responses)
+        print(f"{name:<8} {elapsed * 1000:>8.1f} ms per round  ({miners * items / elapsed:,.0f} items/s, {sum(1 for s in scores['normalized_scores'] if s)} miners scored)")
+        print(f"{'':<8} {reference_elapsed * 1000:>8.1f} ms with the per-item scorer ({reference_elapsed / elapsed:.1f}x)")
+
+        # The per-item scorer looks up at most 40 tweets a round, so the scores after the spot checks are compared on
+        # a round every miner's sample fits in
+        small_scores, _, small_reference_scores, _ = score_both(module, reference, responses[:20])
+        compared = [
+            (scores["pre_filtered_score"], reference_scores["pre_filtered_score"]),
+            (small_scores["normalized_scores"], small_reference_scores["normalized_scores"]),
+        ]
+        for values, reference_values in compared:
+            for value, reference_value in zip(values, reference_values):
+                assert math.isclose(value, reference_value, rel_tol = 1e-5), f"{name} scores differ from the per-item scorer"
@@ -0,0 +1,316 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import time
+import random
+import torch
+import bittensor as bt
+from neurons.score.columnar import ResponseColumns, NO_ID, DEFAULT_WEIGHTS, combine, keyword_metrics
+from neurons.score.matcher import get_matcher, normalize
+
+
+class ItemValidator:
+    """
+    The format checks of one source's items. Subclasses override `check` and `relevance_texts`.
+    """
+
+    # Name of an item in logs
+    item_name = "item"
+    # Whether a response's sums stop at its first malformed item
+    stop_on_error = False
+    # Whether an unparseable timestamp marks the response as fake rather than malformed
+    bad_date_is_fake = False
+
+    def check(self, item: dict, miner: int, now: float, seen_ids: set) -> tuple:
+        """
+        Check one item of a response.
+
+        Args:
+            item (dict): The item.
+            miner (int): Index of the response, for logs.
+            now (float): Epoch seconds of the start of scoring.
+            seen_ids (set): Ids of the items checked so far in this response. The item's id is added once counted.
+
+        Returns:
+            tuple: (epoch, counted, format_error, fake_error). epoch is the parsed timestamp or None, counted whether
+                the id counts towards duplicates across miners.
+        """
+        raise NotImplementedError
+
+    def relevance_texts(self, item: dict):
+        """
+        Yield the fields of the item searched for the round's keywords, most telling first. Later fields are only
+        read while a keyword is still unmatched, so they may raise on malformed items without failing items that
+        already matched.
+        """
+        raise NotImplementedError
+
+
+class Verifier:
+    """
+    Spot checks of one source: which key to look a sampled item up by, how to fetch the originals and how to compare.
+    """
+
+    item_name = "item"
+    # Fields of the originals that `matches` compares, kept by the verification cache
+    fields = ("id", "text", "timestamp")
+
+    def key(self, item: dict):
+        """
+        Return the key to fetch the original of a sampled item with, or None if it can't be looked up.
+        """
+        raise NotImplementedError
+
+    def fetch(self, keys: list) -> tuple:
+        """
+        Fetch the original items for a list of keys. Items that can't be found are left out.
+
+        Returns:
+            tuple: (originals, unchecked). unchecked is the set of keys whose lookup errored or missed the deadline,
+                as opposed to keys that were looked up and not found.
+        """
+        raise NotImplementedError
+
+    def matches(self, sample: dict, original: dict, miner: int) -> bool:
+        """
+        Whether a miner's item agrees with the original.
+        """
+        raise NotImplementedError
+
+
+class Scorer:
+    """
+    Scores a round of responses of one source: format checks, spot checks, then the columnar per-miner sums.
+
+    Everything source specific is in the validator, verifier and weight table, so the scoring loop is shared.
+    """
+
+    def __init__(self, name: str, validator: ItemValidator, verifier: Verifier, weights: dict = DEFAULT_WEIGHTS, cache = None,
+                 allocator = None):
+        """
+        Initialize the Scorer.
+
+        Args:
+            name (str): Name of the source.
+            validator (ItemValidator): The item format checks.
+            verifier (Verifier): The spot checks.
+            weights (dict, optional): Weights of the "age", "length", "similarity" and "relevancy" contributions. Defaults to DEFAULT_WEIGHTS.
+            cache (VerificationCache, optional): Answers spot checks with recently verified originals. Defaults to None.
+            allocator (BudgetAllocator, optional): Decides how many items of each miner to spot check. Defaults to one each.
+        """
+        self.name = name
+        self.validator = validator
+        self.verifier = verifier
+        self.weights = weights
+        self.cache = cache
+        self.allocator = allocator
+
+    def check_responses(self, responses: list, tags: list, now: float) -> tuple:
+        """
+        Check the format of every item once and lay the items out as columns. An item is relevant if its texts
+        contain one of the search keys, found with the keyword matcher in one pass over them.
+
+        Returns:
+            tuple: (columns, format_flags, fake_flags).
+        """
+        validator = self.validator
+        matcher = get_matcher(frozenset(tags))
+        # Bit k of an item's mask is set if it matches the k-th search key
+        bits = {}
+        for k, tag in enumerate(tags):
+            keyword = normalize(tag)
+            bits[keyword] = bits.get(keyword, 0) | 1 << k
+        all_bits = (1 << len(tags)) - 1
+        format_flags = [0] * len(responses)
+        fake_flags = [0] * len(responses)
+        columns = ResponseColumns(len(responses))
+        for i, response in enumerate(responses):
+            if response == None:
+                responses[i] = []
+                response = []
+                format_flags[i] = 1
+            seen_ids = set()
+            for item in response:
+                epoch, counted, format_error, fake_error = validator.check(item, i, now, seen_ids)
+                if format_error:
+                    format_flags[i] = 1
+                if fake_error:
+                    fake_flags[i] = 1
+                try:
+                    mask = 0
+                    for text in validator.relevance_texts(item):
+                        for keyword in matcher.find_all([text]):
+                            mask |= bits.get(keyword, 0)
+                        if mask == all_bits:
+                            break
+                    relevance_error = False
+                except Exception as e:
+                    bt.logging.warning(f"❌ Bad format for {validator.item_name}: {e}, {item}")
+                    mask, relevance_error = 0, True
+                code = columns.intern(item['id']) if isinstance(item, dict) and 'id' in item else NO_ID
+                columns.add(i, code, counted, epoch, mask != 0, relevance_error, mask)
+        return columns, format_flags, fake_flags
+
+    def spot_check(self, responses: list, miners: list = None) -> list:
+        """
+        Compare random items of each response with the originals. Without an allocator one item per response is
+        checked, otherwise as many as the allocator gives the miner.
+
+        A sampled item that differs from its original is a failure, and so is one whose original wasn't found, as a
+        fabricated item can't be found either. Only samples whose lookup errored or missed the deadline are left out,
+        so a flaky lookup doesn't mark down miners that get more samples.
+
+        Args:
+            responses (list): The responses of the round.
+            miners (list, optional): Hotkeys of the miners, in response order, for the allocator. Defaults to the indices.
+
+        Returns:
+            tuple: (correct, checked, failed) lists: 1 for miners whose sampled items matched with no failures
+                (else 0), and the number of items checked and failed for every miner.
+        """
+        verifier = self.verifier
+        if miners is None:
+            miners = list(range(len(responses)))
+        if self.allocator is not None:
+            counts = self.allocator.allocate(miners, [len(response) for response in responses])
+        else:
+            counts = [1 if len(response) > 0 else 0 for response in responses]
+
+        spot_check_idx = []
+        spot_check_keys = []
+        # Items sampled for several miners are looked up once
+        keys = {}
+        for response, count in zip(responses, counts):
+            if count == 1:
+                item_idx = [random.randrange(len(response))]
+            else:
+                item_idx = random.sample(range(len(response)), count)
+            spot_check_idx.append(item_idx)
+            sample_keys = []
+            for j in item_idx:
+                key = verifier.key(response[j])
+                if key is not None:
+                    try:
+                        keys.setdefault((key, response[j].get('id')))
+                    except TypeError:
+                        # An id a miner sent as a list or dict can't be looked up
+                        key = None
+                sample_keys.append(key)
+            spot_check_keys.append(sample_keys)
+        keys = list(keys)
+
+        originals = []
+        if len(keys) > 0 and self.cache is not None:
+            try:
+                cached = self.cache.get_many(self.name, [item_id for _, item_id in keys if item_id is not None])
+                originals = list(cached.values())
+                keys = [(key, item_id) for key, item_id in keys if str(item_id) not in cached]
+                bt.logging.info(f"{len(cached)} {verifier.item_name}s verified from cache, fetching {len(keys)}.")
+            except Exception as e:
+                bt.logging.error(f"❌ Error reading the verification cache: {e}")
+        # Keys that couldn't be looked up, so their samples are neither passed nor failed
+        unchecked = set()
+        if len(keys) > 0:
+            try:
+                fetched, unchecked = verifier.fetch([key for key, _ in keys])
+                originals += fetched
+                if self.cache is not None:
+                    self.cache.add(self.name, fetched, verifier.fields)
+            except Exception as e:
+                bt.logging.error(f"❌ Error while verifying {verifier.item_name}: {e}")
+                unchecked = {key for key, _ in keys}
+
+        # The first original of each id, as the miners' samples are matched by id
+        originals_by_id = {}
+        for item in originals:
+            originals_by_id.setdefault(item.get('id'), item)
+
+        correct, checked, failures = [], [], []
+        for i, response in enumerate(responses):
+            passed = failed = 0
+            for j, key in zip(spot_check_idx[i], spot_check_keys[i]):
+                sample_item = response[j]
+                try:
+                    original = originals_by_id.get(sample_item.get('id'))
+                except TypeError:
+                    # An id a miner sent as a list or dict can't match anything
+                    original = None
+                if not original and key is not None and key in unchecked:
+                    bt.logging.info(f"Lookup failed for {sample_item}, leaving it out (miner_idx={i})")
+                elif not original:
+                    bt.logging.info(f"No result returned for {sample_item} (miner_idx={i})")
+                    failed += 1
+                elif verifier.matches(sample_item, original, i):
+                    passed += 1
+                else:
+                    failed += 1
+            if self.allocator is not None:
+                self.allocator.record(miners[i], passed, failed)
+            correct.append(1 if passed > 0 and failed == 0 else 0)
+            checked.append(passed + failed)
+            failures.append(failed)
+        return correct, checked, failures
+
+    def calculateScore(self, responses: list = [], tag = 'tao', miners: list = None) -> dict:
+        """
+        Calculate the scores of a round of responses.
+
+        A round may search several keywords at once. Its relevance is then the coverage of the keywords (see
+        `keyword_metrics`), and the relevance, age and duplicates of the items matching each keyword are reported in
+        "keyword_metrics".
+
+        Args:
+            responses (list): The list of responses, None for miners that didn't answer.
+            tag (str or list): The search key of the round, or its list of search keys.
+            miners (list, optional): Hotkeys of the miners, in response order. Defaults to None.
+
+        Returns:
+            dict: Lists of per-miner metrics, with the final scores in "normalized_scores".
+        """
+        if len(responses) == 0:
+            return []
+        tags = [tag] if isinstance(tag, str) else list(tag)
+
+        # Every timestamp is parsed once, and ages are measured from one clock reading
+        now = time.time()
+        columns, format_flags, fake_flags = self.check_responses(responses, tags, now)
+        correct, checked, failures = self.spot_check(responses, miners)
+
+        aggregates = columns.aggregate(now, stop_on_error = self.validator.stop_on_error, keywords = len(tags))
+        lengths = [len(response) for response in responses]
+        per_keyword = keyword_metrics(lengths, aggregates, tags) if len(tags) > 1 else None
+        errors = zip(aggregates["epoch_error"].tolist(), aggregates["relevance_error"].tolist(), aggregates["id_error"].tolist())
+        for i, (epoch_error, relevance_error, id_error) in enumerate(errors):
+            if epoch_error:
+                bt.logging.info(f"Miner {i} had a {self.validator.item_name} with a bad date format")
+                if self.validator.bad_date_is_fake:
+                    fake_flags[i] = 1
+                else:
+                    format_flags[i] = 1
+            if relevance_error or id_error:
+                format_flags[i] = 1
+
+        format_score = torch.tensor(format_flags, dtype=torch.float32)
+        fake_score = torch.tensor(fake_flags, dtype=torch.float32)
+        scoring_metrics = combine(lengths, aggregates, correct, format_score, fake_score, weights = self.weights)
+        scoring_metrics["spot_checked"] = checked
+        scoring_metrics["spot_check_failed"] = failures
+        if per_keyword is not None:
+            scoring_metrics["keyword_metrics"] = per_keyword
+        return scoring_metrics
@@ -19,271 +19,204 @@ DEALINGS IN THE SOFTWARE.
 
 # importing necessary libraries and modules
 
-import torch
-from datetime import datetime
-import random
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
 import bittensor as bt
 from urllib.parse import urlparse
 import os
 import re
 import html
 from neurons.queries import get_query, QueryType, QueryProvider
+from neurons.router import ProviderRouter
+from neurons.apify.telemetry import actor_caller
+from neurons.apify.actors import actor_deadline
+from neurons.utils import utc_timestamp_to_epoch, TWITTER_TIMESTAMP_FORMAT
+from neurons.score.core import ItemValidator, Verifier, Scorer
 
-twitter_query = get_query(QueryType.TWITTER, QueryProvider.APIDOJO_TWEET_SCRAPER)
+# Spot checks stay on one provider, as the texts of other providers' url lookups don't always match the miners' tweets
+# exactly. The router keeps its latency and error statistics; the validator sets where they are saved.
+twitter_query = ProviderRouter(QueryType.TWITTER, [QueryProvider.APIDOJO_TWEET_SCRAPER])
+
+
+# Hosts of the status urls a spot check looks up
+TWITTER_HOSTS = {"twitter.com", "www.twitter.com", "mobile.twitter.com", "x.com", "www.x.com", "mobile.x.com"}
 
 
 def parse_date(dateStr: str):
-    return datetime.strptime(dateStr, '%Y-%m-%d %H:%M:%S+00:00')
+    """
+    Parse a tweet timestamp to epoch seconds. Raises ValueError unless it has the "%Y-%m-%d %H:%M:%S+00:00" format.
+    """
+    return utc_timestamp_to_epoch(dateStr, TWITTER_TIMESTAMP_FORMAT)
+
 
-def calculateScore(responses = [], tag = 'tao'):
+class TweetValidator(ItemValidator):
     """
-    This function calculates the score of responses.
-    The score is calculated by the degree of similarity between responses, accuracy and time difference.
-    Args:
-        responses (list): The list of responses.
-        tag (str): The tag of responses.
-    Returns:
-        list: The list of scores for each response.
+    Format checks of tweets.
     """
-    if len(responses) == 0:
-        return []
-    
-    # Initialize variables
-    # Initialize score list. The length of score list is the same as the length of responses.
-    score_list = torch.zeros(len(responses))
-    # Initialize average age list. The length of average age list is the same as the length of responses.
-    average_age_list = torch.zeros(len(responses))
-
-    correct_score = 0
-    max_correct_score = 0
-    max_average_age = 0
-
-    # Initialize similarity list. The length of similarity list is the same as the length of responses.
-    similarity_list = torch.zeros(len(responses))
-    max_similar_count = 0
-    # Initialize length list. The length score list is the same as the length of responses.
-    length_list = torch.zeros(len(responses))
-    correct_list = torch.ones(len(responses))
-    total_length = 0
-    max_length = 0
-    relevant_ratio = torch.zeros(len(responses))
-
-    format_score = torch.zeros(len(responses))
-    fake_score = torch.zeros(len(responses))
-    
-    # Count the number of occurrences of each ID
-    id_counts = {}
-    for i, response in enumerate(responses):
-
-        if response == None:
-            responses[i] = []
-            response = []
-            format_score[i] = 1
-        id_list = []
-        for tweet in response:
-            try:
-                # A single tweet in the response in the far future can usually skip validation, but
-                # will effect average age significantly and boost score. A future tweet will invalidate
-                # this response.
-                date_object = parse_date(tweet['timestamp'])
-                age = datetime.utcnow() - date_object
-                if age.total_seconds() < 0:
-                    bt.logging.warning(f"Faked future tweet: {tweet}")
-                    fake_score[i] = 1
-
-                if tweet['id'] in id_list or tweet['id'] not in tweet['url']:
-                    fake_score[i] = 1
-                else:
-                    id_list.append(tweet['id'])
-                
-                parsed_url = urlparse(tweet['url'])
-                # Extract the path from the URL 
-                path = parsed_url.path
-                # Get the last component of the path
-                last_component = os.path.basename(path)
-                if last_component != tweet['id']:
-                    bt.logging.warning(f"miner {i} id/url mismatch detected: url={tweet['url']}, id={tweet['id']}")
-                    fake_score[i] = 1
-
-                tweet_id = tweet['id']
-                if tweet_id in id_counts:
-                    id_counts[tweet_id] += 1
-                else:
-                    id_counts[tweet_id] = 1
-
-                if not tweet.get('username'):
-                    format_score[i] = 1
-                    bt.logging.warning(f"❌ Tweet missing username: {e}, {tweet}")
-
-            except Exception as e:
-                bt.logging.warning(f"❌ Bad format for tweet: {e}, {tweet}")
-                format_score[i] = 1
-
-    # Choose random responses from each miner to compare, and gather their urls
-    spot_check_idx = []
-    spot_check_urls = []
-    spot_check_tweets = []
-    for i, response in enumerate(responses):
-        if len(response) > 0:
-            item_idx = random.randrange(len(response))
-            spot_check_idx.append(item_idx)
-            url = response[item_idx].get('url')
-            if url and re.search("(twitter.com|x.com)\/\w+\/status\/\d+", url):
-                spot_check_urls.append(url)
-        else:
-            spot_check_idx.append(None)
 
-    # Fetch spot check urls
-    if len(spot_check_urls) > 0:
+    item_name = "tweet"
+    bad_date_is_fake = True
+
+    def check(self, tweet, miner, now, seen_ids):
+        epoch = None
+        counted = format_error = fake_error = False
+        try:
+            # A single tweet in the response in the far future can usually skip validation, but
+            # will effect average age significantly and boost score. A future tweet will invalidate
+            # this response.
+            epoch = parse_date(tweet['timestamp'])
+            if now - epoch < 0:
+                bt.logging.warning(f"Faked future tweet: {tweet}")
+                fake_error = True
+
+            if tweet['id'] in seen_ids or tweet['id'] not in tweet['url']:
+                fake_error = True
+            else:
+                seen_ids.add(tweet['id'])
+
+            parsed_url = urlparse(tweet['url'])
+            # Extract the path from the URL
+            path = parsed_url.path
+            # Get the last component of the path
+            last_component = os.path.basename(path)
+            if last_component != tweet['id']:
+                bt.logging.warning(f"miner {miner} id/url mismatch detected: url={tweet['url']}, id={tweet['id']}")
+                fake_error = True
+
+            # The id counts towards duplicates across miners
+            counted = True
+
+            if not tweet.get('username'):
+                format_error = True
+                bt.logging.warning(f"❌ Tweet missing username: {tweet}")
+
+        except Exception as e:
+            bt.logging.warning(f"❌ Bad format for tweet: {e}, {tweet}")
+            format_error = True
+        return epoch, counted, format_error, fake_error
+
+    def relevance_texts(self, tweet):
+        yield tweet['text']
+        yield tweet.get('username', '')
+
+
+class TweetVerifier(Verifier):
+    """
+    Spot checks tweets by looking up their urls.
+
+    The urls are split into shards looked up by concurrent actor runs, all under one deadline, so verification takes
+    about as long for a few hundred miners as for a few. A second try only looks up the tweets still missing. Actor
+    runs still going at the deadline are aborted.
+    """
+
+    item_name = "tweet"
+    fields = ("id", "text", "timestamp", "username")
+
+    def __init__(self, shard_size: int = 20, max_shards: int = 16, deadline: float = 180, tries: int = 2):
+        """
+        Initialize the TweetVerifier.
+
+        Args:
+            shard_size (int, optional): Urls looked up by one actor run. Defaults to 20.
+            max_shards (int, optional): Actor runs at once. Defaults to 16.
+            deadline (float, optional): Seconds all tries of a round's lookups may take together. Defaults to 180.
+            tries (int, optional): Lookups of a missing tweet. Defaults to 2.
+        """
+        self.shard_size = shard_size
+        self.max_shards = max_shards
+        self.deadline = deadline
+        self.tries = tries
+        self._executor = ThreadPoolExecutor(max_workers=max_shards, thread_name_prefix="spot_check")
+
+    def key(self, tweet):
+        url = tweet.get('url')
+        if not url or not isinstance(url, str):
+            return None
+        parsed_url = urlparse(url)
+        if parsed_url.hostname in TWITTER_HOSTS and re.fullmatch(r"/\w+/status/\d+", parsed_url.path):
+            return url
+        return None
+
+    def search_shard(self, urls: list, deadline: float) -> tuple:
+        """
+        Look up one shard of urls, aborting the actor run at the deadline.
+
+        Returns:
+            tuple: (tweets, complete). complete is False if the deadline cut the lookup short.
+        """
+        if time.monotonic() >= deadline:
+            return [], False
+        with actor_caller("validator_spot_check"), actor_deadline(deadline):
+            tweets = twitter_query.searchByUrl(urls)
+        return tweets, time.monotonic() < deadline
+
+    def fetch(self, spot_check_urls):
+        spot_check_tweets = []
+        deadline = time.monotonic() + self.deadline
+        # Every distinct url is looked up, as miners may send different urls with the same id
+        remaining = set(spot_check_urls)
+        # Urls of shards that completed, so a missing tweet among them wasn't found rather than not looked up
+        checked = set()
         try:
-            spot_check_tweets = []
-            found_urls = set()
             tries = 0
-            remaining_urls = set(spot_check_urls)
-            while tries < 2 and len(remaining_urls) > 0:
-                urls = random.sample(sorted(remaining_urls), k=min(20, len(remaining_urls)))
-                bt.logging.info(f"Fetching {len(urls)} tweets out of {len(remaining_urls)} remaining to validate.")
-                batch_tweets = twitter_query.searchByUrl(urls)
-                batch_urls = set([tweet['url'] for tweet in batch_tweets])
-                bt.logging.info(f"Fetched {len(batch_urls)}.")
-                remaining_urls = remaining_urls - set(batch_urls)
-                spot_check_tweets += batch_tweets
+            while tries < self.tries and len(remaining) > 0 and time.monotonic() < deadline:
+                urls = sorted(remaining)
+                shards = [urls[i:i + self.shard_size] for i in range(0, len(urls), self.shard_size)]
+                bt.logging.info(f"Fetching {len(urls)} tweets to validate in {len(shards)} shards.")
+                futures = {self._executor.submit(self.search_shard, shard, deadline): shard for shard in shards}
+                done, not_done = wait(futures, timeout = max(0, deadline - time.monotonic()))
+                for future in done:
+                    try:
+                        tweets, complete = future.result()
+                        spot_check_tweets += tweets
+                        if complete:
+                            checked.update(futures[future])
+                    except Exception as e:
+                        bt.logging.error(f"❌ Error while fetching a shard of tweets: {e}")
+                if not_done:
+                    bt.logging.warning(f"{len(not_done)}/{len(shards)} spot check shards missed the deadline.")
+                    # Shards still queued don't start; running ones abort their actor runs at the deadline
+                    for future in not_done:
+                        future.cancel()
+                # The id is the last component of a status url
+                found = {tweet.get('id') for tweet in spot_check_tweets}
+                remaining = {url for url in remaining if os.path.basename(urlparse(url).path) not in found}
                 tries += 1
-            found_urls = [tweet['url'] for tweet in spot_check_tweets]
-            missing_urls = set(spot_check_urls) - set(found_urls)
-            bt.logging.info(f"Missing {len(missing_urls)}/{len(spot_check_urls)} tweets.")
+            bt.logging.info(f"Missing {len(remaining)}/{len(set(spot_check_urls))} tweets, {len(remaining - checked)} of them not looked up.")
+            twitter_query.save()
         except Exception as e:
             print(traceback.format_exc())
             bt.logging.error(f"❌ Error while verifying tweet: {e}")
-
-    # Calculate score for each response
-    for i, response in enumerate(responses):
-        # initialize variables
-        similarity_score = 0
-        relevant_count = 0
-        age_sum = 0
-        total_length += len(response)
-        # calculate max_length
-        if len(response) > max_length:
-            max_length = len(response)
-
-        # Do spot check for this miner
-        correct_score = 0
-        if len(response) > 0:
-            sample_item = response[spot_check_idx[i]]
-            searched_item = next((tweet for tweet in spot_check_tweets if tweet['id'] == sample_item['id']), None)
-            if searched_item:
-                # Normalize text to account for variations in scraped data.
-                miner_text = sample_item['text']
-                verify_text = searched_item['text']
-
-                if verify_text != miner_text:
-                    bt.logging.info(f"Text does not match! (miner_idx = {i}) {sample_item}")
-                    bt.logging.info(f"Original tweet: {searched_item}")
-                elif searched_item['timestamp'] != sample_item['timestamp']:
-                    bt.logging.info(f"Timestamp does not match! (miner_idx = {i}) {sample_item}")
-                    bt.logging.info(f"Original tweet: {searched_item}")
-                elif searched_item['username'] != sample_item['username']:
-                    bt.logging.info(f"Username does not match! (miner_idx = {i}) {sample_item}")
-                    bt.logging.info(f"Original tweet: {searched_item}")
-                else:
-                    correct_score = 1
-            else: 
-                bt.logging.info(f"No result returned for {sample_item} (miner_idx={i})")
-
-        # calculate scores
-        for item in response:
-            if tag.lower() in item['text'].lower() or tag.lower() in item.get('username', '').lower():
-                relevant_count += 1
-            # calculate similarity score
-            similarity_score += (id_counts[item['id']] - 1)
-            # calculate time difference score
-            try:
-                date_object = parse_date(item['timestamp'])
-                age = datetime.utcnow() - date_object
-                age_sum += age.total_seconds()
-            except Exception as e:
-                # Mark as fake data if date format incorrect
-                fake_score[i] = 1
-                bt.logging.info(f"Tweet had bad date format: {e}")
-
-        if max_similar_count < similarity_score:
-            max_similar_count = similarity_score
-        if max_correct_score < correct_score:
-            max_correct_score = correct_score
-
-        similarity_list[i] = similarity_score
-        length_list[i] = len(response)
-        correct_list[i] = correct_score
-
-        if len(response) > 0:
-            relevant_ratio[i] = relevant_count / len(response)
-            average_age = age_sum / len(response)
+        return spot_check_tweets, remaining - checked
+
+    def matches(self, sample_item, searched_item, miner):
+        if searched_item['text'] != sample_item['text']:
+            bt.logging.info(f"Text does not match! (miner_idx = {miner}) {sample_item}")
+            bt.logging.info(f"Original tweet: {searched_item}")
+        elif searched_item['timestamp'] != sample_item['timestamp']:
+            bt.logging.info(f"Timestamp does not match! (miner_idx = {miner}) {sample_item}")
+            bt.logging.info(f"Original tweet: {searched_item}")
+        elif searched_item['username'] != sample_item['username']:
+            bt.logging.info(f"Username does not match! (miner_idx = {miner}) {sample_item}")
+            bt.logging.info(f"Original tweet: {searched_item}")
         else:
-            relevant_ratio[i] = 0
-            average_age = 0 # 0 is the "best" age, but miners with no tweets will still score 0
-
-        if max_average_age < average_age:
-            max_average_age = average_age
-
-        average_age_list[i] = average_age
-
-
-    similarity_list = (similarity_list + 1) / (max_similar_count + 1)
-    correct_list = (correct_list + 1) / (max_correct_score + 1)
-    length_normalized = (length_list + 1) / (max_length + 1)
-
-    age_contribution = (1 - (average_age_list + 1) / (max_average_age + 1)) * 0.4
-    length_contribution = length_normalized * 0.3
-    similarity_contribution = (1 - similarity_list) * 0.1
-    relevancy_contribution = relevant_ratio * 0.2
-
-    score_list = (similarity_contribution + age_contribution + length_contribution + relevancy_contribution)
-
-    pre_filtered_score = score_list.clone()
-
-    for i, correct_list_item in enumerate(correct_list):
-        if correct_list_item < 1:
-            score_list[i] = 0
-        if format_score[i] == 1:
-            score_list[i] = 0
-        if fake_score[i] == 1:
-            score_list[i] = 0
-        if relevant_ratio[i] < 0.5:
-            score_list[i] = 0
-
-    for i, response in enumerate(responses):
-        if response == [] or response == None:
-            score_list[i] = 0
-    # normalize score list
-            
-    filtered_scores = score_list.clone()
-
-    if torch.sum(score_list) == 0:
-        normalized_scores = score_list
-    else:
-        normalized_scores = score_list / torch.sum(score_list)
-
-    scoring_metrics = {
-        "correct": correct_list,
-        "similarity": similarity_list,
-        "average_age": average_age_list,
-        "time_contrib": age_contribution,
-        "length": length_list,
-        "length_contrib": length_contribution,
-        "similarity_contrib": similarity_contribution,
-        "relevancy_contrib": relevancy_contribution,
-        "format": format_score,
-        "fake": fake_score,
-        "pre_filtered_score": pre_filtered_score,
-        "filtered_scores": filtered_scores,
-        "normalized_scores": normalized_scores,
-    }
-
-    return {k: [v.item() for v in tensor] for k, tensor in scoring_metrics.items()}
-        
-
-
-    
+            return True
+        return False
+
+
+scorer = Scorer("twitter", TweetValidator(), TweetVerifier(), weights = {"age": 0.4, "length": 0.3, "similarity": 0.1, "relevancy": 0.2})
 
+
+def calculateScore(responses = [], tag = 'tao', miners = None):
+    """
+    This function calculates the score of responses.
+    The score is calculated by the degree of similarity between responses, accuracy and time difference.
+    Args:
+        responses (list): The list of responses.
+        tag (str or list): The search key of the round, or its list of search keys.
+        miners (list): Hotkeys of the miners, in response order.
+    Returns:
+        dict: Lists of per-miner scoring metrics, including "normalized_scores".
+    """
+    return scorer.calculateScore(responses, tag, miners)
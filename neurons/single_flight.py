@@ -0,0 +1,172 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from neurons.queries import QueryType, QueryProvider
+from neurons.query_cache import QueryCache
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+
+class _LeaderCancelled(Exception):
+    """
+    Set on a shared call when the caller that started it was cancelled, so waiting callers start a new one.
+    """
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into a single execution.
+
+    The first caller for a key runs the call; callers arriving while it is in flight wait for and share its result.
+    A concurrent.futures.Future is used as the shared handle, so sync callers (e.g. the prewarm thread) and async
+    callers on the axon's event loop can coalesce with each other.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.originated = 0
+        self.coalesced = 0
+
+    def _join(self, key) -> tuple:
+        """
+        Return (future, is_leader) for `key`, registering a new in-flight call if there is none.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.originated += 1
+            return future, True
+
+    def _finish(self, key, future: Future):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def do(self, key, fn):
+        """
+        Run `fn()` unless a call for `key` is already in flight, in which case wait for its result.
+        """
+        while True:
+            future, is_leader = self._join(key)
+            if not is_leader:
+                try:
+                    return future.result()
+                except _LeaderCancelled:
+                    continue
+
+            try:
+                result = fn()
+            except BaseException as e:
+                future.set_exception(e if isinstance(e, Exception) else _LeaderCancelled())
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                self._finish(key, future)
+
+    async def do_async(self, key, coroutine_fn):
+        """
+        Await `coroutine_fn()` unless a call for `key` is already in flight, in which case await its result.
+        Cancelling a waiting caller doesn't affect the shared call.
+        """
+        while True:
+            future, is_leader = self._join(key)
+            if not is_leader:
+                try:
+                    return await asyncio.shield(asyncio.wrap_future(future))
+                except _LeaderCancelled:
+                    continue
+
+            try:
+                result = await coroutine_fn()
+            except asyncio.CancelledError:
+                future.set_exception(_LeaderCancelled())
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                self._finish(key, future)
+
+    def stats(self) -> dict:
+        """
+        Return the number of originated and coalesced calls.
+        """
+        with self._lock:
+            return {
+                "originated": self.originated,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+class SingleFlightQuery:
+    """
+    Wraps a query object so that concurrent identical searches share one actor run.
+
+    Any attribute that is not overridden here is forwarded to the wrapped query.
+    """
+
+    def __init__(self, query, query_type: QueryType, query_provider: QueryProvider, flight: SingleFlight):
+        """
+        Initialize the SingleFlightQuery.
+
+        Args:
+            query: The query object to wrap.
+            query_type (QueryType): The type of the wrapped query.
+            query_provider (QueryProvider): The provider of the wrapped query.
+            flight (SingleFlight): The coalescing layer shared between wrapped queries.
+        """
+        self.query = query
+        self.query_type = query_type
+        self.query_provider = query_provider
+        self.flight = flight
+
+    def __getattr__(self, name):
+        return getattr(self.query, name)
+
+    def execute(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Run the wrapped query, or attach to an identical run that is already in flight.
+        """
+        key = QueryCache.make_key(self.query_type, self.query_provider, search_queries, limit_number)
+        items = self.flight.do(key, lambda: self.query.execute(search_queries, limit_number, validator_key, validator_version, miner_uid))
+        return list(items)
+
+    async def execute_async(self, search_queries: list = ["bittensor"], limit_number: int = 15, validator_key: str = "None", validator_version: str = None, miner_uid: int = 0) -> list:
+        """
+        Same as `execute`, without blocking the event loop.
+        """
+        key = QueryCache.make_key(self.query_type, self.query_provider, search_queries, limit_number)
+        items = await self.flight.do_async(key, lambda: self.query.execute_async(search_queries, limit_number, validator_key, validator_version, miner_uid))
+        return list(items)
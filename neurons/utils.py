@@ -17,6 +17,9 @@ OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE S
 DEALINGS IN THE SOFTWARE.
 """
 
+import calendar
+from datetime import datetime, timezone
+
 
 def mask_sensitive_data(data: str, visible_chars: int = 5, mask: str = "...") -> str:
     """
@@ -30,3 +33,41 @@ def mask_sensitive_data(data: str, visible_chars: int = 5, mask: str = "...") ->
     if data:
         return data[:visible_chars] + mask + data[-visible_chars:]
     return "None"
+
+
+def timestamp_to_epoch(timestamp: str) -> int:
+    """
+    Convert a mapped item's ISO 8601 timestamp to epoch seconds. Naive timestamps are taken as UTC.
+
+    :param timestamp: The timestamp, e.g. "2023-11-20 12:34:56+00:00" or "2023-11-20T12:34:56.000Z".
+    :return: The epoch seconds.
+    """
+    date = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return int(date.timestamp())
+
+
+def utc_timestamp_to_epoch(timestamp: str, format: str = None) -> float:
+    """
+    Strictly parse a UTC timestamp to epoch seconds, raising ValueError on anything else.
+
+    :param timestamp: The timestamp.
+    :param format: A strptime format the timestamp must match. Default is a naive ISO 8601 timestamp with an optional "Z".
+    :return: The epoch seconds.
+    """
+    if format is None:
+        date = datetime.fromisoformat(timestamp.rstrip('Z'))
+        if date.tzinfo is not None:
+            raise ValueError(f"Timestamp is not naive UTC: {timestamp}")
+    elif format == TWITTER_TIMESTAMP_FORMAT and len(timestamp) == 25 and timestamp[10] == ' ' and timestamp.endswith('+00:00') \
+            and timestamp[4] == timestamp[7] == '-' and timestamp[13] == timestamp[16] == ':':
+        # Same result as strptime for this fixed-width shape, several times faster
+        date = datetime.fromisoformat(timestamp[:19])
+    else:
+        date = datetime.strptime(timestamp, format)
+    return calendar.timegm(date.timetuple()) + date.microsecond / 1e6
+
+
+# Format of the tweet timestamps miners send, e.g. "2023-11-20 12:34:56+00:00"
+TWITTER_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S+00:00'
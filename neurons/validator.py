@@ -22,19 +22,24 @@ DEALINGS IN THE SOFTWARE.
 # Importing necessary libraries and modules
 import os
 import time
+import asyncio
 import torch
 import csv
 import argparse
 import traceback
+import functools
 import bittensor as bt
 import scraping
 import json
 import sys
-import score.reddit_score
-import score.twitter_score
+from neurons import score
 import storage.store
-from apify_client import ApifyClient
+from neurons.apify.actors import get_client
 from neurons.queries import get_query, QueryType, QueryProvider
+from neurons.validator_engine import ValidatorEngine, Source
+from neurons.verification_cache import VerificationCache
+from neurons.score.budget import BudgetAllocator
+from neurons.reputation import ReputationStore
 
 
 # This function is responsible for setting up and parsing command-line arguments.
@@ -49,6 +54,25 @@ def get_config():
     # Adds override arguments for network and netuid.
     parser.add_argument( '--netuid', type = int, default = 1, help = "The chain subnet uid." )
     parser.add_argument( '--save_scoring', type = bool, default = False, help = "Write scoring debug data to csv files" )
+    parser.add_argument( '--streaming.on', action = 'store_true', default = False, help = "Query miners with the streaming synapses. Miners that don't serve them return no items." )
+    parser.add_argument( '--engine.round_interval', type = float, default = 120, help = "Seconds between the starts of consecutive twitter (and reddit) rounds." )
+    parser.add_argument( '--engine.max_pending', type = int, default = 4, help = "Rounds being scored at once." )
+    parser.add_argument( '--engine.persist_workers', type = int, default = 2, help = "Rounds being uploaded to storage at once." )
+    parser.add_argument( '--engine.queue_size', type = int, default = 4, help = "Rounds waiting in front of each pipeline stage before new rounds wait." )
+    parser.add_argument( '--engine.miners_per_round', type = int, default = 25, help = "Miners queried per round." )
+    parser.add_argument( '--engine.keywords_per_round', type = int, default = 1, help = "Keywords sent in one synapse. Miners search them in one actor run, and responses are scored on their coverage of all of them." )
+    parser.add_argument( '--spot_check.shard_size', type = int, default = 20, help = "Tweet urls looked up by one actor run." )
+    parser.add_argument( '--spot_check.max_shards', type = int, default = 16, help = "Tweet lookup actor runs at once." )
+    parser.add_argument( '--spot_check.deadline', type = float, default = 180, help = "Seconds all tweet lookups of a round may take together." )
+    parser.add_argument( '--spot_check.budget', type = int, default = 50, help = "Items spot checked per round, spread over the miners by their record. At least one per miner." )
+    parser.add_argument( '--spot_check.max_per_miner', type = int, default = 5, help = "Most items spot checked for one miner in a round." )
+    parser.add_argument( '--reputation.off', action = 'store_true', default = False, help = "Don't keep the local history of miner scores." )
+    parser.add_argument( '--reputation.path', type = str, default = None, help = "Path of the miner history database. Defaults to reputation.db in the validator's logging directory." )
+    parser.add_argument( '--reputation.retention', type = float, default = 7 * 24 * 3600, help = "Seconds miner history rows are kept." )
+    parser.add_argument( '--verify_cache.off', action = 'store_true', default = False, help = "Fetch every spot checked item, without the verification cache." )
+    parser.add_argument( '--verify_cache.path', type = str, default = None, help = "Path of the verification cache database. Defaults to verification_cache.db in the validator's logging directory." )
+    parser.add_argument( '--verify_cache.twitter_ttl', type = float, default = 6 * 3600, help = "Seconds a verified tweet answers spot checks." )
+    parser.add_argument( '--verify_cache.reddit_ttl', type = float, default = 3600, help = "Seconds a verified reddit post answers spot checks." )
 
     # Adds subtensor specific arguments i.e. --subtensor.chain_endpoint ... --subtensor.network ...
     bt.subtensor.add_args(parser)
@@ -72,6 +96,10 @@ def get_config():
     )
     # Ensure the logging directory exists.
     if not os.path.exists(config.full_path): os.makedirs(config.full_path, exist_ok=True)
+    if config.reputation.path is None:
+        config.reputation.path = os.path.join(config.full_path, 'reputation.db')
+    if config.verify_cache.path is None:
+        config.verify_cache.path = os.path.join(config.full_path, 'verification_cache.db')
 
     # Return the parsed config.
     return config
@@ -98,7 +126,7 @@ def main( config ):
 
     # Check access to Apify
     try:
-        client = ApifyClient(os.getenv("APIFY_API_KEY"))
+        client = get_client(os.getenv("APIFY_API_KEY"), os.getenv("APIFY_API_BASE_URL"))
         client.actors().list()
     except Exception as e:
         bt.logging.error(f"{e}")
@@ -157,289 +185,80 @@ def main( config ):
         bt.logging.info(f"Initialized all scores to 0")
 
 
-    curr_block = subtensor.block
-
-    # all nodes with more than 1e3 total stake are set to 0 (sets validators weights to 0)
-
     # set all nodes without ips set to 0
     scores = scores * torch.Tensor([metagraph.neurons[uid].axon_info.ip != '0.0.0.0' for uid in metagraph.uids])
-    step = 0
-    
-    # Fetch protocol version for inclusion in queries
-    my_version = scraping.utils.get_my_version()
 
     bt.logging.info(f"Initial scores: {scores}")
     bt.logging.info("Starting validator loop.")
-    
-    total_dendrites_per_query = 25
-    minimum_dendrites_per_query = 3
-    last_updated_block = 0 #curr_block - (curr_block % 100)
-    last_reset_weights_block = curr_block
-
-
-    # Main loop
-    while True:
-        # Per 10 blocks, sync the subtensor state with the blockchain.
-        if step % 5 == 0:
-            metagraph.sync(subtensor = subtensor)
-            bt.logging.info(f"🔄 Syncing metagraph with subtensor.")
-
-        # If the metagraph has changed, update the weights.
-        # Get the uids of all miners in the network.
-        uids = metagraph.uids.tolist()
-        # If there are more uids than scores, add more weights.
-        if len(uids) > len(scores):
-            bt.logging.trace("Adding more weights")
-            size_difference = len(uids) - len(scores)
-            new_scores = torch.zeros(size_difference, dtype=torch.float32)
-            scores = torch.cat((scores, new_scores))
-            del new_scores
-        # If there are less uids than scores, remove some weights.
-        queryable_uids = (metagraph.total_stake >= 0)
-        bt.logging.info(f"queryable_uids:{queryable_uids}")
-        
-        # Remove the weights of miners that are not queryable.
-        queryable_uids = queryable_uids * torch.Tensor([metagraph.neurons[uid].axon_info.ip != '0.0.0.0' for uid in uids])
-        active_miners = torch.sum(queryable_uids)
-        dendrites_per_query = total_dendrites_per_query
-
-        # if there are no active miners, set active_miners to 1
-        if active_miners == 0:
-            active_miners = 1
-        # if there are less than dendrites_per_query * 3 active miners, set dendrites_per_query to active_miners / 3
-        if active_miners < total_dendrites_per_query * 3:
-            dendrites_per_query = int(active_miners / 3)
-        else:
-            dendrites_per_query = total_dendrites_per_query
-        
-        # less than 3 set to 3
-        if dendrites_per_query < minimum_dendrites_per_query:
-                dendrites_per_query = minimum_dendrites_per_query
-        # zip uids and queryable_uids, filter only the uids that are queryable, unzip, and get the uids
-        zipped_uids = list(zip(uids, queryable_uids))
-        filtered_uids = list(zip(*filter(lambda x: x[1], zipped_uids)))[0]
-        bt.logging.info(f"filtered_uids:{filtered_uids}")
-        dendrites_to_query = random.sample( filtered_uids, min( dendrites_per_query, len(filtered_uids) ) )
-        bt.logging.info(f"dendrites_to_query:{dendrites_to_query}")
-        
-        # every 2 minutes, query the miners
-        try:
-            # Filter metagraph.axons by indices saved in dendrites_to_query list
-            filtered_axons = [metagraph.axons[i] for i in dendrites_to_query]
-            bt.logging.info(f"filtered_axons: {filtered_axons}")
-            # Broadcast a GET_DATA query to filtered miners on the network.
-
-            # * every 10 minutes, query the miners for twitter data
-            if step % 4 == 0:
-                search_key = random_line()
-                bt.logging.info(f"\033[92m 𝕏 ⏩ Sending tweeter query ({search_key}). \033[0m")
-                responses = dendrite.query(
-                    filtered_axons,
-                    # Construct a scraping query.
-                    scraping.protocol.TwitterScrap(scrap_input = {"search_key" : [search_key]}, version = my_version), # Construct a scraping query.
-                    # All responses have the deserialize function called on them before returning.
-                    deserialize = True, 
-                    timeout = 60
-                )
-
-                # Update score
-                new_scores = []
-                try:
-                    if(len(responses) > 0 and responses is not None):
-                        scoring_metrics = score.twitter_score.calculateScore(responses = responses, tag = search_key)
-                        for metric in scoring_metrics:
-                            bt.logging.info(f'{metric} = {scoring_metrics[metric]}')
-
-                        new_scores = scoring_metrics["normalized_scores"]
-                        bt.logging.info(f"✅ new_scores: {new_scores}")
-                        scoring_metrics["uid"] = dendrites_to_query
-                        scoring_metrics['search_key'] = search_key
-                        scoring_metrics['validator_hotkey'] = metagraph.hotkeys[my_subnet_uid]
-                        scoring_metrics['block'] = subtensor.block
-
-                        if config.save_scoring:
-                            dir = f'/opt/data/sn3/twitter_block_{subtensor.block}'
-                            os.mkdir(dir)
-                            with open(f'{dir}/scoring.json', 'w') as output:
-                                json.dump(scoring_metrics, output)
-
-                            for idx, node in enumerate(dendrites_to_query):
-                                filename = f"{dir}/{search_key}_{node}.json"
-                                bt.logging.info(f"Writing results to: {filename}")
-                                with open(filename , "w") as write:
-                                    json.dump(responses[idx], write)
-
-                        storage.store.store_scoring_metrics(scoring_metrics, 'twitter')
-
-                        
-                except Exception as e:
-                    bt.logging.error(f"❌ Error in twitterScore: {e}")
-                for i, score_i in enumerate(new_scores):
-                    scores[dendrites_to_query[i]] = twitterAlpha * scores[dendrites_to_query[i]] + (1 - twitterAlpha) * score_i
-                bt.logging.info(f"\033[92m ✓ Updated Scores: {scores} \033[0m")
-                
-                try:
-                    if len(responses) > 0:
-                        indexing_result = storage.store.twitter_store(data = responses, search_keys=[search_key])
-                        bt.logging.info(f"\033[92m saving index info: {indexing_result} \033[0m")
-                    else:
-                        bt.logging.warning("\033[91m ⚠ No twitter data found in responses \033[0m")
-                except Exception as e:
-                    bt.logging.error(f"❌ Error in store_Twitter: {e}")
-
-                    
-                        
-                current_block = subtensor.block
-                if current_block - last_updated_block > 100:
-                    
-                    weights = scores / torch.sum(scores)
-                    bt.logging.info(f"Setting weights: {weights}")
-                    # Miners with higher scores (or weights) receive a larger share of TAO rewards on this subnet.
-                    (
-                        processed_uids,
-                        processed_weights,
-                    ) = bt.utils.weight_utils.process_weights_for_netuid(
-                        uids=metagraph.uids,
-                        weights=weights,
-                        netuid=config.netuid,
-                        subtensor=subtensor
-                    )
-                    bt.logging.info(f"Processed weights: {processed_weights}")
-                    bt.logging.info(f"Processed uids: {processed_uids}")
-                    result = subtensor.set_weights(
-                        netuid = config.netuid, # Subnet to set weights on.
-                        wallet = wallet, # Wallet to sign set weights using hotkey.
-                        uids = processed_uids, # Uids of the miners to set weights for.
-                        weights = processed_weights, # Weights to set for the miners.
-                    )
-                    last_updated_block = current_block
-                    if result: bt.logging.success('✅ Successfully set weights.')
-                    else: bt.logging.error('Failed to set weights.')
-
-            # Periodically update the weights on the Bittensor blockchain.
-            if step % 4 == 2:
-                bt.logging.info(f"\033[92m ᕕ ⏩ Sending reddit query. \033[0m")
-                search_key = random_line()
-                responses = dendrite.query(
-                    filtered_axons,
-                    # Construct a scraping query.
-                    scraping.protocol.RedditScrap(scrap_input = {"search_key" : [search_key]}, version = my_version), # Construct a scraping query.
-                    # All responses have the deserialize function called on them before returning.
-                    deserialize = True,
-                    timeout = 60 
-                )
-
-                # Update score
-                new_scores = []
-                try:
-                    if(len(responses) > 0 and responses is not None):
-                        scoring_metrics = score.reddit_score.calculateScore(responses = responses, tag = search_key)
-                        for metric in scoring_metrics:
-                            bt.logging.info(f'{metric} = {scoring_metrics[metric]}')
-
-                        new_scores = scoring_metrics["normalized_scores"]
-                        bt.logging.info(f"✅ new_scores: {new_scores}")
-                        scoring_metrics["uid"] = dendrites_to_query
-                        scoring_metrics['search_key'] = search_key
-                        scoring_metrics['validator_hotkey'] = metagraph.hotkeys[my_subnet_uid]
-                        scoring_metrics['block'] = subtensor.block
-
-                        if config.save_scoring:
-                            dir = f'/opt/data/sn3/reddit_block_{subtensor.block}'
-                            os.mkdir(dir)
-                            with open(f'{dir}/scoring.json', 'w') as output:
-                                json.dump(scoring_metrics, output)
-
-                            for idx, node in enumerate(dendrites_to_query):
-                                filename = f"{dir}/{search_key}_{node}.json"
-                                bt.logging.info(f"Writing results to: {filename}")
-                                with open(filename , "w") as write:
-                                    json.dump(responses[idx], write)
-
-                        storage.store.store_scoring_metrics(scoring_metrics, 'reddit')
-
-
-                except Exception as e:
-                    bt.logging.error(f"❌ Error in redditScore: {e}")
-                    traceback.print_exc()
-
-                for i, score_i in enumerate(new_scores):
-                    scores[dendrites_to_query[i]] = redditAlpha * scores[dendrites_to_query[i]] + (1 - redditAlpha) * score_i
-                bt.logging.info(f"\033[92m ✓ Updated Scores: {scores} \033[0m")
-                try:
-                    if len(responses) > 0:
-                        indexing_result = storage.store.reddit_store(data = responses, search_keys=[search_key])
-                        bt.logging.info(f"\033[92m saving index info: {indexing_result} \033[0m")
-                    else:
-                        bt.logging.warning("\033[91m ⚠ No reddit data found in responses \033[0m")
-                except Exception as e:
-                    bt.logging.error(f"❌ Error in store_reddit: {e}")            
-                
-                # If the metagraph has changed, update the weights.
-                # Adjust the scores based on responses from miners.
-                # weights = torch.nn.functional.normalize(scores, p=1.0, dim=0)
-                current_block = subtensor.block
-                if current_block - last_updated_block > 100:
-                    
-                    weights = scores / torch.sum(scores)
-                    bt.logging.info(f"Setting weights: {weights}")
-                    # Miners with higher scores (or weights) receive a larger share of TAO rewards on this subnet.
-                    (
-                        processed_uids,
-                        processed_weights,
-                    ) = bt.utils.weight_utils.process_weights_for_netuid(
-                        uids=metagraph.uids,
-                        weights=weights,
-                        netuid=config.netuid,
-                        subtensor=subtensor
-                    )
-                    bt.logging.info(f"Processed weights: {processed_weights}")
-                    bt.logging.info(f"Processed uids: {processed_uids}")
-                    result = subtensor.set_weights(
-                        netuid = config.netuid, # Subnet to set weights on.
-                        wallet = wallet, # Wallet to sign set weights using hotkey.
-                        uids = processed_uids, # Uids of the miners to set weights for.
-                        weights = processed_weights, # Weights to set for the miners.
-                    )
-                    last_updated_block = current_block
-                    if result: bt.logging.success('✅ Successfully set weights.')
-                    else: bt.logging.error('Failed to set weights.')
-
-            step += 1
-
-            if last_reset_weights_block + 1800 < current_block:
-                bt.logging.trace(f"Clearing weights for validators and nodes without IPs")
-                last_reset_weights_block = current_block
-
-                
-                # set all nodes without ips set to 0
-                scores = scores * torch.Tensor([metagraph.neurons[uid].axon_info.ip != '0.0.0.0' for uid in metagraph.uids])
-
-            # Resync our local state with the latest state from the blockchain.
-            metagraph = subtensor.metagraph(config.netuid)
-            torch.save(scores, scores_file)
-            bt.logging.info(f"Saved weights to \"{scores_file}\"")
-            
-            # Check for auto update
-            if config.auto_update != "no":
-                if scraping.utils.update_repository(config.auto_update):
-                    bt.logging.success("🔁 Repository updated, exiting validator")
-                    exit(0)
-            # Sleep for a duration equivalent to the block time (i.e., time between successive blocks).
-            time.sleep(bt.__blocktime__ * 10)
-
-        # If we encounter an unexpected error, log it for debugging.
-        except RuntimeError as e:
-            bt.logging.error(e)
-            traceback.print_exc()
-        except Exception as e:
-            bt.logging.error(e)
-            continue
-        # If the user interrupts the program, gracefully exit.
-        except KeyboardInterrupt:
-            bt.logging.success("Keyboard interrupt detected. Exiting validator.")
-            exit()
-        
+
+    # The spot check lookup statistics are kept in the logging directory
+    score.twitter_score.twitter_query.state_path = os.path.join(config.full_path, 'twitter_verify_router.json')
+    score.twitter_score.twitter_query.load()
+    score.get_scorer(QueryType.TWITTER).verifier = score.twitter_score.TweetVerifier(
+        shard_size = config.spot_check.shard_size,
+        max_shards = config.spot_check.max_shards,
+        deadline = config.spot_check.deadline,
+    )
+    # The history of every miner's rounds, which also steers the spot check budget when it is kept
+    reputation = None if config.reputation.off else ReputationStore(config.reputation.path, retention = config.reputation.retention)
+    for query_type in [QueryType.TWITTER, QueryType.REDDIT]:
+        history = functools.partial(reputation.spot_checks, query_type.name.lower()) if reputation is not None else None
+        score.get_scorer(query_type).allocator = BudgetAllocator(config.spot_check.budget, config.spot_check.max_per_miner, history = history)
+
+    # Spot checked originals are reused across rounds, so only items not verified recently are fetched
+    verification_cache = None
+    if not config.verify_cache.off:
+        verification_cache = VerificationCache(
+            config.verify_cache.path,
+            ttls = {"twitter": config.verify_cache.twitter_ttl, "reddit": config.verify_cache.reddit_ttl},
+        )
+        for query_type in [QueryType.TWITTER, QueryType.REDDIT]:
+            score.get_scorer(query_type).cache = verification_cache
+
+    # Twitter and reddit rounds run side by side, the reddit ones half an interval later
+    sources = [
+        Source(
+            "twitter",
+            scraping.protocol.TwitterScrapStream if config.streaming.on else scraping.protocol.TwitterScrap,
+            score.get_scorer(QueryType.TWITTER).calculateScore,
+            storage.store.twitter_store,
+            alpha = twitterAlpha,
+        ),
+        Source(
+            "reddit",
+            scraping.protocol.RedditScrapStream if config.streaming.on else scraping.protocol.RedditScrap,
+            score.get_scorer(QueryType.REDDIT).calculateScore,
+            storage.store.reddit_store,
+            alpha = redditAlpha,
+            offset = config.engine.round_interval / 2,
+        ),
+    ]
+    engine = ValidatorEngine(
+        config, wallet, subtensor, dendrite, metagraph, scores, sources,
+        next_keyword = random_line,
+        store_metrics = storage.store.store_scoring_metrics,
+        scores_file = scores_file,
+        round_interval = config.engine.round_interval,
+        max_pending = config.engine.max_pending,
+        persist_workers = config.engine.persist_workers,
+        queue_size = config.engine.queue_size,
+        miners_per_round = config.engine.miners_per_round,
+        keywords_per_round = config.engine.keywords_per_round,
+        verification_cache = verification_cache,
+        reputation = reputation,
+    )
+    try:
+        exit_code = asyncio.run(engine.run())
+    # If the user interrupts the program, gracefully exit.
+    except KeyboardInterrupt:
+        bt.logging.success("Keyboard interrupt detected. Exiting validator.")
+        exit_code = None
+    if verification_cache is not None:
+        verification_cache.close()
+    if reputation is not None:
+        reputation.close()
+    exit(exit_code)
+
 # The main function parses the configuration and runs the validator.
 if __name__ == "__main__":
     # Parse the configuration.
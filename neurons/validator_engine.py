@@ -0,0 +1,459 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import traceback
+import torch
+import bittensor as bt
+import scraping
+from neurons.apify.telemetry import telemetry
+from neurons.pipeline import Pipeline, Stage
+
+
+async def query_stream( dendrite: bt.dendrite, axons: list, synapse: scraping.protocol.ScrapStreamingSynapse, timeout: float ) -> list:
+    """
+    Query the axons with a streaming synapse, reading every miner's items concurrently as they arrive.
+    Items received before a miner fails or times out are kept.
+    """
+    streams = await dendrite.forward( axons, synapse, timeout = timeout, deserialize = False, streaming = True )
+
+    async def consume( stream ):
+        items = []
+        try:
+            async for chunk in stream:
+                # The stream ends with the synapse itself, carrying the status of the call
+                if isinstance( chunk, dict ):
+                    items.append( chunk )
+        except Exception as e:
+            bt.logging.debug(f"Stream ended with error: {e}")
+        return items
+
+    return await asyncio.gather( *( consume( stream ) for stream in streams ) )
+
+
+async def query_miners( dendrite: bt.dendrite, axons: list, synapse: scraping.protocol.ScrapingSynapse, timeout: float = 60 ) -> list:
+    """
+    Query the axons and return the list of items of every miner, in the order of `axons`.
+    Streaming synapses are read incrementally, other synapses are sent as a single request.
+    """
+    if isinstance( synapse, scraping.protocol.ScrapStreamingSynapse ):
+        return await query_stream( dendrite, axons, synapse, timeout )
+    return await dendrite.forward( axons, synapse, timeout = timeout, deserialize = True )
+
+
+class Source:
+    """
+    One kind of validation round: the synapse sent to miners, how their responses are scored and where they are stored.
+    """
+
+    def __init__(self, name: str, synapse: type, calculate_score, store, alpha: float = 0.7, offset: float = 0.0):
+        """
+        Initialize the Source.
+
+        Args:
+            name (str): Name used in logs, scoring metrics and save_scoring directories, e.g. "twitter".
+            synapse (type): Synapse class sent to miners.
+            calculate_score (callable): `calculateScore(responses, tag, miners)` of the source's scorer.
+            store (callable): `store(data, search_keys)` of the storage module.
+            alpha (float, optional): Weight of the previous score in the moving average. Defaults to 0.7.
+            offset (float, optional): Seconds to wait before the first round. Defaults to 0.
+        """
+        self.name = name
+        self.synapse = synapse
+        self.calculate_score = calculate_score
+        self.store = store
+        self.alpha = alpha
+        self.offset = offset
+
+
+class RoundJob:
+    """
+    A round's responses on their way through the normalize, score and persist stages.
+    """
+
+    def __init__(self, source: Source, uids: list, responses: list, search_keys: list, hotkeys: list = None):
+        self.source = source
+        self.uids = uids
+        # Taken when the miners were queried, as a uid may change hands before the round is scored
+        self.hotkeys = hotkeys
+        self.responses = responses
+        self.search_keys = search_keys
+        # The keywords as one string, for logs and the stored metrics
+        self.search_key = ", ".join(search_keys)
+        self.scoring_metrics = None
+
+
+class ValidatorEngine:
+    """
+    Runs the validator as a set of asyncio loops instead of one sequential loop.
+
+    Each source (twitter, reddit) starts a round every `round_interval` seconds on its own, querying a random subset of
+    miners that no other round is querying at that moment. The responses then go through a pipeline of bounded
+    queues: normalize, score (with its blocking Apify spot checks) and persist (the S3 uploads and indexing calls),
+    each with its own workers, so the next round starts on time instead of after the slowest stage. At most
+    `max_pending` rounds are scored at once; when the queues are full new rounds wait, which bounds Apify spend.
+
+    Scores are only changed on the event loop, so no locking is needed around them. Chain calls go through one lock,
+    as the subtensor connection is not safe to use from several threads.
+    """
+
+    def __init__(self, config, wallet: bt.wallet, subtensor: bt.subtensor, dendrite: bt.dendrite, metagraph: bt.metagraph,
+                 scores: torch.Tensor, sources: list, next_keyword, store_metrics, scores_file: str = "scores.pt",
+                 round_interval: float = 120, max_pending: int = 4, persist_workers: int = 2, queue_size: int = 4,
+                 miners_per_round: int = 25, timeout: float = 60, verification_cache = None, reputation = None,
+                 keywords_per_round: int = 1):
+        """
+        Initialize the ValidatorEngine.
+
+        Args:
+            config (bt.config): The validator config.
+            wallet (bt.wallet): The validator wallet.
+            subtensor (bt.subtensor): The chain connection.
+            dendrite (bt.dendrite): The client used to query miners.
+            metagraph (bt.metagraph): The synced metagraph.
+            scores (torch.Tensor): The moving average score of every uid.
+            sources (list): The `Source`s to run rounds for.
+            next_keyword (callable): Returns the search key of the next round.
+            store_metrics (callable): `store_scoring_metrics(metrics, type)` of the storage module.
+            scores_file (str, optional): Where scores are saved. Defaults to "scores.pt".
+            round_interval (float, optional): Seconds between the starts of consecutive rounds of a source. Defaults to 120.
+            max_pending (int, optional): Rounds being scored at once. Defaults to 4.
+            persist_workers (int, optional): Rounds being stored at once. Defaults to 2.
+            queue_size (int, optional): Rounds waiting in front of each pipeline stage. Defaults to 4.
+            miners_per_round (int, optional): Miners queried per round. Defaults to 25.
+            timeout (float, optional): Seconds miners get to respond. Defaults to 60.
+            verification_cache (VerificationCache, optional): The scorers' spot check cache, for its stats and expiry. Defaults to None.
+            reputation (ReputationStore, optional): Where every scored round is appended to the miners' history. Defaults to None.
+            keywords_per_round (int, optional): Distinct keywords sent in one synapse, which miners search in one actor run. Defaults to 1.
+        """
+        self.config = config
+        self.wallet = wallet
+        self.subtensor = subtensor
+        self.dendrite = dendrite
+        self.metagraph = metagraph
+        self.scores = scores
+        self.sources = sources
+        self.next_keyword = next_keyword
+        self.store_metrics = store_metrics
+        self.scores_file = scores_file
+        self.round_interval = round_interval
+        self.max_pending = max_pending
+        self.miners_per_round = miners_per_round
+        self.minimum_miners_per_round = 3
+        self.timeout = timeout
+        self.verification_cache = verification_cache
+        self.reputation = reputation
+        self.keywords_per_round = keywords_per_round
+        self.drain_timeout = 300
+
+        self.my_version = scraping.utils.get_my_version()
+        self.my_subnet_uid = metagraph.hotkeys.index(wallet.hotkey.ss58_address)
+        self.busy = set()
+        self.rounds = {source.name: 0 for source in sources}
+        self.scored = {source.name: 0 for source in sources}
+        self.started = time.time()
+        self.last_updated_block = 0
+        self.last_reset_weights_block = None
+        self.exit_code = None
+        self.pipeline = Pipeline([
+            Stage("normalize", self.normalize, workers = 1, queue_size = queue_size),
+            Stage("score", self.score, workers = max_pending, queue_size = queue_size),
+            Stage("persist", self.persist, workers = persist_workers, queue_size = queue_size),
+        ])
+        self._chain_lock = None
+
+    async def chain(self, fn, *args, **kwargs):
+        """
+        Run a blocking chain call in a worker thread, one at a time.
+        """
+        async with self._chain_lock:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+
+    def select_miners(self) -> list:
+        """
+        Pick the uids to query in a round: a random sample of the serving miners that no other round is querying.
+        """
+        uids = self.metagraph.uids.tolist()
+        serving = [uid for uid in uids if self.metagraph.total_stake[uid] >= 0 and self.metagraph.neurons[uid].axon_info.ip != '0.0.0.0']
+        # Query a third of the serving miners per round, between the minimum and miners_per_round
+        count = max(self.minimum_miners_per_round, min(self.miners_per_round, len(serving) // 3))
+        available = [uid for uid in serving if uid not in self.busy]
+        return random.sample(available, min(count, len(available)))
+
+    def next_keywords(self) -> list:
+        """
+        Draw the distinct search keys of a round. Gives up on a full set after a few draws, as the keyword file
+        may have fewer distinct lines.
+        """
+        search_keys = []
+        for _ in range(4 * self.keywords_per_round):
+            search_key = self.next_keyword()
+            if search_key not in search_keys:
+                search_keys.append(search_key)
+                if len(search_keys) == self.keywords_per_round:
+                    break
+        return search_keys
+
+    async def round(self, source: Source):
+        """
+        Query a subset of miners and hand their responses to a background verification task.
+        """
+        uids = self.select_miners()
+        if not uids:
+            bt.logging.warning(f"No miners available for a {source.name} round")
+            return
+        search_keys = self.next_keywords()
+        bt.logging.info(f"\033[92m ⏩ Sending {source.name} query ({', '.join(search_keys)}) to {len(uids)} miners: {uids} \033[0m")
+
+        self.busy.update(uids)
+        try:
+            axons = [self.metagraph.axons[uid] for uid in uids]
+            hotkeys = [self.metagraph.hotkeys[uid] for uid in uids]
+            synapse = source.synapse(scrap_input = {"search_key" : search_keys}, version = self.my_version)
+            responses = await query_miners(self.dendrite, axons, synapse, timeout = self.timeout)
+        finally:
+            self.busy.difference_update(uids)
+
+        # Only waits when the pipeline is backed up
+        await self.pipeline.put(RoundJob(source, uids, list(responses), search_keys, hotkeys))
+        self.rounds[source.name] += 1
+
+    async def normalize(self, job: RoundJob) -> RoundJob:
+        """
+        Make every response a list of items or None, as the scorers expect. Anything else, such as an error, counts
+        as no response.
+        """
+        job.responses = [response if isinstance(response, list) else None for response in job.responses]
+        return job
+
+    async def score(self, job: RoundJob) -> RoundJob:
+        """
+        Score the responses of a round and update the scores.
+        """
+        source = job.source
+        new_scores = []
+        try:
+            scoring_metrics = await asyncio.to_thread(source.calculate_score, responses = job.responses, tag = job.search_keys, miners = job.hotkeys)
+            for metric in scoring_metrics:
+                bt.logging.info(f'{source.name} {metric} = {scoring_metrics[metric]}')
+
+            new_scores = scoring_metrics["normalized_scores"]
+            bt.logging.info(f"✅ {source.name} new_scores: {new_scores}")
+            scoring_metrics["uid"] = job.uids
+            scoring_metrics['search_key'] = job.search_key
+            scoring_metrics['validator_hotkey'] = self.metagraph.hotkeys[self.my_subnet_uid]
+            scoring_metrics['block'] = await self.chain(lambda: self.subtensor.block)
+            job.scoring_metrics = scoring_metrics
+            if self.reputation is not None:
+                try:
+                    await asyncio.to_thread(self.reputation.record, source.name, job.hotkeys, job.uids, scoring_metrics, scoring_metrics['block'])
+                except Exception as e:
+                    bt.logging.error(f"❌ Error recording {source.name} miner history: {e}")
+        except Exception as e:
+            bt.logging.error(f"❌ Error in {source.name} score: {e}")
+            traceback.print_exc()
+
+        for i, score_i in enumerate(new_scores):
+            self.scores[job.uids[i]] = source.alpha * self.scores[job.uids[i]] + (1 - source.alpha) * score_i
+        self.scored[source.name] += len(new_scores)
+        bt.logging.info(f"\033[92m ✓ Updated Scores: {self.scores} \033[0m")
+        return job
+
+    async def persist(self, job: RoundJob):
+        """
+        Store the scoring metrics and the responses of a round.
+        """
+        source = job.source
+        if job.scoring_metrics is not None:
+            try:
+                if self.config.save_scoring:
+                    await asyncio.to_thread(self.save_scoring, job)
+                await asyncio.to_thread(self.store_metrics, job.scoring_metrics, source.name)
+            except Exception as e:
+                bt.logging.error(f"❌ Error storing {source.name} scoring metrics: {e}")
+
+        try:
+            if len(job.responses) > 0:
+                indexing_result = await asyncio.to_thread(source.store, data = job.responses, search_keys = job.search_keys)
+                bt.logging.info(f"\033[92m saving index info: {indexing_result} \033[0m")
+            else:
+                bt.logging.warning(f"\033[91m ⚠ No {source.name} data found in responses \033[0m")
+        except Exception as e:
+            bt.logging.error(f"❌ Error in store {source.name}: {e}")
+
+    def save_scoring(self, job: RoundJob):
+        """
+        Write a round's scoring metrics and responses to /opt/data/sn3 for debugging.
+        """
+        dir = f"/opt/data/sn3/{job.source.name}_block_{job.scoring_metrics['block']}"
+        os.makedirs(dir, exist_ok=True)
+        with open(f'{dir}/scoring.json', 'w') as output:
+            json.dump(job.scoring_metrics, output)
+
+        for idx, node in enumerate(job.uids):
+            filename = f"{dir}/{'+'.join(job.search_keys)}_{node}.json"
+            bt.logging.info(f"Writing results to: {filename}")
+            with open(filename , "w") as write:
+                json.dump(job.responses[idx], write)
+
+    async def round_loop(self, source: Source):
+        """
+        Start a round of `source` every `round_interval` seconds, however long the previous one took.
+        """
+        loop = asyncio.get_running_loop()
+        next_start = loop.time() + source.offset
+        while True:
+            await asyncio.sleep(max(0.0, next_start - loop.time()))
+            next_start = max(next_start + self.round_interval, loop.time())
+            try:
+                await self.round(source)
+            except Exception as e:
+                bt.logging.error(f"❌ Error in {source.name} round: {e}")
+                traceback.print_exc()
+
+    def set_weights(self, weights: torch.Tensor):
+        """
+        Set weights on chain. Miners with higher scores (or weights) receive a larger share of TAO rewards on this subnet.
+        """
+        bt.logging.info(f"Setting weights: {weights}")
+        (
+            processed_uids,
+            processed_weights,
+        ) = bt.utils.weight_utils.process_weights_for_netuid(
+            uids=self.metagraph.uids,
+            weights=weights,
+            netuid=self.config.netuid,
+            subtensor=self.subtensor
+        )
+        bt.logging.info(f"Processed weights: {processed_weights}")
+        bt.logging.info(f"Processed uids: {processed_uids}")
+        return self.subtensor.set_weights(
+            netuid = self.config.netuid, # Subnet to set weights on.
+            wallet = self.wallet, # Wallet to sign set weights using hotkey.
+            uids = processed_uids, # Uids of the miners to set weights for.
+            weights = processed_weights, # Weights to set for the miners.
+        )
+
+    async def weights_loop(self):
+        """
+        Set weights whenever more than 100 blocks have passed since they were last set.
+        """
+        while True:
+            await asyncio.sleep(bt.__blocktime__ * 5)
+            try:
+                current_block = await self.chain(lambda: self.subtensor.block)
+                if current_block - self.last_updated_block > 100 and torch.sum(self.scores) > 0:
+                    result = await self.chain(self.set_weights, self.scores / torch.sum(self.scores))
+                    self.last_updated_block = current_block
+                    if result: bt.logging.success('✅ Successfully set weights.')
+                    else: bt.logging.error('Failed to set weights.')
+            except Exception as e:
+                bt.logging.error(f"❌ Error while setting weights: {e}")
+
+    def resize_scores(self):
+        """
+        Add scores for uids registered since the last sync.
+        """
+        uids = self.metagraph.uids.tolist()
+        if len(uids) > len(self.scores):
+            bt.logging.trace("Adding more weights")
+            new_scores = torch.zeros(len(uids) - len(self.scores), dtype=torch.float32)
+            self.scores = torch.cat((self.scores, new_scores))
+
+    async def housekeeping_loop(self):
+        """
+        Every 10 blocks: resync the metagraph, clear the scores of nodes without IPs every 1800 blocks, save the
+        scores, log actor telemetry and verification cache hit rates, and check for updates.
+        """
+        step = 0
+        while True:
+            await asyncio.sleep(bt.__blocktime__ * 10)
+            step += 1
+            try:
+                await self.chain(self.metagraph.sync, subtensor = self.subtensor)
+                bt.logging.info(f"🔄 Synced metagraph with subtensor.")
+                self.resize_scores()
+
+                current_block = await self.chain(lambda: self.subtensor.block)
+                if self.last_reset_weights_block is None:
+                    self.last_reset_weights_block = current_block
+                if self.last_reset_weights_block + 1800 < current_block:
+                    bt.logging.trace(f"Clearing weights for validators and nodes without IPs")
+                    self.last_reset_weights_block = current_block
+                    # set all nodes without ips set to 0
+                    self.scores = self.scores * torch.Tensor([self.metagraph.neurons[uid].axon_info.ip != '0.0.0.0' for uid in self.metagraph.uids])
+
+                torch.save(self.scores, self.scores_file)
+                bt.logging.info(f"Saved weights to \"{self.scores_file}\"")
+
+                hours = (time.time() - self.started) / 3600
+                bt.logging.info(f"Rounds: {self.rounds}, miners scored per hour: { {name: round(count / hours) for name, count in self.scored.items()} }, rounds in the pipeline: {self.pipeline.pending()}")
+                bt.logging.info(f"Pipeline stages: {self.pipeline.metrics()}")
+                if self.verification_cache is not None:
+                    bt.logging.info(f"Verification cache: {self.verification_cache.stats()}")
+                if self.reputation is not None:
+                    bt.logging.info(f"Miner history: {self.reputation.stats()}")
+
+                # Log the cost and latency of the spot check actor runs
+                if step % 5 == 0:
+                    telemetry.log_summary(bt.logging.info)
+                    telemetry.write(os.path.join(self.config.full_path, 'actor_metrics.json'))
+                    if self.verification_cache is not None:
+                        expired = await asyncio.to_thread(self.verification_cache.expire)
+                        bt.logging.info(f"Expired {expired} verified items")
+                    if self.reputation is not None:
+                        expired = await asyncio.to_thread(self.reputation.expire)
+                        bt.logging.info(f"Expired {expired} miner history rows")
+
+                # Check for auto update
+                if self.config.auto_update != "no":
+                    if await asyncio.to_thread(scraping.utils.update_repository, self.config.auto_update):
+                        bt.logging.success("🔁 Repository updated, exiting validator")
+                        self.exit_code = 0
+                        return
+            except Exception as e:
+                bt.logging.error(f"❌ Error in housekeeping: {e}")
+
+    async def run(self):
+        """
+        Run the validator until it is interrupted or updated, then let the rounds being verified finish and save the scores.
+        """
+        self.pipeline.start()
+        self._chain_lock = asyncio.Lock()
+        loops = [asyncio.create_task(self.round_loop(source)) for source in self.sources]
+        loops.append(asyncio.create_task(self.weights_loop()))
+        housekeeping = asyncio.create_task(self.housekeeping_loop())
+        try:
+            await housekeeping
+        finally:
+            for task in loops + [housekeeping]:
+                task.cancel()
+            await asyncio.gather(*loops, housekeeping, return_exceptions=True)
+            # Let the rounds already queried finish scoring and uploading
+            if self.pipeline.pending():
+                bt.logging.info(f"Waiting for {self.pipeline.pending()} rounds to go through the pipeline.")
+            await self.pipeline.drain(timeout = self.drain_timeout)
+            torch.save(self.scores, self.scores_file)
+            bt.logging.info(f"Saved weights to \"{self.scores_file}\"")
+        return self.exit_code
+
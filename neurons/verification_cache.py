@@ -0,0 +1,164 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS verified (
+    source TEXT NOT NULL,
+    id TEXT NOT NULL,
+    verified_at INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (source, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS verified_by_time ON verified (verified_at);
+"""
+
+
+class VerificationCache:
+    """
+    On-disk cache of the original items fetched for spot checks, keyed by (source, item id).
+
+    Popular keywords make miners return the same items round after round, so a spot check is first answered from
+    items verified within the source's TTL and only the misses are fetched from the actors. Only the fields the
+    spot check compares are kept. The cache survives restarts.
+    """
+
+    def __init__(self, path: str, ttls: dict = None, default_ttl: float = 6 * 3600):
+        """
+        Initialize the VerificationCache.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            ttls (dict, optional): Mapping of source name to the seconds a verified item stays valid. Defaults to None.
+            default_ttl (float, optional): TTL of sources missing from `ttls`. Defaults to six hours.
+        """
+        self.path = path
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        self.hits = {}
+        self.misses = {}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def ttl(self, source: str) -> float:
+        return self.ttls.get(source, self.default_ttl)
+
+    def get_many(self, source: str, ids: list) -> dict:
+        """
+        Return the cached originals of `ids` that were verified within the source's TTL.
+
+        Args:
+            source (str): The source of the items, e.g. "twitter" or "reddit".
+            ids (list): The item ids to look up.
+
+        Returns:
+            dict: Mapping of item id (as a string) to the cached original.
+        """
+        ids = list({str(item_id) for item_id in ids})
+        cutoff = int(time.time() - self.ttl(source))
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's limit on bound parameters
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT id, data FROM verified WHERE source = ? AND verified_at >= ? AND id IN ({','.join('?' * len(chunk))})",
+                    (source, cutoff, *chunk),
+                ).fetchall()
+                for item_id, data in rows:
+                    found[item_id] = json.loads(data)
+            self.hits[source] = self.hits.get(source, 0) + len(found)
+            self.misses[source] = self.misses.get(source, 0) + len(ids) - len(found)
+        return found
+
+    def add(self, source: str, items: list, fields: tuple) -> int:
+        """
+        Store freshly fetched originals.
+
+        Args:
+            source (str): The source of the items.
+            items (list): The originals returned by the verification actor.
+            fields (tuple): The fields to keep of each item.
+
+        Returns:
+            int: The number of items written.
+        """
+        now = int(time.time())
+        rows = []
+        for item in items:
+            try:
+                rows.append((source, str(item['id']), now, json.dumps({field: item.get(field) for field in fields})))
+            except Exception as e:
+                logger.warning(f"Skipping original that can't be cached: {e}, item = {item}")
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO verified VALUES (?, ?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def expire(self) -> int:
+        """
+        Delete items older than the longest TTL.
+
+        Returns:
+            int: The number of rows deleted.
+        """
+        cutoff = int(time.time() - max([self.default_ttl] + list(self.ttls.values())))
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM verified WHERE verified_at < ?", (cutoff,)).rowcount
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM verified").fetchone()[0]
+            sources = {}
+            for source in sorted(set(self.hits) | set(self.misses)):
+                hits, misses = self.hits.get(source, 0), self.misses.get(source, 0)
+                sources[source] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                }
+        return {"entries": entries, "sources": sources}
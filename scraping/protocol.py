@@ -16,6 +16,7 @@ THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABI
 OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
+import json
 from typing import Optional, List, Dict
 import bittensor as bt
 import pydantic
@@ -73,6 +74,88 @@ class TwitterScrap(ScrapingSynapse):
         # TODO: Add error handling for when scrap_output is None
         return self.scrap_output
 
+class ScrapStreamingSynapse(ScrapingSynapse, bt.StreamingSynapse):
+    """
+    Streaming variant of the scrap synapses. The miner writes each item as one line of JSON (NDJSON) as soon as
+    its actor produces it, and the validator reads the items as they arrive instead of waiting for the whole list.
+    """
+    # Required request input, filled by sending dendrite caller.
+    scrap_input: Optional[Dict] = None
+
+    # Items received so far, filled on the dendrite side while the stream is read.
+    scrap_output: List[Dict] = []
+
+    @staticmethod
+    def encode_items(items: List[Dict]) -> bytes:
+        """
+        Encode items as NDJSON for the response body.
+        """
+        return b"".join(json.dumps(item).encode("utf-8") + b"\n" for item in items)
+
+    async def process_streaming_response(self, response):
+        """
+        Parse the NDJSON body as it arrives, yielding each item and collecting it in scrap_output.
+        """
+        buffer = b""
+        async for chunk in response.content.iter_any():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                item = self._decode_line(line)
+                if item is not None:
+                    self.scrap_output.append(item)
+                    yield item
+        item = self._decode_line(buffer)
+        if item is not None:
+            self.scrap_output.append(item)
+            yield item
+
+    @staticmethod
+    def _decode_line(line: bytes) -> Optional[Dict]:
+        if not line.strip():
+            return None
+        try:
+            item = json.loads(line)
+        except ValueError:
+            bt.logging.warning(f"Skipping malformed streamed item: {line[:100]}")
+            return None
+        return item if isinstance(item, dict) else None
+
+    def extract_response_json(self, response) -> dict:
+        """
+        Rebuild the synapse fields from the response headers, since a streamed body isn't a serialized synapse.
+        """
+        headers = {key.decode("utf-8"): value.decode("utf-8") for key, value in response.__dict__["_raw_headers"]}
+
+        def extract_info(prefix):
+            return {key.split("_")[-1]: value for key, value in headers.items() if key.startswith(prefix)}
+
+        return {
+            "name": headers.get("name", ""),
+            "timeout": float(headers.get("timeout", 0)),
+            "total_size": int(headers.get("total_size", 0)),
+            "header_size": int(headers.get("header_size", 0)),
+            "dendrite": extract_info("bt_header_dendrite"),
+            "axon": extract_info("bt_header_axon"),
+            "scrap_output": self.scrap_output,
+        }
+
+    def deserialize(self) -> List[Dict]:
+        """
+        Return the items received so far.
+        """
+        return self.scrap_output
+
+class RedditScrapStream(ScrapStreamingSynapse):
+    """
+    Streaming variant of RedditScrap.
+    """
+
+class TwitterScrapStream(ScrapStreamingSynapse):
+    """
+    Streaming variant of TwitterScrap.
+    """
+
 class CheckMiner(ScrapingSynapse):
     """
     CheckMiner class inherits from ScrapingSynapse.